@@ -52,6 +52,7 @@ from firedrake.expression import *
 from firedrake.function import *
 from firedrake.functionspace import *
 from firedrake.interpolation import *
+from firedrake.lagging import *
 from firedrake.output import *
 from firedrake.linear_solver import *
 from firedrake.preconditioners import *
@@ -65,6 +66,7 @@ from firedrake.optimizer import *
 from firedrake.parameters import *
 from firedrake.parloops import *
 from firedrake.plot import *
+from firedrake.precompile import *
 from firedrake.projection import *
 from firedrake.slate import *
 from firedrake.slope_limiter import *
@@ -11,6 +11,7 @@ from pyop2.exceptions import MapValueError, SparsityFormatError
 from firedrake import assemble_expressions
 from firedrake import tsfc_interface
 from firedrake import function
+from firedrake import halo
 from firedrake import matrix
 from firedrake import parameters
 from firedrake import solving
@@ -19,7 +20,7 @@ from firedrake.slate import slate
 from firedrake.slate import slac
 from firedrake.bcs import DirichletBC, EquationBCSplit
 
-__all__ = ["assemble"]
+__all__ = ["assemble", "AssemblyPlan"]
 
 
 def assemble(f, tensor=None, bcs=None, form_compiler_parameters=None,
@@ -135,7 +136,8 @@ def allocate_matrix(f, bcs=None, form_compiler_parameters=None,
 
 
 def create_assembly_callable(f, tensor=None, bcs=None, form_compiler_parameters=None,
-                             inverse=False, mat_type=None, sub_mat_type=None):
+                             inverse=False, mat_type=None, sub_mat_type=None,
+                             diagonal=False):
     r"""Create a callable object than be used to assemble f into a tensor.
 
     This is really only designed to be used inside residual and
@@ -153,7 +155,7 @@ def create_assembly_callable(f, tensor=None, bcs=None, form_compiler_parameters=
     loops = _assemble(f, tensor=tensor, bcs=bcs,
                       form_compiler_parameters=form_compiler_parameters,
                       inverse=inverse, mat_type=mat_type,
-                      sub_mat_type=sub_mat_type)
+                      sub_mat_type=sub_mat_type, diagonal=diagonal)
 
     loops = tuple(loops)
 
@@ -163,6 +165,114 @@ def create_assembly_callable(f, tensor=None, bcs=None, form_compiler_parameters=
     return thunk
 
 
+class AssemblyPlan(object):
+    r"""A plan for repeatedly assembling a form into the same tensor.
+
+    All the work of :func:`assemble` that does not depend on the
+    values of the data (compiling the form, building the sparsity,
+    maps and local to global maps, and the parallel loop arguments) is
+    done once, when the plan is created.  Calling :meth:`assemble`
+    then only executes the prebuilt parallel loops.
+
+    :arg f: a 1- or 2-:class:`~ufl.classes.Form` or a rank 1 or 2
+        :class:`~slate.TensorBase` expression.
+    :arg tensor: an existing tensor to assemble into (optional).  If
+        not supplied, a new one is allocated.
+    :arg bcs: a list of boundary conditions to apply (optional).
+    :arg form_compiler_parameters: (optional) dict of parameters to
+        pass to the form compiler.
+    :arg mat_type: (optional) matrix type for 2-forms, see
+        :func:`assemble`.
+    :arg sub_mat_type: (optional) sub matrix type for "nest"
+        matrices, see :func:`assemble`.
+    :arg appctx: Additional information to hang on the assembled
+        matrix if an implicit matrix is requested (mat_type "matfree").
+    :arg options_prefix: PETSc options prefix to apply to matrices.
+
+    Changes to the values of the coefficients of the form, and to the
+    values of the boundary conditions (set via
+    :meth:`~.DirichletBC.set_value`, or by modifying the
+    :class:`.Function`, :class:`.Constant` or :class:`.Expression`
+    they were defined with), are picked up each time the plan is
+    executed.  Changing which coefficients appear in the form, or
+    which boundary conditions are applied, requires a new plan.
+    """
+    def __init__(self, f, tensor=None, bcs=None, form_compiler_parameters=None,
+                 mat_type=None, sub_mat_type=None, appctx={}, options_prefix=None):
+        if not isinstance(f, (ufl.form.Form, slate.TensorBase)):
+            raise TypeError("Unable to create an assembly plan for %r" % f)
+        rank = len(f.arguments())
+        if rank == 0:
+            raise ValueError("Assembly plans are only supported for rank 1 and 2 forms")
+        if mat_type is None:
+            mat_type = parameters.parameters["default_matrix_type"]
+        bcs = solving._extract_bcs(bcs)
+        if tensor is None:
+            if rank == 2:
+                tensor = allocate_matrix(f, bcs=bcs,
+                                         form_compiler_parameters=form_compiler_parameters,
+                                         mat_type=mat_type, sub_mat_type=sub_mat_type,
+                                         appctx=appctx, options_prefix=options_prefix)
+            else:
+                tensor = function.Function(f.arguments()[0].function_space())
+        if rank == 2 and mat_type == "matfree":
+            loops = (tensor.assemble, )
+        else:
+            loops = tuple(_assemble(f, tensor=tensor, bcs=bcs,
+                                    form_compiler_parameters=form_compiler_parameters,
+                                    mat_type=mat_type, sub_mat_type=sub_mat_type,
+                                    appctx=appctx, options_prefix=options_prefix,
+                                    assemble_now=True))
+        self.form = f
+        self.tensor = tensor
+        self.bcs = bcs
+        self._loops = loops
+
+    def assemble(self):
+        r"""Execute the plan, assembling the form into :attr:`tensor`.
+
+        :returns: :attr:`tensor`.
+        """
+        for loop in self._loops:
+            loop()
+        return self.tensor
+
+
+def _coalesced_par_loop(loop, dats):
+    """Execute a parallel loop, first bringing the halos of its
+    (read) Dat arguments up to date with :func:`.halo.global_to_local`."""
+    halo.global_to_local(dats)
+    return loop()
+
+
+def _apply_bc_to_diagonal(diagonal, bc, block):
+    """Set the (block) diagonal entries of the rows constrained by a
+    :class:`.DirichletBC` to those of the identity, as in an assembled
+    :class:`.Matrix`."""
+    fs = bc.function_space()
+    if len(fs) > 1:
+        raise RuntimeError(r"""Cannot apply boundary conditions to full mixed space. Did you forget to index it?""")
+    component = fs.component
+    index = fs.parent.index if component is not None else fs.index
+    dat = diagonal.dat[index or 0]
+    data = dat.data_with_halos.reshape(-1, dat.cdim)
+    nodes = bc.nodes
+    if block:
+        bs = int(round(numpy.sqrt(dat.cdim)))
+        data = data.reshape(-1, bs, bs)
+        if component is None:
+            data[nodes] = numpy.eye(bs)
+        else:
+            data[nodes, component, :] = 0
+            data[nodes, :, component] = 0
+            data[nodes, component, component] = 1
+    else:
+        if component is None:
+            data[nodes] = 1
+        else:
+            data[nodes, component] = 1
+
+
 @utils.known_pyop2_safe
 def _assemble(f, tensor=None, bcs=None, form_compiler_parameters=None,
               inverse=False, mat_type=None, sub_mat_type=None,
@@ -170,7 +280,8 @@ def _assemble(f, tensor=None, bcs=None, form_compiler_parameters=None,
               options_prefix=None,
               assemble_now=False,
               allocate_only=False,
-              zero_tensor=True):
+              zero_tensor=True,
+              diagonal=False):
     r"""Assemble the form or Slate expression f and return a Firedrake object
     representing the result. This will be a :class:`float` for 0-forms/rank-0
     Slate tensors, a :class:`.Function` for 1-forms/rank-1 Slate tensors and
@@ -192,6 +303,13 @@ def _assemble(f, tensor=None, bcs=None, form_compiler_parameters=None,
          matrix if an implicit matrix is requested (mat_type "matfree").
     :arg options_prefix: An options prefix for the PETSc matrix
         (ignored if not assembling a bilinear form).
+    :arg diagonal: (optional) if f is a 2-form, then assemble only
+        its diagonal, into a :class:`.Function` on the test space, or
+        if ``"block"``, its point-block diagonal (the blocks coupling
+        the components at each node), into a :class:`.Function` whose
+        value shape is twice that of the test space, which must then
+        be supplied as the ``tensor``.  Rows constrained by
+        :class:`.DirichletBC`\s get the diagonal of the identity.
     """
     if mat_type is None:
         mat_type = parameters.parameters["default_matrix_type"]
@@ -207,6 +325,20 @@ def _assemble(f, tensor=None, bcs=None, form_compiler_parameters=None,
     else:
         form_compiler_parameters = {}
     form_compiler_parameters["assemble_inverse"] = inverse
+    if diagonal:
+        if len(f.arguments()) != 2:
+            raise ValueError("Can only assemble the diagonal of a 2-form")
+        if isinstance(f, slate.TensorBase):
+            raise NotImplementedError("Diagonal assembly not implemented for Slate tensors")
+        V = f.arguments()[0].function_space()
+        if diagonal == "block":
+            if len(V) > 1:
+                raise NotImplementedError("Block diagonal assembly not implemented for mixed spaces")
+            if tensor is None:
+                raise ValueError("Have to provide a tensor to assemble the block diagonal into")
+            form_compiler_parameters["assemble_diagonal"] = V.value_size
+        else:
+            form_compiler_parameters["assemble_diagonal"] = 1
 
     topology = f.ufl_domains()[0].topology
     for m in f.ufl_domains():
@@ -233,8 +365,8 @@ def _assemble(f, tensor=None, bcs=None, form_compiler_parameters=None,
                 integral_types += [integral.integral_type() for integral in bc.integrals()]
 
     rank = len(f.arguments())
-    is_mat = rank == 2
-    is_vec = rank == 1
+    is_mat = rank == 2 and not diagonal
+    is_vec = rank == 1 or bool(diagonal)
 
     if any((coeff.function_space() and coeff.function_space().component is not None)
            for coeff in f.coefficients()):
@@ -419,7 +551,7 @@ def _assemble(f, tensor=None, bcs=None, form_compiler_parameters=None,
         m = domains[domain_number]
         subdomain_data = f.subdomain_data()[m]
         # Find argument space indices
-        if is_mat:
+        if is_mat or diagonal:
             i, j = indices
         elif is_vec:
             i, = indices
@@ -529,7 +661,13 @@ def _assemble(f, tensor=None, bcs=None, form_compiler_parameters=None,
         kwargs["pass_layer_arg"] = pass_layer_arg
         try:
             with collecting_loops(True):
-                yield op2.par_loop(*args, **kwargs)
+                loop = op2.par_loop(*args, **kwargs)
+            # Exchange the halos of the coefficients together
+            dats = [arg.data for arg in args[3:] if isinstance(arg, op2.Arg) and arg._is_dat]
+            if len(dats) > 1:
+                yield functools.partial(_coalesced_par_loop, loop, dats)
+            else:
+                yield loop
         except MapValueError:
             raise RuntimeError("Integral measure does not match measure of all coefficients/arguments")
 
@@ -583,7 +721,14 @@ def _assemble(f, tensor=None, bcs=None, form_compiler_parameters=None,
             else:
                 raise NotImplementedError("Undefined type of bcs class provided.")
 
-    if bcs is not None and is_vec:
+    if bcs is not None and diagonal:
+        for bc in bcs:
+            if isinstance(bc, DirichletBC):
+                yield functools.partial(_apply_bc_to_diagonal, result_function, bc,
+                                        diagonal == "block")
+            else:
+                raise NotImplementedError("Diagonal assembly with EquationBCs not implemented")
+    elif bcs is not None and is_vec:
         for bc in bcs:
             if isinstance(bc, DirichletBC):
                 if assemble_now:
@@ -1,8 +1,11 @@
 from firedrake.petsc import PETSc
-from pyop2.mpi import COMM_WORLD, dup_comm, free_comm
+from pyop2.mpi import COMM_WORLD, MPI, dup_comm, free_comm
+from pyop2.datatypes import IntType
+from firedrake import dmplex
 from firedrake import hdf5interface as h5i
 import firedrake
 import numpy as np
+import ufl
 import os
 import h5py
 
@@ -335,12 +338,7 @@ class HDF5File(object):
         except NameError:  # the error you get if h5py isn't compiled against parallel HDF5
             raise RuntimeError("h5py *must* be installed with MPI support")
 
-        if file_mode == 'r':
-            nprocs = self.attributes('/')['nprocs']
-            if nprocs != self.comm.size:
-                raise ValueError("Process mismatch: written on %d, have %d" %
-                                 (nprocs, self.comm.size))
-        else:
+        if file_mode != 'r':
             self.attributes('/')['nprocs'] = self.comm.size
 
     def _set_timestamp(self, t):
@@ -376,13 +374,18 @@ class HDF5File(object):
         r"""Flush any pending writes."""
         self._h5file.flush()
 
-    def write(self, function, path, timestamp=None):
+    def write(self, function, path, timestamp=None, natural_ordering=False):
         r"""Store a function in the checkpoint file.
 
         :arg function: The function to store.
         :arg path: the path to store the function under.
         :arg timestamp: timestamp associated with function, or None for
                         stationary data
+        :arg natural_ordering: Store the function data in an order
+            independent of the parallel distribution of the mesh?  Such
+            data can be read back on a different number of processes,
+            provided the mesh is constructed identically (from the
+            same serial mesh).
         """
         if self._mode == 'r':
             raise IOError("Cannot store to checkpoint opened with mode 'FILE_READ'")
@@ -393,15 +396,18 @@ class HDF5File(object):
             suffix = "/%.15e" % timestamp
             path = path + suffix
 
-        with function.dat.vec_ro as v:
-            dset = self._h5file.create_dataset(path, shape=(v.getSize(),), dtype=function.dat.dtype)
-
-            # Another MPI/non-MPI difference
-            try:
-                with dset.collective:
+        if natural_ordering:
+            self._write_natural(function, path)
+        else:
+            with function.dat.vec_ro as v:
+                dset = self._h5file.create_dataset(path, shape=(v.getSize(),), dtype=function.dat.dtype)
+
+                # Another MPI/non-MPI difference
+                try:
+                    with dset.collective:
+                        dset[slice(*v.getOwnershipRange())] = v.array_r
+                except AttributeError:
                     dset[slice(*v.getOwnershipRange())] = v.array_r
-            except AttributeError:
-                dset[slice(*v.getOwnershipRange())] = v.array_r
 
         if timestamp is not None:
             attr = self.attributes(path)
@@ -420,10 +426,203 @@ class HDF5File(object):
             suffix = "/%.15e" % timestamp
             path = path + suffix
 
+        if self.attributes(path).get("natural_ordering", False):
+            self._read_natural(function, path)
+            return
+        nprocs = self.attributes('/')['nprocs']
+        if nprocs != self.comm.size:
+            raise ValueError("Process mismatch: written on %d, have %d" %
+                             (nprocs, self.comm.size))
         with function.dat.vec_wo as v:
             dset = self._h5file[path]
             v.array[:] = dset[slice(*v.getOwnershipRange())]
 
+    def _write_natural(self, function, path):
+        r"""Store a function in natural (distribution independent) order.
+
+        :arg function: The function to store.
+        :arg path: the path to store the function under.
+        """
+        split = function.split()
+        if len(split) > 1:
+            for i, f in enumerate(split):
+                self._write_natural(f, "%s/%d" % (path, i))
+            self.attributes(path)["natural_ordering"] = True
+            self.attributes(path)["nsplit"] = len(split)
+            return
+        sf, nroots, size, start = natural_ordering_sf(function.function_space())
+        data = function.dat.data_ro.reshape(function.dat.dataset.size, -1)
+        rootdata = np.empty((nroots, data.shape[1]), dtype=data.dtype)
+        dmplex.sf_reduce(sf, _contiguous_type(data), np.ascontiguousarray(data), rootdata)
+
+        dset = self._h5file.create_dataset(path, shape=(size, data.shape[1]), dtype=data.dtype)
+        try:
+            with dset.collective:
+                dset[start:start + nroots] = rootdata
+        except AttributeError:
+            dset[start:start + nroots] = rootdata
+        attrs = self.attributes(path)
+        attrs["natural_ordering"] = True
+        mesh = function.function_space().mesh().topology
+        if not mesh._natural_points_canonical:
+            attrs["nprocs"] = self.comm.size
+
+    def _read_natural(self, function, path):
+        r"""Load a function stored in natural order.
+
+        :arg function: The function to load values into.
+        :arg path: the path under which the function is stored.
+        """
+        split = function.split()
+        attrs = self.attributes(path)
+        if len(split) != attrs.get("nsplit", 1):
+            raise ValueError("Function at '%s' has a different number of components" % path)
+        if len(split) > 1:
+            for i, f in enumerate(split):
+                self._read_natural(f, "%s/%d" % (path, i))
+            return
+        # Meshes not distributed from a serial mesh can only be read
+        # back on the same number of processes.
+        nprocs = attrs.get("nprocs", self.comm.size)
+        if nprocs != self.comm.size:
+            raise ValueError("Process mismatch: written on %d, have %d" %
+                             (nprocs, self.comm.size))
+        sf, nroots, size, start = natural_ordering_sf(function.function_space())
+        dset = self._h5file[path]
+        data = function.dat.data.reshape(function.dat.dataset.size, -1)
+        if dset.shape != (size, data.shape[1]):
+            raise ValueError("Function at '%s' has shape %s, expected %s"
+                             % (path, dset.shape, (size, data.shape[1])))
+        rootdata = np.empty((nroots, data.shape[1]), dtype=data.dtype)
+        try:
+            with dset.collective:
+                rootdata[:] = dset[start:start + nroots]
+        except AttributeError:
+            rootdata[:] = dset[start:start + nroots]
+        leafdata = np.empty_like(data)
+        dmplex.sf_bcast(sf, _contiguous_type(data), rootdata, leafdata)
+        data[:] = leafdata
+
+    def write_series(self, functions, path, timestamp, ring_size=None,
+                     compression=None, chunk_size=2**16):
+        r"""Store a timestep of several functions in the checkpoint file.
+
+        Each function is stored as one row of a chunked, extendible
+        dataset ``path/<function name>`` with one row per timestep,
+        rather than as a new dataset per function per timestamp.
+        Storage is preallocated (doubling as needed), so that storing
+        a timestep does not create new datasets.  The timestamps are
+        recorded in the dataset ``path/timestamps``, which provides
+        an index for :meth:`read_series`.
+
+        :arg functions: a :class:`~.Function`, or an iterable of
+            (uniquely named) :class:`~.Function`\s to store.
+        :arg path: the path of the group to store the functions under.
+        :arg timestamp: timestamp associated with the functions.
+        :arg ring_size: optional maximum number of timesteps to keep.
+            Once reached, the oldest timestep is overwritten.  Must
+            be the same for every write to ``path``.
+        :arg compression: optional compression filter (e.g.
+            ``"gzip"``), passed directly to h5py.  In parallel this
+            requires HDF5 (1.10.2 or newer) to support collective
+            writes of filtered datasets.
+        :arg chunk_size: maximum number of entries in each chunk of
+            a dataset.  Chunks never span timesteps.
+        """
+        if self._mode == 'r':
+            raise IOError("Cannot store to checkpoint opened with mode 'FILE_READ'")
+        functions = _series_functions(functions)
+
+        group = self._h5file.require_group(path)
+        attrs = group.attrs
+        if "count" not in attrs:
+            attrs["count"] = 0
+            attrs["ring_size"] = ring_size or 0
+            group.create_dataset("timestamps", shape=(ring_size or 1, ),
+                                 maxshape=(ring_size, ), dtype=np.float64,
+                                 fillvalue=np.nan)
+        elif attrs["ring_size"] != (ring_size or 0):
+            raise ValueError("Series at '%s' has ring size %d, not %d" %
+                             (path, attrs["ring_size"], ring_size or 0))
+        count = int(attrs["count"])
+        step = count % ring_size if ring_size else count
+        index = group["timestamps"]
+        nrows = index.shape[0]
+        if step >= nrows:
+            nrows = max(step + 1, 2*nrows)
+            index.resize(nrows, axis=0)
+
+        for name, function in functions:
+            with function.dat.vec_ro as v:
+                size = v.getSize()
+                dset = group.get(name)
+                if dset is None:
+                    dset = group.create_dataset(name, shape=(nrows, size),
+                                                maxshape=(ring_size, size),
+                                                chunks=(1, max(min(size, chunk_size), 1)),
+                                                dtype=function.dat.dtype,
+                                                compression=compression)
+                elif dset.shape[1] != size:
+                    raise ValueError("Function '%s' has %d entries, series at '%s' has %d" %
+                                     (name, size, path, dset.shape[1]))
+                if dset.shape[0] < nrows:
+                    dset.resize(nrows, axis=0)
+                rows = slice(*v.getOwnershipRange())
+                try:
+                    with dset.collective:
+                        dset[step, rows] = v.array_r
+                except AttributeError:
+                    dset[step, rows] = v.array_r
+
+        index[step] = timestamp
+        attrs["count"] = count + 1
+
+    def read_series(self, functions, path, timestamp):
+        r"""Load a timestep of several functions from the checkpoint file.
+
+        :arg functions: a :class:`~.Function`, or an iterable of
+            :class:`~.Function`\s to load values into, looked up by
+            name.
+        :arg path: the path of the group the functions were stored
+            under with :meth:`write_series`.
+        :arg timestamp: the timestamp to load.
+        :raises KeyError: if no timestep with the given timestamp is
+            stored.
+        """
+        nprocs = self.attributes('/')['nprocs']
+        if nprocs != self.comm.size:
+            raise ValueError("Process mismatch: written on %d, have %d" %
+                             (nprocs, self.comm.size))
+        group = self._h5file[path]
+        index = group["timestamps"][:]
+        step, = np.nonzero(index == timestamp)
+        if len(step) == 0:
+            raise KeyError("No timestamp %r in series at '%s'" % (timestamp, path))
+        step = step[0]
+        for name, function in _series_functions(functions):
+            dset = group[name]
+            with function.dat.vec_wo as v:
+                rows = slice(*v.getOwnershipRange())
+                try:
+                    with dset.collective:
+                        v.array[:] = dset[step, rows]
+                except AttributeError:
+                    v.array[:] = dset[step, rows]
+
+    def get_series_timestamps(self, path):
+        r"""Get the timestamps stored in a series, oldest first.
+
+        :arg path: the path of the group the series was stored under
+            with :meth:`write_series`.
+        """
+        group = self._h5file[path]
+        count = int(group.attrs["count"])
+        ring_size = int(group.attrs["ring_size"])
+        timestamps = group["timestamps"][:]
+        if ring_size and count > ring_size:
+            return np.roll(timestamps, -(count % ring_size))
+        return timestamps[:count]
+
     def attributes(self, obj):
         r""":arg obj: The path to the group."""
         return self._h5file[obj].attrs
@@ -439,3 +638,140 @@ class HDF5File(object):
         if hasattr(self, "comm"):
             free_comm(self.comm)
             del self.comm
+
+
+def _series_functions(functions):
+    r"""Return a list of ``(name, function)`` pairs, checking that the
+    names are unique."""
+    if isinstance(functions, firedrake.Function):
+        functions = [functions]
+    functions = [(f.name(), f) for f in functions]
+    if not all(isinstance(f, firedrake.Function) for _, f in functions):
+        raise ValueError("Can only store functions")
+    if len(set(name for name, _ in functions)) != len(functions):
+        raise ValueError("Functions in a series must have unique names")
+    if any(name == "timestamps" for name, _ in functions):
+        raise ValueError("Function name 'timestamps' is reserved in a series")
+    return functions
+
+
+def _block_starts(size, comm):
+    r"""Return the start of each process's block when distributing
+    ``size`` items in contiguous blocks of near equal size."""
+    sizes = np.full(comm.size, size // comm.size, dtype=IntType)
+    sizes[:size % comm.size] += 1
+    return np.concatenate(([0], np.cumsum(sizes))).astype(IntType)
+
+
+def _contiguous_type(data):
+    r"""MPI datatype for one row of a 2D array."""
+    return MPI._typedict[data.dtype.char].Create_contiguous(data.shape[1]).Commit()
+
+
+def _canonical_entity_indices(V, points):
+    r"""Number the nodes on each mesh entity independently of the
+    parallel distribution.
+
+    The nodes on an entity are stored in an order determined by the
+    (distribution dependent) global vertex numbering.  Instead, order
+    them lexicographically by their physical coordinates.
+
+    :arg V: a (non-mixed) function space.
+    :arg points: the natural number of the entity each owned node
+        lives on.
+    :returns: the index of each owned node among the nodes of its
+        entity.
+    """
+    element = V.ufl_element()
+    if isinstance(element, (ufl.VectorElement, ufl.TensorElement)):
+        element = element.sub_elements()[0]
+    if element.family() not in {"Lagrange", "Discontinuous Lagrange", "Q", "DQ"}:
+        raise NotImplementedError("Natural ordering of %s spaces with more than one node per entity not implemented"
+                                  % element.family())
+    mesh = V.mesh()
+    coords = firedrake.interpolate(firedrake.SpatialCoordinate(mesh),
+                                   firedrake.VectorFunctionSpace(mesh, element))
+    x = coords.dat.data_ro.reshape(-1, mesh.geometric_dimension())[:len(points)]
+
+    order = np.argsort(points, kind="stable")
+    spoints = points[order]
+    sx = x[order]
+    starts = np.flatnonzero(np.concatenate(([True], spoints[1:] != spoints[:-1])))
+    counts = np.diff(np.concatenate((starts, [len(spoints)])))
+    if len(starts) == 0:
+        return np.empty(0, dtype=IntType)
+    # Quantise the coordinates relative to the extent of each entity's
+    # nodes, so that round-off in computing them does not change the
+    # order.  Distinct nodes on an entity are a sizeable fraction of
+    # this extent apart.
+    lo = np.minimum.reduceat(sx, starts, axis=0)
+    hi = np.maximum.reduceat(sx, starts, axis=0)
+    scale = np.repeat((hi - lo).max(axis=1), counts) * 1e-6
+    scale[scale == 0] = 1
+    q = np.rint((sx - np.repeat(lo, counts, axis=0)) / scale[:, None]).astype(np.int64)
+    # np.lexsort sorts by the last key first.
+    perm = np.lexsort([q[:, d] for d in reversed(range(q.shape[1]))] + [spoints])
+    indices = np.empty(len(points), dtype=IntType)
+    indices[order[perm]] = np.arange(len(points), dtype=IntType) - np.repeat(starts, counts)
+    return indices
+
+
+def natural_ordering_sf(V):
+    r"""Build a star forest from the owned nodes of a function space to
+    their natural, distribution independent, numbering.
+
+    Nodes are numbered by the natural number of the mesh entity they
+    live on, and then by their index on that entity.  The order of the
+    nodes on an entity depends on the distribution, so where an
+    entity carries more than one node they are instead ordered by
+    their physical coordinates (see :func:`_canonical_entity_indices`).
+    The natural numbering is distributed over the processes in
+    contiguous blocks.
+
+    :arg V: a (non-mixed) function space.
+    :returns: a tuple ``(sf, nroots, size, start)``; the SF with the
+        owned nodes as leaves, the number of naturally numbered nodes
+        on this process, the global number of nodes and the first
+        natural node number on this process.
+    """
+    cache = V.topological.__dict__.setdefault("_natural_ordering_sf", {})
+    try:
+        return cache[None]
+    except KeyError:
+        pass
+    mesh = V.mesh().topology
+    if mesh.cell_set._extruded:
+        raise NotImplementedError("Natural ordering not implemented for extruded meshes")
+    comm = mesh.comm
+    nowned = V.node_set.size
+    points, indices = dmplex.natural_node_keys(V._shared_data.global_numbering,
+                                               mesh._natural_points)
+    points = points[:nowned]
+    indices = indices[:nowned]
+    if comm.allreduce(int(indices.max(initial=0)), op=MPI.MAX) > 0:
+        indices = _canonical_entity_indices(V, points)
+
+    # Count the nodes on each natural point at its natural owner, and
+    # from this compute the first natural node number of each point.
+    npoints = comm.allreduce(int(mesh._natural_points.max(initial=-1)) + 1, op=MPI.MAX)
+    point_starts = _block_starts(npoints, comm)
+    upoints, counts = np.unique(points, return_counts=True)
+    owners = (np.searchsorted(point_starts, upoints, side="right") - 1).astype(IntType)
+    sf = dmplex.create_sf(comm, point_starts[comm.rank + 1] - point_starts[comm.rank],
+                          owners, (upoints - point_starts[owners]).astype(IntType))
+    itype = MPI._typedict[np.dtype(IntType).char]
+    root_counts = np.zeros(point_starts[comm.rank + 1] - point_starts[comm.rank], dtype=IntType)
+    dmplex.sf_reduce(sf, itype, counts.astype(IntType), root_counts)
+    root_offsets = np.cumsum(root_counts, dtype=IntType) - root_counts
+    root_offsets += comm.exscan(int(root_counts.sum())) or 0
+    offsets = np.empty(len(upoints), dtype=IntType)
+    dmplex.sf_bcast(sf, itype, root_offsets, offsets)
+    sf.destroy()
+
+    natural = offsets[np.searchsorted(upoints, points)] + indices
+    size = comm.allreduce(nowned)
+    node_starts = _block_starts(size, comm)
+    owners = (np.searchsorted(node_starts, natural, side="right") - 1).astype(IntType)
+    nroots = node_starts[comm.rank + 1] - node_starts[comm.rank]
+    sf = dmplex.create_sf(comm, nroots, owners, (natural - node_starts[owners]).astype(IntType))
+    return cache.setdefault(None, (sf, nroots, size, node_starts[comm.rank]))
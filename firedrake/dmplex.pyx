@@ -2254,6 +2254,159 @@ def halo_end(PETSc.SF sf, dat, MPI.Datatype dtype, reverse, MPI.Op op=MPI.SUM):
                                <void *>buf.data))
 
 
+def compact_sf(PETSc.SF sf):
+    """Compact a (pruned) SF to act on contiguous buffers.
+
+    :arg sf: The PETSc SF to compact, see :func:`prune_sf`.
+    :returns: a tuple ``(compact_sf, roots, leaves)``.  ``roots`` are
+        the local points referenced by some remote leaf and ``leaves``
+        the leaves of ``sf``; the roots and leaves of ``compact_sf``
+        are entries of buffers packed with the data at these points,
+        in order.
+    """
+    cdef:
+        PetscInt nroots, nleaves, i
+        PetscInt *ilocal = NULL
+        PetscSFNode *iremote = NULL
+        PetscSFNode *new_iremote = NULL
+        MPI.Datatype itype = MPI.INT
+        MPI.Op sum = MPI.SUM
+        np.ndarray[np.int32_t, ndim=1, mode="c"] rootdata
+        np.ndarray[np.int32_t, ndim=1, mode="c"] leafdata
+        np.ndarray[PetscInt, ndim=1, mode="c"] leaves
+        np.ndarray[PetscInt, ndim=1, mode="c"] roots
+        PETSc.SF csf
+
+    CHKERR(PetscSFGetGraph(sf.sf, &nroots, &nleaves, &ilocal, &iremote))
+    leaves = np.empty(nleaves, dtype=IntType)
+    for i in range(nleaves):
+        if ilocal != NULL:
+            leaves[i] = ilocal[i]
+        else:
+            leaves[i] = i
+
+    # Find the roots referenced by some leaf
+    leafdata = np.zeros(max(leaves.max(initial=-1) + 1, 1), dtype=np.int32)
+    leafdata[leaves] = 1
+    rootdata = np.zeros(max(nroots, 1), dtype=np.int32)
+    CHKERR(PetscSFReduceBegin(sf.sf, itype.ob_mpi, <const void *>leafdata.data,
+                              <void *>rootdata.data, sum.ob_mpi))
+    CHKERR(PetscSFReduceEnd(sf.sf, itype.ob_mpi, <const void *>leafdata.data,
+                            <void *>rootdata.data, sum.ob_mpi))
+    roots = np.flatnonzero(rootdata[:nroots]).astype(IntType)
+
+    # Send the position of each root in the packed buffer to the leaves
+    rootdata[:] = -1
+    rootdata[roots] = np.arange(len(roots), dtype=np.int32)
+    CHKERR(PetscSFBcastBegin(sf.sf, itype.ob_mpi, <const void *>rootdata.data,
+                             <void *>leafdata.data))
+    CHKERR(PetscSFBcastEnd(sf.sf, itype.ob_mpi, <const void *>rootdata.data,
+                           <void *>leafdata.data))
+
+    CHKERR(PetscMalloc1(nleaves, &new_iremote))
+    for i in range(nleaves):
+        new_iremote[i].rank = iremote[i].rank
+        new_iremote[i].index = leafdata[leaves[i]]
+
+    csf = PETSc.SF().create(comm=sf.comm)
+    CHKERR(PetscSFSetGraph(csf.sf, len(roots), nleaves,
+                           NULL, PETSC_OWN_POINTER,
+                           new_iremote, PETSC_OWN_POINTER))
+    return csf, roots, leaves
+
+
+def expand_sf(PETSc.SF sf, PetscInt cdim):
+    """Expand an SF to act on each of ``cdim`` contiguous entries
+    per point.
+
+    :arg sf: The PETSc SF to expand.
+    :arg cdim: The number of entries per point.
+    :returns: an SF whose root (leaf) ``p*cdim + k`` is entry ``k``
+        of root (leaf) ``p`` of ``sf``.
+
+    Exchanges over the expanded SF use a builtin MPI datatype, for
+    which MPI implements the reduction ops natively, rather than a
+    contiguous derived datatype.
+    """
+    cdef:
+        PetscInt nroots, nleaves, i, k, leaf
+        PetscInt *ilocal = NULL
+        PetscInt *new_ilocal = NULL
+        PetscSFNode *iremote = NULL
+        PetscSFNode *new_iremote = NULL
+        PETSc.SF expanded_sf
+
+    CHKERR(PetscSFGetGraph(sf.sf, &nroots, &nleaves, &ilocal, &iremote))
+
+    CHKERR(PetscMalloc1(nleaves*cdim, &new_ilocal))
+    CHKERR(PetscMalloc1(nleaves*cdim, &new_iremote))
+    for i in range(nleaves):
+        if ilocal != NULL:
+            leaf = ilocal[i]
+        else:
+            leaf = i
+        for k in range(cdim):
+            new_ilocal[i*cdim + k] = leaf*cdim + k
+            new_iremote[i*cdim + k].rank = iremote[i].rank
+            new_iremote[i*cdim + k].index = iremote[i].index*cdim + k
+
+    expanded_sf = PETSc.SF().create(comm=sf.comm)
+    CHKERR(PetscSFSetGraph(expanded_sf.sf, nroots*cdim, nleaves*cdim,
+                           new_ilocal, PETSC_OWN_POINTER,
+                           new_iremote, PETSC_OWN_POINTER))
+    return expanded_sf
+
+
+def sf_begin(PETSc.SF sf, np.ndarray rootbuf, np.ndarray leafbuf,
+             MPI.Datatype dtype, reverse, MPI.Op op=MPI.SUM):
+    """Begin an exchange between separate root and leaf buffers.
+
+    :arg sf: the PETSc SF to use for exchanges
+    :arg rootbuf: the root data
+    :arg leafbuf: the leaf data
+    :arg dtype: an MPI datatype describing the unit of data
+    :arg reverse: should a reverse (leaf-to-root) exchange be
+        performed.
+
+    Forward exchanges are implemented using ``PetscSFBcastBegin``,
+    reverse exchanges with ``PetscSFReduceBegin``.
+    """
+    if reverse:
+        CHKERR(PetscSFReduceBegin(sf.sf, dtype.ob_mpi,
+                                  <const void *>leafbuf.data,
+                                  <void *>rootbuf.data,
+                                  op.ob_mpi))
+    else:
+        CHKERR(PetscSFBcastBegin(sf.sf, dtype.ob_mpi,
+                                 <const void *>rootbuf.data,
+                                 <void *>leafbuf.data))
+
+
+def sf_end(PETSc.SF sf, np.ndarray rootbuf, np.ndarray leafbuf,
+           MPI.Datatype dtype, reverse, MPI.Op op=MPI.SUM):
+    """End an exchange between separate root and leaf buffers.
+
+    :arg sf: the PETSc SF to use for exchanges
+    :arg rootbuf: the root data
+    :arg leafbuf: the leaf data
+    :arg dtype: an MPI datatype describing the unit of data
+    :arg reverse: should a reverse (leaf-to-root) exchange be
+        performed.
+
+    Forward exchanges are implemented using ``PetscSFBcastEnd``,
+    reverse exchanges with ``PetscSFReduceEnd``.
+    """
+    if reverse:
+        CHKERR(PetscSFReduceEnd(sf.sf, dtype.ob_mpi,
+                                <const void *>leafbuf.data,
+                                <void *>rootbuf.data,
+                                op.ob_mpi))
+    else:
+        CHKERR(PetscSFBcastEnd(sf.sf, dtype.ob_mpi,
+                               <const void *>rootbuf.data,
+                               <void *>leafbuf.data))
+
+
 cdef int DMPlexGetAdjacency_Facet_Support(PETSc.PetscDM dm,
                                           PetscInt p,
                                           PetscInt *adjSize,
@@ -2369,3 +2522,104 @@ def clear_adjacency_callback(PETSc.DM dm not None):
         dm.removeLabel("ghost_region")
         CHKERR(DMLabelDestroy(&label))
     CHKERR(DMPlexSetAdjacencyUser(dm.dm, NULL, NULL))
+
+
+def create_sf(comm, PetscInt nroots,
+              np.ndarray[PetscInt, ndim=1, mode="c"] remote_ranks,
+              np.ndarray[PetscInt, ndim=1, mode="c"] remote_indices):
+    """Create a star forest with contiguous leaves.
+
+    :arg comm: The communicator for the SF.
+    :arg nroots: The number of roots on this process.
+    :arg remote_ranks: The owning rank of the root of each leaf.
+    :arg remote_indices: The index on the owning rank of the root of
+        each leaf.
+    :returns: a PETSc SF.
+    """
+    cdef:
+        PetscInt i, nleaves
+        PetscSFNode *iremote = NULL
+        PETSc.SF sf
+
+    nleaves = remote_ranks.shape[0]
+    assert remote_indices.shape[0] == nleaves
+    CHKERR(PetscMalloc1(nleaves, &iremote))
+    for i in range(nleaves):
+        iremote[i].rank = remote_ranks[i]
+        iremote[i].index = remote_indices[i]
+
+    sf = PETSc.SF().create(comm=comm)
+    CHKERR(PetscSFSetGraph(sf.sf, nroots, nleaves,
+                           NULL, PETSC_OWN_POINTER,
+                           iremote, PETSC_OWN_POINTER))
+    return sf
+
+
+def sf_bcast(PETSc.SF sf, MPI.Datatype dtype, np.ndarray rootdata, np.ndarray leafdata):
+    """Broadcast data from the roots to the leaves of a star forest.
+
+    :arg sf: The PETSc SF.
+    :arg dtype: an MPI datatype describing the unit of data.
+    :arg rootdata: contiguous array of root data.
+    :arg leafdata: contiguous array to receive the leaf data.
+    """
+    assert rootdata.flags.c_contiguous and leafdata.flags.c_contiguous
+    CHKERR(PetscSFBcastBegin(sf.sf, dtype.ob_mpi,
+                             <const void *>rootdata.data,
+                             <void *>leafdata.data))
+    CHKERR(PetscSFBcastEnd(sf.sf, dtype.ob_mpi,
+                           <const void *>rootdata.data,
+                           <void *>leafdata.data))
+
+
+def sf_reduce(PETSc.SF sf, MPI.Datatype dtype, np.ndarray leafdata, np.ndarray rootdata,
+              MPI.Op op=MPI.REPLACE):
+    """Reduce data from the leaves onto the roots of a star forest.
+
+    :arg sf: The PETSc SF.
+    :arg dtype: an MPI datatype describing the unit of data.
+    :arg leafdata: contiguous array of leaf data.
+    :arg rootdata: contiguous array of root data, updated in place.
+    :arg op: the reduction operation.
+    """
+    assert rootdata.flags.c_contiguous and leafdata.flags.c_contiguous
+    CHKERR(PetscSFReduceBegin(sf.sf, dtype.ob_mpi,
+                              <const void *>leafdata.data,
+                              <void *>rootdata.data,
+                              op.ob_mpi))
+    CHKERR(PetscSFReduceEnd(sf.sf, dtype.ob_mpi,
+                            <const void *>leafdata.data,
+                            <void *>rootdata.data,
+                            op.ob_mpi))
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def natural_node_keys(PETSc.Section section,
+                      np.ndarray[PetscInt, ndim=1, mode="c"] natural_points):
+    """Build process independent keys for the nodes of a section.
+
+    :arg section: Section describing the node layout on the plex points.
+    :arg natural_points: The natural (process independent) number of
+        each plex point.
+    :returns: a tuple ``(points, indices)`` giving, for each node, the
+        natural number of the plex point it lives on and its index
+        among the nodes of that point.
+    """
+    cdef:
+        PetscInt c, p, pStart, pEnd, dof, off
+        np.ndarray[PetscInt, ndim=1, mode="c"] points
+        np.ndarray[PetscInt, ndim=1, mode="c"] indices
+
+    points = np.empty(section.getStorageSize(), dtype=IntType)
+    indices = np.empty(section.getStorageSize(), dtype=IntType)
+    pStart, pEnd = section.getChart()
+
+    for p in range(pStart, pEnd):
+        CHKERR(PetscSectionGetDof(section.sec, p, &dof))
+        if dof > 0:
+            CHKERR(PetscSectionGetOffset(section.sec, p, &off))
+            for c in range(dof):
+                points[off + c] = natural_points[p]
+                indices[off + c] = c
+    return points, indices
@@ -1,5 +1,7 @@
 from pyop2.mpi import MPI
 
+from firedrake.halo import _get_contiguous_mtype
+
 __all__ = ("Ensemble", )
 
 
@@ -34,6 +36,41 @@ class Ensemble(object):
         assert self.comm.size == M
         assert self.ensemble_comm.size == (size // M)
 
+    def _check_function(self, f, g=None):
+        """
+        Check that functions are defined on the spatial communicator.
+
+        :arg f: a :class:`.Function`.
+        :arg g: an optional second :class:`.Function` which must match
+            ``f``.
+        :raises ValueError: if communicators mismatch, or function sizes mismatch.
+        """
+        if MPI.Comm.Compare(f.comm, self.comm) not in {MPI.CONGRUENT, MPI.IDENT}:
+            raise ValueError("Function communicator does not match space communicator")
+        if g is not None:
+            if MPI.Comm.Compare(g.comm, f.comm) not in {MPI.CONGRUENT, MPI.IDENT}:
+                raise ValueError("Mismatching communicators for functions")
+            if [d.data_ro.shape for d in f.dat] != [d.data_ro.shape for d in g.dat]:
+                raise ValueError("Mismatching sizes")
+
+    def _function_mtype(self, f, readonly=False):
+        """
+        Build an MPI datatype describing the data of all the components
+        of a function at their absolute addresses, so that it can be
+        sent and received as a single message (with buffer
+        ``MPI.BOTTOM``).  The caller must free the datatype.
+
+        :arg f: a :class:`.Function`.
+        :arg readonly: is the data only to be read (sent)?
+        """
+        arrays = [dat.data_ro if readonly else dat.data for dat in f.dat]
+        btype, _ = _get_contiguous_mtype(arrays[0].dtype, 1)
+        mtype = MPI.Datatype.Create_struct([a.size for a in arrays],
+                                           [a.ctypes.data for a in arrays],
+                                           [btype]*len(arrays))
+        mtype.Commit()
+        return mtype
+
     def allreduce(self, f, f_reduced, op=MPI.SUM):
         """
         Allreduce a function f into f_reduced over :attr:`ensemble_comm`.
@@ -54,6 +91,59 @@ class Ensemble(object):
             self.ensemble_comm.Allreduce(vin.array_r, vout.array, op=op)
         return f_reduced
 
+    def iallreduce(self, f, f_reduced, op=MPI.SUM):
+        """
+        Allreduce (non-blocking) a function f into f_reduced over
+        :attr:`ensemble_comm`.
+
+        The reduction operates directly on the data of the functions,
+        which must not be accessed until the requests have completed.
+
+        Returns a list of Request objects, one for each component of
+        the function.
+
+        :arg f: The a :class:`.Function` to allreduce.
+        :arg f_reduced: the result of the reduction.
+        :arg op: MPI reduction operator.
+        :raises ValueError: if communicators mismatch, or function sizes mismatch.
+        """
+        self._check_function(f, f_reduced)
+        return [self.ensemble_comm.Iallreduce(fdat.data_ro, rdat.data, op=op)
+                for fdat, rdat in zip(f.dat, f_reduced.dat)]
+
+    def bcast(self, f, root=0):
+        """
+        Broadcast (blocking) a function f over :attr:`ensemble_comm` from
+        an ensemble rank.
+
+        :arg f: The a :class:`.Function` to broadcast.
+        :arg root: the rank to broadcast from.
+        :raises ValueError: if the function communicator mismatches.
+        """
+        self._check_function(f)
+        for dat in f.dat:
+            self.ensemble_comm.Bcast(dat.data, root=root)
+        return f
+
+    def ibcast(self, f, root=0):
+        """
+        Broadcast (non-blocking) a function f over :attr:`ensemble_comm`
+        from an ensemble rank.
+
+        The broadcast operates directly on the data of the function,
+        which must not be accessed until the requests have completed.
+
+        Returns a list of Request objects, one for each component of
+        the function.
+
+        :arg f: The a :class:`.Function` to broadcast.
+        :arg root: the rank to broadcast from.
+        :raises ValueError: if the function communicator mismatches.
+        """
+        self._check_function(f)
+        return [self.ensemble_comm.Ibcast(dat.data, root=root)
+                for dat in f.dat]
+
     def __del__(self):
         if hasattr(self, "comm"):
             self.comm.Free()
@@ -62,54 +152,92 @@ class Ensemble(object):
             self.ensemble_comm.Free()
             del self.ensemble_comm
 
-    def send(self, f, rank, tag=0):
+    def send(self, f, dest, tag=0):
         """
         Send (blocking) a function f over :attr:`ensemble_comm` to another
         ensemble rank.
 
+        All the components of the function are sent in one message.
+
         :arg f: The a :class:`.Function` to send
         :arg dest: the rank to send to
         :arg tag: the tag of the message
+        :raises ValueError: if the function communicator mismatches.
         """
-
-        raise NotImplementedError("Ensemble send not implemented")
-
-    def recv(self, f, source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG):
+        self._check_function(f)
+        mtype = self._function_mtype(f, readonly=True)
+        try:
+            self.ensemble_comm.Send([MPI.BOTTOM, 1, mtype], dest=dest, tag=tag)
+        finally:
+            mtype.Free()
+
+    def recv(self, f, source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=None):
         """
         Receive (blocking) a function f over :attr:`ensemble_comm` from
         another ensemble rank.
 
+        All the components of the function are received in one
+        message, so a message from a single sender is received even
+        if ``source`` or ``tag`` are wildcards.
+
         :arg f: The a :class:`.Function` to receive into
         :arg source: the rank to receive from
         :arg tag: the tag of the message
+        :arg status: an optional MPI Status object for the message.
+        :raises ValueError: if the function communicator mismatches.
         """
-
-        raise NotImplementedError("Ensemble recv not implemented")
+        self._check_function(f)
+        mtype = self._function_mtype(f)
+        try:
+            self.ensemble_comm.Recv([MPI.BOTTOM, 1, mtype], source=source, tag=tag, status=status)
+        finally:
+            mtype.Free()
+        return f
 
     def isend(self, f, dest, tag=0):
         """
         Send (non-blocking) a function f over :attr:`ensemble_comm` to another
         ensemble rank.
 
-        Returns a Request object.
+        The data of the function is sent without copying, in one
+        message, so it must not be modified until the request has
+        completed.
+
+        Returns a list containing the Request object.
 
         :arg f: The a :class:`.Function` to send
         :arg dest: the rank to send to
         :arg tag: the tag of the message
+        :raises ValueError: if the function communicator mismatches.
         """
-
-        raise NotImplementedError("Ensemble isend not implemented")
+        self._check_function(f)
+        mtype = self._function_mtype(f, readonly=True)
+        # Freeing the datatype does not affect the pending send.
+        try:
+            return [self.ensemble_comm.Isend([MPI.BOTTOM, 1, mtype], dest=dest, tag=tag)]
+        finally:
+            mtype.Free()
 
     def irecv(self, f, source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG):
         """
         Receive (non-blocking) a function f over :attr:`ensemble_comm` from
         another ensemble rank.
 
-        Returns a Request object.
+        The data is received directly into the function, in one
+        message, which must not be accessed until the request has
+        completed.
+
+        Returns a list containing the Request object.
 
         :arg f: The a :class:`.Function` to receive into
         :arg source: the rank to receive from
         :arg tag: the tag of the message
+        :raises ValueError: if the function communicator mismatches.
         """
-
-        raise NotImplementedError("Ensemble irecv not implemented")
+        self._check_function(f)
+        mtype = self._function_mtype(f)
+        # Freeing the datatype does not affect the pending receive.
+        try:
+            return [self.ensemble_comm.Irecv([MPI.BOTTOM, 1, mtype], source=source, tag=tag)]
+        finally:
+            mtype.Free()
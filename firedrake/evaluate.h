@@ -7,6 +7,21 @@
 extern "C" {
 #endif
 
+struct IntervalIndex {
+	/* Number of intervals */
+	int64_t n;
+
+	/* Lower and upper ends of the intervals, sorted by lower end */
+	double *lo;
+	double *hi;
+
+	/* Cell of each interval */
+	int64_t *cells;
+
+	/* Length of the longest interval */
+	double max_width;
+};
+
 struct Function {
 	/* Number of cells in the base mesh */
 	int n_cols;
@@ -28,6 +43,9 @@ struct Function {
 	/* Spatial index */
 	void *sidx;
 
+	/* Interval index, used instead of the spatial index in 1D */
+	struct IntervalIndex *iidx;
+
 	/*
 	 * TODO:
 	 * - cell orientation
@@ -56,6 +74,18 @@ extern int evaluate(struct Function *f,
 		    double *x,
 		    double *result);
 
+extern int evaluate_points(struct Function *f,
+			   double *x,
+			   PetscInt npoints,
+			   double *result,
+			   int *found);
+
+extern void evaluate_reference_points(struct Function *f,
+				      PetscInt npoints,
+				      PetscInt *cells,
+				      double *X,
+				      double *result);
+
 #ifdef __cplusplus
 }
 #endif
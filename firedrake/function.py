@@ -9,6 +9,7 @@ from pyop2 import op2
 from pyop2.datatypes import ScalarType, IntType, as_ctypes
 
 from firedrake import functionspaceimpl
+from firedrake import spatialindex
 from firedrake.logging import warning
 from firedrake import utils
 from firedrake import vector
@@ -19,7 +20,7 @@ except ImportError:
     cachetools = None
 
 
-__all__ = ['Function', 'PointNotInDomainError']
+__all__ = ['Function', 'PointEvaluator', 'PointNotInDomainError']
 
 
 class _CFunction(ctypes.Structure):
@@ -32,7 +33,8 @@ class _CFunction(ctypes.Structure):
                 # FIXME: what if f does not have type double?
                 ("f", POINTER(c_double)),
                 ("f_map", POINTER(as_ctypes(IntType))),
-                ("sidx", c_void_p)]
+                ("sidx", c_void_p),
+                ("iidx", c_void_p)]
 
 
 class CoordinatelessFunction(ufl.Coefficient):
@@ -476,7 +478,13 @@ class Function(ufl.Coefficient):
     def _ctypes(self):
         mesh = self.ufl_domain()
         c_function = self._constant_ctypes
-        c_function.sidx = mesh.spatial_index and mesh.spatial_index.ctypes
+        index = mesh.spatial_index
+        if isinstance(index, spatialindex.IntervalIndex):
+            c_function.sidx = None
+            c_function.iidx = index.ctypes
+        else:
+            c_function.sidx = index and index.ctypes
+            c_function.iidx = None
 
         # Return pointer
         return ctypes.pointer(c_function)
@@ -491,6 +499,27 @@ class Function(ufl.Coefficient):
             result.restype = c_int
             return cache.setdefault(tolerance, result)
 
+    def _c_evaluate_points(self, tolerance=None):
+        cache = self.__dict__.setdefault("_c_evaluate_points_cache", {})
+        try:
+            return cache[tolerance]
+        except KeyError:
+            result = make_c_evaluate(self, c_name="evaluate_points", tolerance=tolerance)
+            result.argtypes = [POINTER(_CFunction), POINTER(c_double), as_ctypes(IntType),
+                               POINTER(c_double), POINTER(c_int)]
+            result.restype = c_int
+            return cache.setdefault(tolerance, result)
+
+    def _c_evaluate_reference_points(self):
+        try:
+            return self.__dict__["_c_evaluate_reference_points_cache"]
+        except KeyError:
+            result = make_c_evaluate(self, c_name="evaluate_reference_points")
+            result.argtypes = [POINTER(_CFunction), as_ctypes(IntType), POINTER(as_ctypes(IntType)),
+                               POINTER(c_double), POINTER(c_double)]
+            result.restype = None
+            return self.__dict__.setdefault("_c_evaluate_reference_points_cache", result)
+
     def evaluate(self, coord, mapping, component, index_values):
         # Called by UFL when evaluating expressions at coordinates
         if component or index_values:
@@ -504,12 +533,18 @@ class Function(ufl.Coefficient):
         :arg args: Additional points.
         :kwarg dont_raise: Do not raise an error if a point is not found.
         :kwarg tolerance: Tolerance to use when checking for points in cell.
+        :kwarg redundant: If ``True`` (the default), every process
+            must pass the same points and each process searches for
+            all of them.  If ``False``, every process may pass its own
+            points, which are only sent to the processes whose part of
+            the mesh might contain them, and the values are returned
+            to the process that asked for them.  If a point is not
+            found, the error is raised on every process.
         """
         # Need to ensure data is up-to-date for reading
         self.dat._force_evaluation(read=True, write=False)
         self.dat.global_to_local_begin(op2.READ)
         self.dat.global_to_local_end(op2.READ)
-        from mpi4py import MPI
 
         if args:
             arg = (arg,) + args
@@ -518,94 +553,338 @@ class Function(ufl.Coefficient):
         dont_raise = kwargs.get('dont_raise', False)
 
         tolerance = kwargs.get('tolerance', None)
+        redundant = kwargs.get('redundant', True)
         # Handle f.at(0.3)
         if not arg.shape:
             arg = arg.reshape(-1)
 
-        mesh = self.function_space().mesh()
-        if mesh.variable_layers:
-            raise NotImplementedError("Point evaluation not implemented for variable layers")
-        # Immersed not supported
-        tdim = mesh.ufl_cell().topological_dimension()
-        gdim = mesh.ufl_cell().geometric_dimension()
-        if tdim < gdim:
-            raise NotImplementedError("Point is almost certainly not on the manifold.")
-
-        # Validate geometric dimension
-        if arg.shape[-1] == gdim:
-            pass
-        elif len(arg.shape) == 1 and gdim == 1:
-            arg = arg.reshape(-1, 1)
-        else:
-            raise ValueError("Point dimension (%d) does not match geometric dimension (%d)." % (arg.shape[-1], gdim))
-
-        # Check if we have got the same points on each process
-        root_arg = self.comm.bcast(arg, root=0)
-        same_arg = arg.shape == root_arg.shape and np.allclose(arg, root_arg)
-        diff_arg = self.comm.allreduce(int(not same_arg), op=MPI.SUM)
-        if diff_arg:
-            raise ValueError("Points to evaluate are inconsistent among processes.")
-
-        def single_eval(x, buf):
-            r"""Helper function to evaluate at a single point."""
-            err = self._c_evaluate(tolerance=tolerance)(self._ctypes,
-                                                        x.ctypes.data_as(POINTER(c_double)),
-                                                        buf.ctypes.data_as(POINTER(c_double)))
-            if err == -1:
-                raise PointNotInDomainError(self.function_space().mesh(), x.reshape(-1))
+        arg = _check_points(self.function_space().mesh(), arg, redundant=redundant)
 
         if not len(arg.shape) <= 2:
             raise ValueError("Function.at expects point or array of points.")
         points = arg.reshape(-1, arg.shape[-1])
-        value_shape = self.ufl_shape
 
         split = self.split()
         mixed = len(split) != 1
 
-        # Local evaluation
-        l_result = []
-        for i, p in enumerate(points):
-            try:
-                if mixed:
-                    l_result.append((i, tuple(f.at(p) for f in split)))
-                else:
-                    p_result = np.zeros(value_shape, dtype=float)
-                    single_eval(points[i:i+1], p_result)
-                    l_result.append((i, p_result))
-            except PointNotInDomainError:
-                # Skip point
-                pass
-
-        # Collecting the results
-        def same_result(a, b):
-            if mixed:
-                for a_, b_ in zip(a, b):
-                    if not np.allclose(a_, b_):
-                        return False
-                return True
-            else:
-                return np.allclose(a, b)
-
-        all_results = self.comm.allgather(l_result)
-        g_result = [None] * len(points)
-        for results in all_results:
-            for i, result in results:
-                if g_result[i] is None:
-                    g_result[i] = result
-                elif same_result(result, g_result[i]):
-                    pass
-                else:
-                    raise RuntimeError("Point evaluation gave different results across processes.")
+        if redundant:
+            # Local evaluation
+            l_results, found = _evaluate_split_points(split, points, tolerance)
+
+            # Collecting the results
+            g_results, found = _merge_point_values(self.comm, l_results, found)
+        else:
+            g_results, found = _route_point_values(split, points, tolerance)
 
         if not dont_raise:
-            for i in range(len(g_result)):
-                if g_result[i] is None:
-                    raise PointNotInDomainError(self.function_space().mesh(), points[i].reshape(-1))
+            missing = np.flatnonzero(~found)
+            point = points[missing[0]].reshape(-1) if len(missing) else None
+            if not redundant:
+                from mpi4py import MPI
+                # Each process has its own points, raise on all of
+                # them (with a point from the first process missing
+                # one) so that none is left in a collective.
+                root = self.comm.allreduce(self.comm.rank if len(missing) else self.comm.size,
+                                           op=MPI.MIN)
+                if root < self.comm.size:
+                    point = self.comm.bcast(point, root=root)
+            if point is not None:
+                raise PointNotInDomainError(self.function_space().mesh(), point)
+
+        if mixed:
+            g_result = [tuple(values[i] for values in g_results) if found[i] else None
+                        for i in range(len(points))]
+        else:
+            values, = g_results
+            g_result = [v if f else None for v, f in zip(values, found)]
 
         if len(arg.shape) == 1:
             g_result = g_result[0]
         return g_result
 
+    def _evaluate_points(self, points, tolerance=None):
+        r"""Evaluate this (non-mixed) function at many points on this process.
+
+        :arg points: a contiguous ``(npoints, gdim)`` array of points.
+        :kwarg tolerance: Tolerance to use when checking for points in cell.
+        :returns: a tuple ``(values, found)`` where ``values`` has
+            shape ``(npoints, ) + self.ufl_shape`` and ``found`` is a
+            boolean mask of the points located in the local part of
+            the mesh.  Values of points not found are zero.
+        """
+        points = np.ascontiguousarray(points, dtype=float)
+        npoints = len(points)
+        values = np.zeros((npoints, ) + self.ufl_shape, dtype=float)
+        found = np.zeros(npoints, dtype=np.intc)
+        if npoints:
+            self._c_evaluate_points(tolerance=tolerance)(self._ctypes,
+                                                         points.ctypes.data_as(POINTER(c_double)),
+                                                         npoints,
+                                                         values.ctypes.data_as(POINTER(c_double)),
+                                                         found.ctypes.data_as(POINTER(c_int)))
+        return values, found.astype(bool)
+
+
+def _check_points(mesh, arg, redundant=True):
+    r"""Validate an array of points to evaluate on a mesh.
+
+    :arg mesh: the mesh to evaluate on.
+    :arg arg: array of point coordinates.
+    :kwarg redundant: check that the points are the same on every process.
+    :returns: the points, reshaped to have the geometric dimension
+        as trailing extent.
+    :raises ValueError: if the points do not match the geometric
+        dimension of the mesh or differ among processes.
+    """
+    from mpi4py import MPI
+
+    if mesh.variable_layers:
+        raise NotImplementedError("Point evaluation not implemented for variable layers")
+    # Immersed not supported
+    tdim = mesh.ufl_cell().topological_dimension()
+    gdim = mesh.ufl_cell().geometric_dimension()
+    if tdim < gdim:
+        raise NotImplementedError("Point is almost certainly not on the manifold.")
+
+    # Validate geometric dimension
+    if arg.shape[-1] == gdim:
+        pass
+    elif len(arg.shape) == 1 and gdim == 1:
+        arg = arg.reshape(-1, 1)
+    else:
+        raise ValueError("Point dimension (%d) does not match geometric dimension (%d)." % (arg.shape[-1], gdim))
+
+    if not redundant:
+        return arg
+
+    # Check if we have got the same points on each process
+    root_arg = mesh.comm.bcast(arg, root=0)
+    same_arg = arg.shape == root_arg.shape and np.allclose(arg, root_arg)
+    diff_arg = mesh.comm.allreduce(int(not same_arg), op=MPI.SUM)
+    if diff_arg:
+        raise ValueError("Points to evaluate are inconsistent among processes.")
+    return arg
+
+
+def _evaluate_split_points(split, points, tolerance):
+    r"""Evaluate the components of a function at points on this process.
+
+    :arg split: the components of the function, see :meth:`Function.split`.
+    :arg points: a ``(npoints, gdim)`` array of points.
+    :arg tolerance: Tolerance to use when checking for points in cell.
+    :returns: a tuple ``(l_results, found)`` of the list of value
+        arrays, one per component, and the mask of the points found
+        in the local part of the mesh.
+    """
+    l_results = []
+    found = np.ones(len(points), dtype=bool)
+    for f in split:
+        values, f_found = f._evaluate_points(points, tolerance=tolerance)
+        l_results.append(values)
+        found &= f_found
+    return l_results, found
+
+
+def _route_point_values(split, points, tolerance):
+    r"""Evaluate the components of a function at points which differ
+    among processes.
+
+    Each point is sent only to the processes whose local part of the
+    mesh has a bounding box (padded by the tolerance) containing it,
+    evaluated there, and the values returned to the process that owns
+    the point.
+
+    :arg split: the components of the function, see :meth:`Function.split`.
+    :arg points: a ``(npoints, gdim)`` array of points on this process.
+    :arg tolerance: Tolerance to use when checking for points in cell.
+    :returns: a tuple ``(g_results, found)`` of the list of value
+        arrays, one per component, and the mask of the points found
+        on any process.
+    """
+    from firedrake.halo import _get_contiguous_mtype
+
+    mesh = split[0].function_space().mesh()
+    comm = mesh.comm
+    npoints, gdim = points.shape
+
+    # Find the candidate processes for each point
+    boxes = mesh._partition_bounding_boxes(tolerance=tolerance)
+    padding = 1e-10 * np.maximum(boxes[:, 1] - boxes[:, 0], 1)
+    send_idx = []
+    send_counts = np.zeros(comm.size, dtype=np.intc)
+    for rank, (lo, hi) in enumerate(boxes):
+        if np.any(lo > hi):
+            # No cells on this process
+            continue
+        inside = (points >= lo - padding[rank]) & (points <= hi + padding[rank])
+        idx, = np.nonzero(np.all(inside, axis=1))
+        send_idx.append(idx)
+        send_counts[rank] = len(idx)
+    send_idx = np.concatenate(send_idx) if send_idx else np.empty(0, dtype=int)
+    recv_counts = np.empty_like(send_counts)
+    comm.Alltoall(send_counts, recv_counts)
+
+    def exchange(sendbuf, send_counts, recv_counts, blocksize):
+        sendbuf = np.ascontiguousarray(sendbuf)
+        recvbuf = np.empty((recv_counts.sum(), ) + sendbuf.shape[1:], dtype=sendbuf.dtype)
+        mpi_type, _ = _get_contiguous_mtype(sendbuf.dtype, 1)
+        send_displs = np.concatenate(([0], np.cumsum(send_counts)[:-1])) * blocksize
+        recv_displs = np.concatenate(([0], np.cumsum(recv_counts)[:-1])) * blocksize
+        comm.Alltoallv([sendbuf, (send_counts * blocksize, send_displs), mpi_type],
+                       [recvbuf, (recv_counts * blocksize, recv_displs), mpi_type])
+        return recvbuf
+
+    # Evaluate the points other processes sent us and send back the values
+    recv_points = exchange(points[send_idx], send_counts, recv_counts, gdim)
+    l_results, l_found = _evaluate_split_points(split, recv_points, tolerance)
+    found = exchange(l_found.astype(np.intc), recv_counts, send_counts, 1).astype(bool)
+
+    # Each point takes its value from the first process which found it
+    idx, first = np.unique(send_idx[found], return_index=True)
+    g_found = np.zeros(npoints, dtype=bool)
+    g_found[idx] = True
+    g_results = []
+    for values in l_results:
+        value_size = int(np.prod(values.shape[1:], dtype=int))
+        values = exchange(values, recv_counts, send_counts, value_size)
+        g_values = np.zeros((npoints, ) + values.shape[1:], dtype=values.dtype)
+        g_values[idx] = values[found][first]
+        g_results.append(g_values)
+    return g_results, g_found
+
+
+def _merge_point_values(comm, l_results, found):
+    r"""Combine locally evaluated point values across processes.
+
+    Each point takes its value from the lowest ranked process which
+    found it.  Processes which also found the point check that they
+    agree with that value.
+
+    :arg comm: the communicator to merge over.
+    :arg l_results: list of local value arrays, leading dimension is
+        the number of points.
+    :arg found: boolean mask of the points found locally.
+    :returns: a tuple ``(g_results, g_found)`` of the merged values
+        and the mask of points found on any process.
+    """
+    from mpi4py import MPI
+
+    if comm.size == 1:
+        return l_results, found
+
+    owner = np.where(found, comm.rank, comm.size).astype(np.intc)
+    comm.Allreduce(MPI.IN_PLACE, owner, op=MPI.MIN)
+    mine = owner == comm.rank
+    g_results = []
+    for values in l_results:
+        g_values = values.copy()
+        g_values[~mine] = 0
+        comm.Allreduce(MPI.IN_PLACE, g_values, op=MPI.SUM)
+        g_results.append(g_values)
+
+    same_result = all(np.allclose(values[found], g_values[found])
+                      for values, g_values in zip(l_results, g_results))
+    if not comm.allreduce(same_result, op=MPI.LAND):
+        raise RuntimeError("Point evaluation gave different results across processes.")
+    return g_results, owner < comm.size
+
+
+class PointEvaluator(object):
+    r"""Evaluate functions at a fixed set of points.
+
+    The cells containing the points, and the reference coordinates of
+    the points in those cells, are computed once and reused for every
+    evaluation.  This is much cheaper than :meth:`Function.at` when
+    the same points are probed repeatedly, for example every timestep.
+
+    If the mesh is moved, call
+    :meth:`~.MeshGeometry.clear_spatial_index` and the points will be
+    located again on the next evaluation.
+    """
+
+    def __init__(self, mesh, points, tolerance=None, dont_raise=False, fill_value=np.nan):
+        r"""
+        :arg mesh: the mesh on which functions will be evaluated.
+        :arg points: array of points, the same on every process.
+        :kwarg tolerance: Tolerance to use when checking for points in cell.
+        :kwarg dont_raise: Do not raise an error if a point is not found.
+        :kwarg fill_value: value returned at points not found in the
+            domain (when ``dont_raise`` is ``True``).
+        """
+        mesh.init()
+        points = np.array(points, dtype=float)
+        if not points.shape:
+            points = points.reshape(-1)
+        points = _check_points(mesh, points)
+        if not len(points.shape) <= 2:
+            raise ValueError("PointEvaluator expects point or array of points.")
+        self.mesh = mesh
+        self.points = np.ascontiguousarray(points.reshape(-1, points.shape[-1]))
+        self.tolerance = tolerance
+        self.dont_raise = dont_raise
+        self.fill_value = fill_value
+        self._epoch = None
+
+    def _locate(self):
+        r"""Locate the points, unless they were located since the
+        last change of the mesh spatial index."""
+        mesh = self.mesh
+        if self._epoch == mesh._spatial_index_epoch:
+            return
+        from mpi4py import MPI
+
+        cells, X = mesh.locate_cells(self.points, tolerance=self.tolerance)
+
+        # Each point is evaluated on the lowest ranked process which
+        # found it.
+        comm = mesh.comm
+        owner = np.where(cells != -1, comm.rank, comm.size).astype(np.intc)
+        comm.Allreduce(MPI.IN_PLACE, owner, op=MPI.MIN)
+        self.found = owner < comm.size
+        if not self.dont_raise:
+            missing = np.flatnonzero(~self.found)
+            if len(missing):
+                raise PointNotInDomainError(mesh, self.points[missing[0]])
+        cells[owner != comm.rank] = -1
+        self.cells = cells
+        self.reference_coordinates = X
+        self._epoch = mesh._spatial_index_epoch
+
+    def evaluate(self, function):
+        r"""Evaluate a function at the points.
+
+        :arg function: the :class:`Function` to evaluate, defined on
+            :attr:`mesh`.
+        :returns: an array of shape ``(npoints, ) + function.ufl_shape``
+            or, for a mixed function, a tuple of such arrays.
+        """
+        if function.ufl_domain() != self.mesh:
+            raise ValueError("Function is not defined on the PointEvaluator mesh.")
+        from mpi4py import MPI
+
+        function.dat._force_evaluation(read=True, write=False)
+        function.dat.global_to_local_begin(op2.READ)
+        function.dat.global_to_local_end(op2.READ)
+        self._locate()
+
+        npoints = len(self.points)
+        results = []
+        for f in function.split():
+            values = np.zeros((npoints, ) + f.ufl_shape, dtype=float)
+            if npoints:
+                f._c_evaluate_reference_points()(f._ctypes, npoints,
+                                                 self.cells.ctypes.data_as(POINTER(as_ctypes(IntType))),
+                                                 self.reference_coordinates.ctypes.data_as(POINTER(c_double)),
+                                                 values.ctypes.data_as(POINTER(c_double)))
+            if self.mesh.comm.size > 1:
+                self.mesh.comm.Allreduce(MPI.IN_PLACE, values, op=MPI.SUM)
+            values[~self.found] = self.fill_value
+            results.append(values)
+
+        if len(results) == 1:
+            return results[0]
+        return tuple(results)
+
 
 class PointNotInDomainError(Exception):
     r"""Raised when attempting to evaluate a function outside its domain,
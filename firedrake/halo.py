@@ -2,7 +2,7 @@ from pyop2 import op2
 from pyop2 import utils
 from mpi4py import MPI
 import numpy
-from functools import partial
+from collections import OrderedDict
 
 from firedrake.petsc import PETSc
 import firedrake.dmplex as dmplex
@@ -19,7 +19,16 @@ def _get_mtype(dat):
 
     Also returns if it is a builtin type.
     """
-    key = (dat.dtype, dat.cdim)
+    return _get_contiguous_mtype(dat.dtype, dat.cdim)
+
+
+def _get_contiguous_mtype(dtype, cdim):
+    """Get an MPI datatype for ``cdim`` contiguous entries of numpy
+    type ``dtype``.
+
+    Also returns if it is a builtin type.
+    """
+    key = (dtype, cdim)
     try:
         return _MPI_types[key]
     except KeyError:
@@ -28,56 +37,24 @@ def _get_mtype(dat):
         except AttributeError:
             tdict = MPI._typedict
         try:
-            btype = tdict[dat.dtype.char]
+            btype = tdict[dtype.char]
         except KeyError:
-            raise RuntimeError("Unknown base type %r", dat.dtype)
-        if dat.cdim == 1:
+            raise RuntimeError("Unknown base type %r", dtype)
+        if cdim == 1:
             typ = btype
             builtin = True
         else:
-            typ = btype.Create_contiguous(dat.cdim)
+            typ = btype.Create_contiguous(cdim)
             typ.Commit()
             builtin = False
         return _MPI_types.setdefault(key, (typ, builtin))
 
 
-_numpy_types = {}
-
-
-def _get_dtype(datatype):
-    """Get a numpy datatype corresponding to an MPI datatype.
-
-    Only works for contiguous datatypes."""
-    try:
-        # possibly unsafe if handles are recycled, but OK, because we
-        # hold on to the contig types
-        return _numpy_types[datatype.py2f()]
-    except KeyError:
-        base, combiner, _ = datatype.decode()
-        if combiner != "CONTIGUOUS":
-            raise RuntimeError("Can only handle contiguous types")
-        try:
-            tdict = MPI.__TypeDict__
-        except AttributeError:
-            tdict = MPI._typedict
-
-        tdict = dict((v.py2f(), k) for k, v in tdict.items())
-        try:
-            base = tdict[base.py2f()]
-        except KeyError:
-            raise RuntimeError("Unhandled base datatype %r", base)
-        return _numpy_types.setdefault(datatype.py2f(), base)
-
-
-def reduction_op(op, invec, inoutvec, datatype):
-    dtype = _get_dtype(datatype)
-    invec = numpy.frombuffer(invec, dtype=dtype)
-    inoutvec = numpy.frombuffer(inoutvec, dtype=dtype)
-    inoutvec[:] = op(invec, inoutvec)
-
-
-_contig_min_op = MPI.Op.Create(partial(reduction_op, numpy.minimum), commute=True)
-_contig_max_op = MPI.Op.Create(partial(reduction_op, numpy.maximum), commute=True)
+def _get_op(insert_mode):
+    """Get the MPI reduction op for a local to global exchange."""
+    return {op2.INC: MPI.SUM,
+            op2.MIN: MPI.MIN,
+            op2.MAX: MPI.MAX}[insert_mode]
 
 
 class Halo(op2.Halo):
@@ -114,6 +91,30 @@ class Halo(op2.Halo):
             raise RuntimeError("Windowed SFs expose bugs in OpenMPI (use -sf_type basic)")
         return sf
 
+    @utils.cached_property
+    def compact_sf(self):
+        """The :attr:`sf` acting on packed buffers, along with the
+        points the buffers are packed from, see
+        :func:`~.dmplex.compact_sf`."""
+        return dmplex.compact_sf(self.sf)
+
+    def expanded_sf(self, cdim, compact=False):
+        """The :attr:`sf` (or with ``compact``, the SF of
+        :attr:`compact_sf`) expanded to act on each of ``cdim``
+        entries per point, see :func:`~.dmplex.expand_sf`.
+
+        Reductions over the expanded SF use a builtin MPI datatype,
+        so MPI implements them natively for any ``cdim``."""
+        sfs = self.__dict__.setdefault("_expanded_sfs", {})
+        key = (cdim, compact)
+        try:
+            return sfs[key]
+        except KeyError:
+            sf = self.compact_sf[0] if compact else self.sf
+            if cdim > 1:
+                sf = dmplex.expand_sf(sf, cdim)
+            return sfs.setdefault(key, sf)
+
     @utils.cached_property
     def comm(self):
         return self.dm.comm.tompi4py()
@@ -142,24 +143,104 @@ class Halo(op2.Halo):
         assert insert_mode in {op2.INC, op2.MIN, op2.MAX}, "%s LtoG not supported" % insert_mode
         if self.comm.size == 1:
             return
-        mtype, builtin = _get_mtype(dat)
-        op = {(False, op2.INC): MPI.SUM,
-              (True, op2.INC): MPI.SUM,
-              (False, op2.MIN): _contig_min_op,
-              (True, op2.MIN): MPI.MIN,
-              (False, op2.MAX): _contig_max_op,
-              (True, op2.MAX): MPI.MAX}[(builtin, insert_mode)]
-        dmplex.halo_begin(self.sf, dat, mtype, True, op=op)
+        # Reduce entrywise, so that the op is applied natively
+        btype, _ = _get_contiguous_mtype(dat.dtype, 1)
+        dmplex.halo_begin(self.expanded_sf(dat.cdim), dat, btype, True,
+                          op=_get_op(insert_mode))
 
     def local_to_global_end(self, dat, insert_mode):
         assert insert_mode in {op2.INC, op2.MIN, op2.MAX}, "%s LtoG not supported" % insert_mode
         if self.comm.size == 1:
             return
-        mtype, builtin = _get_mtype(dat)
-        op = {(False, op2.INC): MPI.SUM,
-              (True, op2.INC): MPI.SUM,
-              (False, op2.MIN): _contig_min_op,
-              (True, op2.MIN): MPI.MIN,
-              (False, op2.MAX): _contig_max_op,
-              (True, op2.MAX): MPI.MAX}[(builtin, insert_mode)]
-        dmplex.halo_end(self.sf, dat, mtype, True, op=op)
+        # Reduce entrywise, so that the op is applied natively
+        btype, _ = _get_contiguous_mtype(dat.dtype, 1)
+        dmplex.halo_end(self.expanded_sf(dat.cdim), dat, btype, True,
+                        op=_get_op(insert_mode))
+
+
+class CoalescedHaloExchange(object):
+    """A halo exchange of several Dats sharing a :class:`Halo`.
+
+    :arg halo: the Halo.
+    :arg dats: the Dats to exchange, which must have the same dtype.
+
+    The data of all the Dats is packed into a single buffer, so that
+    the exchange sends one message to each neighbouring process,
+    rather than one per Dat."""
+
+    def __init__(self, halo, dats):
+        dtype, = set(dat.dtype for dat in dats)
+        self.halo = halo
+        self.dats = tuple(dats)
+        self.sf, self.roots, self.leaves = halo.compact_sf
+        self.offsets = numpy.cumsum([0] + [dat.cdim for dat in self.dats])
+        width = self.offsets[-1]
+        self.mtype, _ = _get_contiguous_mtype(dtype, width)
+        self.btype, _ = _get_contiguous_mtype(dtype, 1)
+        self.rootbuf = numpy.empty((len(self.roots), width), dtype=dtype)
+        self.leafbuf = numpy.empty((len(self.leaves), width), dtype=dtype)
+
+    def _pack(self, buf, points):
+        for dat, start, end in zip(self.dats, self.offsets, self.offsets[1:]):
+            buf[:, start:end] = dat._data.reshape(-1, dat.cdim)[points]
+
+    def _unpack(self, buf, points):
+        for dat, start, end in zip(self.dats, self.offsets, self.offsets[1:]):
+            dat._data.reshape(-1, dat.cdim)[points] = buf[:, start:end]
+
+    def global_to_local_begin(self):
+        self._pack(self.rootbuf, self.roots)
+        dmplex.sf_begin(self.sf, self.rootbuf, self.leafbuf, self.mtype, False)
+
+    def global_to_local_end(self):
+        dmplex.sf_end(self.sf, self.rootbuf, self.leafbuf, self.mtype, False)
+        self._unpack(self.leafbuf, self.leaves)
+
+    def local_to_global_begin(self, insert_mode):
+        assert insert_mode in {op2.INC, op2.MIN, op2.MAX}, "%s LtoG not supported" % insert_mode
+        self._pack(self.rootbuf, self.roots)
+        self._pack(self.leafbuf, self.leaves)
+        sf = self.halo.expanded_sf(self.rootbuf.shape[1], compact=True)
+        dmplex.sf_begin(sf, self.rootbuf, self.leafbuf, self.btype, True,
+                        op=_get_op(insert_mode))
+
+    def local_to_global_end(self, insert_mode):
+        assert insert_mode in {op2.INC, op2.MIN, op2.MAX}, "%s LtoG not supported" % insert_mode
+        sf = self.halo.expanded_sf(self.rootbuf.shape[1], compact=True)
+        dmplex.sf_end(sf, self.rootbuf, self.leafbuf, self.btype, True,
+                      op=_get_op(insert_mode))
+        self._unpack(self.rootbuf, self.roots)
+
+
+def global_to_local(dats):
+    """Bring the halos of several Dats up to date.
+
+    :arg dats: the Dats.
+
+    The Dats whose halos are out of date and which share a
+    :class:`Halo` (and dtype) are exchanged together in one
+    :class:`CoalescedHaloExchange`, paying the message latency once
+    rather than once per Dat.  Other Dats are left to be exchanged
+    as usual when they are next used in a parallel loop.
+    """
+    groups = OrderedDict()
+    for dat in dats:
+        halo = dat.dataset.halo
+        if not isinstance(halo, Halo) or halo.comm.size == 1:
+            continue
+        dat._force_evaluation(read=True, write=False)
+        if dat.halo_valid:
+            continue
+        group = groups.setdefault((halo, dat.dtype), OrderedDict())
+        group[id(dat)] = dat
+
+    exchanges = []
+    for (halo, _), group in groups.items():
+        if len(group) > 1:
+            exchanges.append(CoalescedHaloExchange(halo, group.values()))
+    for exchange in exchanges:
+        exchange.global_to_local_begin()
+    for exchange in exchanges:
+        exchange.global_to_local_end()
+        for dat in exchange.dats:
+            dat.halo_valid = True
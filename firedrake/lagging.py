@@ -0,0 +1,143 @@
+"""Policies for lagging the Jacobian and preconditioner of nonlinear solves."""
+import numpy
+from mpi4py import MPI
+from pyop2 import op2
+
+__all__ = ["LaggingPolicy", "LagEvery", "LagUntilSlowConvergence",
+           "LagUntilCoefficientsChange"]
+
+
+class LaggingPolicy(object):
+    r"""A policy deciding when to rebuild (reassemble) an operator of
+    a nonlinear solve, rather than reuse the one last assembled.
+
+    Policies are passed to a :class:`.NonlinearVariationalSolver` as
+    the ``jacobian_policy`` or ``preconditioner_policy``.  The solver
+    copies them, so the same policy may be passed for both.  An
+    operator is always built the first time it is needed.
+
+    Reusing an operator means that PETSc does not set up the
+    preconditioner (for example, refactorise an LU preconditioner) at
+    that step, and neither do any nested solvers (fieldsplit blocks,
+    multigrid levels or Python preconditioners), which therefore see
+    operators consistent with the outer ones.
+    """
+
+    def start_solve(self, snes):
+        r"""Called at the start of each nonlinear solve.
+
+        :arg snes: the PETSc SNES."""
+        pass
+
+    def rebuild(self, snes):
+        r"""Decide whether to rebuild the operator.
+
+        :arg snes: the PETSc SNES.
+        :returns: ``True`` to rebuild the operator at the current
+            Newton step.  This must be the same on all processes.
+
+        Called each time the SNES evaluates the Jacobian, once the
+        operator has been built."""
+        raise NotImplementedError
+
+    def rebuilt(self, snes):
+        r"""Called after the operator is rebuilt.
+
+        :arg snes: the PETSc SNES."""
+        pass
+
+
+class LagEvery(LaggingPolicy):
+    r"""Rebuild an operator every so many Newton steps or solves.
+
+    :arg newton_steps: rebuild once this many Newton steps (Jacobian
+        evaluations) have passed since the last rebuild, or ``None``
+        to never rebuild on this count.
+    :arg solves: rebuild at the first Newton step of a solve once
+        this many solves (for example, timesteps) have started since
+        the last rebuild, or ``None`` to never rebuild on this count.
+
+    ``LagEvery(newton_steps=1)`` rebuilds at every Newton step, while
+    ``LagEvery(newton_steps=None, solves=5)`` rebuilds only at the
+    start of every fifth solve.
+    """
+
+    def __init__(self, newton_steps=1, solves=None):
+        self.newton_steps = newton_steps
+        self.solves = solves
+        self._steps = 0
+        self._solves = 0
+        self._first_step = False
+
+    def start_solve(self, snes):
+        self._solves += 1
+        self._first_step = True
+
+    def rebuild(self, snes):
+        self._steps += 1
+        first_step = self._first_step
+        self._first_step = False
+        if self.newton_steps is not None and self._steps >= self.newton_steps:
+            return True
+        return first_step and self.solves is not None and self._solves >= self.solves
+
+    def rebuilt(self, snes):
+        self._steps = 0
+        self._solves = 0
+        self._first_step = False
+
+
+class LagUntilSlowConvergence(LaggingPolicy):
+    r"""Rebuild an operator when the nonlinear convergence rate
+    degrades.
+
+    :arg max_rate: rebuild when the ratio of the residual norms at
+        successive Newton steps exceeds this.
+
+    The operator is reused across solves until convergence slows.
+    """
+
+    def __init__(self, max_rate=0.5):
+        self.max_rate = max_rate
+        self._norm = None
+
+    def start_solve(self, snes):
+        self._norm = None
+
+    def rebuild(self, snes):
+        norm = snes.getFunctionNorm()
+        previous, self._norm = self._norm, norm
+        return previous is not None and previous > 0 and norm/previous > self.max_rate
+
+
+class LagUntilCoefficientsChange(LaggingPolicy):
+    r"""Rebuild an operator when the values of some coefficients
+    change.
+
+    :arg coefficients: the :class:`.Function`\s and
+        :class:`.Constant`\s whose values the operator depends on.
+
+    This suits operators which depend on the solution only weakly (or
+    not at all), but on some other fields, such as a timestep or a
+    material parameter, which change occasionally.  The values are
+    compared with those at the last rebuild.
+    """
+
+    def __init__(self, coefficients):
+        self.coefficients = tuple(coefficients)
+        self._values = None
+
+    def _snapshot(self):
+        values = []
+        for c in self.coefficients:
+            dats = c.dat.split if isinstance(c.dat, op2.MixedDat) else (c.dat, )
+            values.extend(numpy.array(dat.data_ro) for dat in dats)
+        return values
+
+    def rebuild(self, snes):
+        changed = self._values is None or any(not numpy.array_equal(old, new)
+                                              for old, new in zip(self._values, self._snapshot()))
+        return snes.comm.tompi4py().allreduce(changed, op=MPI.LOR)
+
+    def rebuilt(self, snes):
+        self._values = self._snapshot()
@@ -42,6 +42,38 @@ int locate_cell(struct Function *f,
             }
         }
         free(ids);
+    } else if (f->iidx) {
+        struct IntervalIndex *iidx = f->iidx;
+        /* Binary search for the first interval starting after x */
+        int64_t start = 0, end = iidx->n;
+        while (start < end) {
+            int64_t mid = start + (end - start) / 2;
+            if (iidx->lo[mid] <= x[0])
+                start = mid + 1;
+            else
+                end = mid;
+        }
+        /* Candidates start at most the longest interval before x */
+        for (int64_t i = start - 1; i >= 0 && iidx->lo[i] >= x[0] - iidx->max_width; i--) {
+            if (iidx->hi[i] < x[0])
+                continue;
+            int64_t id = iidx->cells[i];
+            if (f->extruded == 0) {
+                if ((*try_candidate)(data_, f, id, x)) {
+                    cell = id;
+                    break;
+                }
+            }
+            else {
+                int nlayers = f->n_layers;
+                int c = id / nlayers;
+                int l = id % nlayers;
+                if ((*try_candidate_xtr)(data_, f, c, l, x)) {
+                    cell = id;
+                    break;
+                }
+            }
+        }
     } else {
         if (f->extruded == 0) {
             for (int c = 0; c < f->n_cols; c++) {
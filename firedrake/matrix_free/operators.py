@@ -5,6 +5,7 @@ import itertools
 from firedrake.ufl_expr import adjoint, action
 from firedrake.formmanipulation import ExtractSubBlock
 from firedrake.bcs import DirichletBC, EquationBCSplit
+from firedrake.utils import cached_property
 
 from firedrake.petsc import PETSc
 
@@ -252,6 +253,67 @@ class ImplicitMatrixContext(object):
         with self._xbc.dat.vec_ro as v:
             v.copy(X)
 
+    @cached_property
+    def _diagonal_bcs(self):
+        if not self.on_diag:
+            raise NotImplementedError("Diagonal of an off-diagonal block not implemented")
+        if any(isinstance(bc, EquationBCSplit) for bc in self.bcs):
+            raise NotImplementedError("Diagonal assembly with EquationBCs not implemented")
+        return self.row_bcs
+
+    @cached_property
+    def _diagonal(self):
+        from firedrake import function
+        from firedrake.assemble import create_assembly_callable
+        diagonal = function.Function(self._y.function_space())
+        assemble = create_assembly_callable(self.a, tensor=diagonal, bcs=self._diagonal_bcs,
+                                            form_compiler_parameters=self.fc_params,
+                                            diagonal=True)
+        return diagonal, assemble
+
+    @cached_property
+    def _block_diagonal(self):
+        from firedrake import function, functionspace
+        from firedrake.assemble import create_assembly_callable
+        V = self._y.function_space()
+        if len(V) > 1:
+            raise NotImplementedError("Block diagonal assembly not implemented for mixed spaces")
+        if V.rank > 0:
+            bs = V.value_size
+            V = functionspace.TensorFunctionSpace(V.mesh(), V.ufl_element().sub_elements()[0],
+                                                  shape=(bs, bs))
+        diagonal = function.Function(V)
+        assemble = create_assembly_callable(self.a, tensor=diagonal, bcs=self._diagonal_bcs,
+                                            form_compiler_parameters=self.fc_params,
+                                            diagonal="block")
+        return diagonal, assemble
+
+    def getDiagonal(self, mat, vec):
+        """Assemble the diagonal of the operator, without assembling
+        the operator.  As in :meth:`mult`, the rows of the boundary
+        conditions are those of the identity."""
+        diagonal, assemble = self._diagonal
+        assemble()
+        with diagonal.dat.vec_ro as v:
+            v.copy(vec)
+
+    def block_diagonal(self):
+        """Assemble the point-block diagonal of the operator: the
+        blocks coupling the components of the test and trial spaces at
+        each node.
+
+        :returns: a :class:`.Function` whose values at a node are the
+            (``value_size`` by ``value_size``) block there.  It is
+            overwritten by the next call.
+
+        As in :meth:`mult`, the blocks of the boundary condition nodes
+        are those of the identity (or, for a boundary condition on a
+        component, its row and column).  Not available for mixed
+        spaces."""
+        diagonal, assemble = self._block_diagonal
+        assemble()
+        return diagonal
+
     def view(self, mat, viewer=None):
         if viewer is None:
             return
@@ -9,7 +9,7 @@ from ufl.classes import ReferenceGrad
 import enum
 import numbers
 
-from pyop2.datatypes import IntType
+from pyop2.datatypes import IntType, as_cstr, as_ctypes
 from pyop2 import op2
 from pyop2.base import DataSet
 from pyop2.mpi import COMM_WORLD, dup_comm
@@ -23,7 +23,6 @@ import firedrake.extrusion_utils as eutils
 import firedrake.spatialindex as spatialindex
 import firedrake.utils as utils
 from firedrake.interpolation import interpolate
-from firedrake.logging import info_red
 from firedrake.parameters import parameters
 from firedrake.petsc import PETSc, OptionsManager
 
@@ -367,13 +366,13 @@ class MeshTopology(object):
         elif overlap_type == DistributedMeshOverlapType.FACET:
             def add_overlap():
                 dmplex.set_adjacency_callback(self._plex)
-                self._plex.distributeOverlap(overlap)
+                self._migrate_natural_points(self._plex.distributeOverlap(overlap))
                 dmplex.clear_adjacency_callback(self._plex)
                 self._grown_halos = True
         elif overlap_type == DistributedMeshOverlapType.VERTEX:
             def add_overlap():
                 # Default is FEM (vertex star) adjacency.
-                self._plex.distributeOverlap(overlap)
+                self._migrate_natural_points(self._plex.distributeOverlap(overlap))
                 self._grown_halos = True
         else:
             raise ValueError("Unknown overlap type %r" % overlap_type)
@@ -398,6 +397,15 @@ class MeshTopology(object):
         label_boundary = (self.comm.size == 1) or distribute
         dmplex.label_facets(plex, label_boundary=label_boundary)
 
+        # Number the plex points independently of the parallel
+        # distribution.  This is only possible if the undistributed
+        # mesh lives on a single process, otherwise the numbering is
+        # only valid for this number of processes.
+        pStart, pEnd = plex.getChart()
+        npoints = pEnd - pStart
+        self._natural_points = np.arange(npoints, dtype=IntType) + (self.comm.exscan(npoints) or 0)
+        self._natural_points_canonical = self.comm.allreduce(int(npoints > 0)) == 1
+
         # Distribute the dm to all ranks
         if self.comm.size > 1 and distribute:
             # We distribute with overlap zero, in case we're going to
@@ -414,7 +422,7 @@ class MeshTopology(object):
             except TypeError:
                 pass
             partitioner.setFromOptions()
-            plex.distribute(overlap=0)
+            self._migrate_natural_points(plex.distribute(overlap=0))
 
         dim = plex.getDimension()
 
@@ -503,6 +511,23 @@ class MeshTopology(object):
         """The UFL :class:`~ufl.classes.Cell` associated with the mesh."""
         return self._ufl_cell
 
+    def _migrate_natural_points(self, sf):
+        """Carry the natural numbering of the plex points over a
+        redistribution of the plex.
+
+        :arg sf: the migration SF returned by the redistribution (or
+            ``None`` if the plex was not redistributed).
+        """
+        from mpi4py import MPI
+
+        if sf is None:
+            return
+        pStart, pEnd = self._plex.getChart()
+        natural_points = np.empty(pEnd - pStart, dtype=IntType)
+        dmplex.sf_bcast(sf, MPI._typedict[np.dtype(IntType).char],
+                        self._natural_points, natural_points)
+        self._natural_points = natural_points
+
     @utils.cached_property
     def cell_closure(self):
         """2D array of ordered cell closures
@@ -585,9 +610,10 @@ class MeshTopology(object):
                                    self._cell_numbering,
                                    self.cell_closure)
 
-        point2facetnumber = {}
-        for i, f in enumerate(facets):
-            point2facetnumber[f] = i
+        # Map from plex points to facet numbers (-1 if not a facet of
+        # this kind).
+        point2facetnumber = np.full(dm.getChart()[1], -1, dtype=IntType)
+        point2facetnumber[facets] = np.arange(len(facets), dtype=IntType)
         obj = _Facets(self, classes, kind,
                       facet_cell, local_facet_number,
                       markers, unique_markers=unique_markers)
@@ -996,6 +1022,10 @@ class MeshGeometry(ufl.Mesh):
 
         self._coordinates = coordinates
 
+        # Incremented whenever the spatial index is cleared, so that
+        # cached point locations can detect that the mesh has moved.
+        self._spatial_index_epoch = 0
+
     def init(self):
         """Finish the initialisation of the mesh.  Most of the time
         this is carried out automatically, however, in some cases (for
@@ -1070,22 +1100,23 @@ values from f.)"""
 
         Use this if you move the mesh (for example by reassigning to
         the coordinate field)."""
-        try:
-            del self.spatial_index
-        except AttributeError:
-            pass
+        for attr in ("spatial_index", "_cell_bounding_boxes"):
+            try:
+                delattr(self, attr)
+            except AttributeError:
+                pass
+        self._spatial_index_epoch += 1
 
     @utils.cached_property
-    def spatial_index(self):
-        """Spatial index to quickly find which cell contains a given point."""
+    def _cell_bounding_boxes(self):
+        """Axis-aligned bounding boxes of all local cells (including
+        the halo), as a pair of ``(ncells, gdim)`` arrays of the lower
+        and upper corners, ordered by cell index."""
 
         from firedrake import function, functionspace
         from firedrake.parloops import par_loop, READ, MIN, MAX
 
         gdim = self.ufl_cell().geometric_dimension()
-        if gdim <= 1:
-            info_red("libspatialindex does not support 1-dimension, falling back on brute force.")
-            return None
 
         # Calculate the bounding boxes for all cells by running a kernel
         V = functionspace.VectorFunctionSpace(self, "DG", 0, dim=gdim)
@@ -1115,10 +1146,49 @@ values from f.)"""
         column_list = V.cell_node_list.reshape(-1)
         coords_min = self._order_data_by_cell_index(column_list, coords_min.dat.data_ro_with_halos)
         coords_max = self._order_data_by_cell_index(column_list, coords_max.dat.data_ro_with_halos)
+        return coords_min, coords_max
+
+    @utils.cached_property
+    def spatial_index(self):
+        """Spatial index to quickly find which cell contains a given point."""
+
+        gdim = self.ufl_cell().geometric_dimension()
+        coords_min, coords_max = self._cell_bounding_boxes
+
+        if gdim <= 1:
+            # libspatialindex does not support 1-dimension
+            return spatialindex.from_intervals(coords_min, coords_max)
 
         # Build spatial index
         return spatialindex.from_regions(coords_min, coords_max)
 
+    def _partition_bounding_boxes(self, tolerance=None):
+        """Gather the bounding boxes of the local part of the mesh
+        (including the halo) on every process.  Collective.
+
+        :kwarg tolerance: the tolerance used to check if a point is in
+            a cell.  Points this far outside a cell (in reference
+            coordinates) are located in it, so the boxes are padded
+            by the tolerance times the largest cell extent.
+        :returns: a ``(nprocs, 2, gdim)`` array, entry ``[r, 0]`` is
+            the lower and ``[r, 1]`` the upper corner of the box on
+            rank ``r``.  Processes without cells have an empty
+            (inverted) box."""
+        from mpi4py import MPI
+
+        coords_min, coords_max = self._cell_bounding_boxes
+        gdim = self.ufl_cell().geometric_dimension()
+        box = np.empty((2, gdim), dtype=float)
+        box[0] = coords_min.min(axis=0, initial=np.inf)
+        box[1] = coords_max.max(axis=0, initial=-np.inf)
+        if tolerance:
+            padding = tolerance * (coords_max - coords_min).max(initial=0)
+            box[0] -= padding
+            box[1] += padding
+        boxes = np.empty((self.comm.size, 2, gdim), dtype=float)
+        self.comm.Allgather([box, MPI.DOUBLE], [boxes, MPI.DOUBLE])
+        return boxes
+
     def locate_cell(self, x, tolerance=None):
         """Locate cell containg given point.
 
@@ -1136,6 +1206,32 @@ values from f.)"""
         else:
             return cell
 
+    def locate_cells(self, points, tolerance=None):
+        """Locate the cells containing an array of points.
+
+        :arg points: point coordinates, an array of shape ``(npoints,
+            gdim)``.
+        :kwarg tolerance: for checking if a point is in a cell.
+        :returns: a tuple ``(cells, reference_coordinates)`` of the
+            cell numbers, which are -1 for the points not in the local
+            part of the domain, and the reference coordinates of each
+            point in its cell, an array of shape ``(npoints, gdim)``.
+        """
+        if self.variable_layers:
+            raise NotImplementedError("Cell location not implemented for variable layers")
+        gdim = self.ufl_cell().geometric_dimension()
+        points = np.ascontiguousarray(points, dtype=float).reshape(-1, gdim)
+        npoints = len(points)
+        cells = np.full(npoints, -1, dtype=IntType)
+        X = np.zeros((npoints, gdim), dtype=float)
+        if npoints:
+            self._c_locate_points(tolerance=tolerance)(self.coordinates._ctypes,
+                                                       points.ctypes.data_as(ctypes.POINTER(ctypes.c_double)),
+                                                       npoints,
+                                                       cells.ctypes.data_as(ctypes.POINTER(as_ctypes(IntType))),
+                                                       X.ctypes.data_as(ctypes.POINTER(ctypes.c_double)))
+        return cells, X
+
     def _c_locator(self, tolerance=None):
         from pyop2 import compilation
         from pyop2.utils import get_petsc_dir
@@ -1168,6 +1264,53 @@ values from f.)"""
             locator.restype = ctypes.c_int
             return cache.setdefault(tolerance, locator)
 
+    def _c_locate_points(self, tolerance=None):
+        from pyop2 import compilation
+        from pyop2.utils import get_petsc_dir
+        import firedrake.function as function
+        import firedrake.pointquery_utils as pq_utils
+
+        cache = self.__dict__.setdefault("_c_locate_points_cache", {})
+        try:
+            return cache[tolerance]
+        except KeyError:
+            src = pq_utils.src_locate_cell(self, tolerance=tolerance)
+            src += """
+    int locate_points(struct Function *f, double *x, %(IntType)s npoints, %(IntType)s *cells, double *X)
+    {
+        struct ReferenceCoords reference_coords;
+        int nfound = 0;
+        for (%(IntType)s p = 0; p < npoints; p++) {
+            cells[p] = locate_cell(f, x + p*%(geometric_dimension)d, %(geometric_dimension)d, &to_reference_coords, &to_reference_coords_xtr, &reference_coords);
+            if (cells[p] == -1) {
+                continue;
+            }
+            for (int i = 0; i < %(geometric_dimension)d; i++) {
+                X[p*%(geometric_dimension)d + i] = reference_coords.X[i];
+            }
+            nfound++;
+        }
+        return nfound;
+    }
+    """ % dict(geometric_dimension=self.geometric_dimension(),
+               IntType=as_cstr(IntType))
+
+            locator = compilation.load(src, "c", "locate_points",
+                                       cppargs=["-I%s" % os.path.dirname(__file__),
+                                                "-I%s/include" % sys.prefix]
+                                       + ["-I%s/include" % d for d in get_petsc_dir()],
+                                       ldargs=["-L%s/lib" % sys.prefix,
+                                               "-lspatialindex_c",
+                                               "-Wl,-rpath,%s/lib" % sys.prefix])
+
+            locator.argtypes = [ctypes.POINTER(function._CFunction),
+                                ctypes.POINTER(ctypes.c_double),
+                                as_ctypes(IntType),
+                                ctypes.POINTER(as_ctypes(IntType)),
+                                ctypes.POINTER(ctypes.c_double)]
+            locator.restype = ctypes.c_int
+            return cache.setdefault(tolerance, locator)
+
     def init_cell_orientations(self, expr):
         """Compute and initialise :attr:`cell_orientations` relative to a specified orientation.
 
@@ -1,6 +1,10 @@
 from pyop2 import op2
+from pyop2.datatypes import IntType
+import numpy
 
 import firedrake
+from firedrake.parameters import parameters
+from firedrake.petsc import PETSc
 from . import utils
 from . import kernels
 
@@ -23,6 +27,84 @@ def check_arguments(coarse, fine):
         raise ValueError("Mismatching function space shapes")
 
 
+def identity_map(V):
+    """Map from the nodes of V to themselves."""
+    return op2.Map(V.node_set, V.node_set, 1,
+                   values=numpy.arange(V.node_set.total_size, dtype=IntType))
+
+
+def prolongation_matrix(Vc, Vf):
+    """Return the prolongation matrix from ``Vc`` to ``Vf``.
+
+    :arg Vc: the coarse space.
+    :arg Vf: the fine space, one refinement finer than ``Vc``.
+    :returns: a PETSc Mat, assembled once and cached on the
+        hierarchy.  Restriction applies its transpose.
+    """
+    hierarchy, level = utils.get_level(Vc.ufl_domain())
+    cache = hierarchy._shared_data_cache["transfer_matrices"]
+    key = ("prolong", Vc.ufl_element(), level)
+    try:
+        return cache[key]
+    except KeyError:
+        coarse_coords = Vc.ufl_domain().coordinates
+        fine_to_coarse = utils.fine_node_to_coarse_node_map(Vf, Vc)
+        fine_to_coarse_coords = utils.fine_node_to_coarse_node_map(Vf, coarse_coords.function_space())
+        node_locations = utils.physical_node_locations(Vf)
+        rmap = identity_map(Vf)
+        sparsity = op2.Sparsity((Vf.dof_dset, Vc.dof_dset),
+                                (rmap, fine_to_coarse))
+        mat = op2.Mat(sparsity, PETSc.ScalarType)
+        # Have to do this, because the node set core size is not right for
+        # this expanded stencil
+        coarse_coords.dat._force_evaluation(read=True, write=False)
+        coarse_coords.dat.global_to_local_begin(op2.READ)
+        coarse_coords.dat.global_to_local_end(op2.READ)
+        op2.par_loop(kernels.prolong_matrix_kernel(Vc), Vf.node_set,
+                     mat(op2.INC, (rmap, fine_to_coarse)),
+                     node_locations.dat(op2.READ),
+                     coarse_coords.dat(op2.READ, fine_to_coarse_coords))
+        mat.assemble()
+        mat._force_evaluation()
+        return cache.setdefault(key, mat.handle)
+
+
+def injection_matrix(Vf, Vc):
+    """Return the injection matrix from ``Vf`` to ``Vc``.
+
+    :arg Vf: the fine space, one refinement finer than ``Vc``.
+    :arg Vc: the coarse space, which must not be discontinuous.
+    :returns: a PETSc Mat, assembled once and cached on the
+        hierarchy.
+    """
+    hierarchy, level = utils.get_level(Vc.ufl_domain())
+    cache = hierarchy._shared_data_cache["transfer_matrices"]
+    key = ("inject", Vc.ufl_element(), level)
+    try:
+        return cache[key]
+    except KeyError:
+        fine_coords = Vf.ufl_domain().coordinates
+        coarse_node_to_fine_nodes = utils.coarse_node_to_fine_node_map(Vc, Vf)
+        coarse_node_to_fine_coords = utils.coarse_node_to_fine_node_map(Vc, fine_coords.function_space())
+        node_locations = utils.physical_node_locations(Vc)
+        rmap = identity_map(Vc)
+        sparsity = op2.Sparsity((Vc.dof_dset, Vf.dof_dset),
+                                (rmap, coarse_node_to_fine_nodes))
+        mat = op2.Mat(sparsity, PETSc.ScalarType)
+        # Have to do this, because the node set core size is not right for
+        # this expanded stencil
+        fine_coords.dat._force_evaluation(read=True, write=False)
+        fine_coords.dat.global_to_local_begin(op2.READ)
+        fine_coords.dat.global_to_local_end(op2.READ)
+        op2.par_loop(kernels.inject_matrix_kernel(Vf, Vc), Vc.node_set,
+                     mat(op2.INC, (rmap, coarse_node_to_fine_nodes)),
+                     node_locations.dat(op2.READ),
+                     fine_coords.dat(op2.READ, coarse_node_to_fine_coords))
+        mat.assemble()
+        mat._force_evaluation()
+        return cache.setdefault(key, mat.handle)
+
+
 def prolong(coarse, fine):
     check_arguments(coarse, fine)
     Vc = coarse.function_space()
@@ -59,6 +141,14 @@ def prolong(coarse, fine):
             Vf = firedrake.FunctionSpace(meshes[next_level], element)
             next = firedrake.Function(Vf)
 
+        if parameters["assemble_transfer_matrices"]:
+            P = prolongation_matrix(Vc, Vf)
+            with coarse.dat.vec_ro as src, next.dat.vec_wo as dest:
+                P.mult(src, dest)
+            coarse = next
+            Vc = Vf
+            continue
+
         coarse_coords = Vc.ufl_domain().coordinates
         fine_to_coarse = utils.fine_node_to_coarse_node_map(Vf, Vc)
         fine_to_coarse_coords = utils.fine_node_to_coarse_node_map(Vf, coarse_coords.function_space())
@@ -121,6 +211,13 @@ def restrict(fine_dual, coarse_dual):
         else:
             Vc = firedrake.FunctionSpace(meshes[next_level], element)
             next = firedrake.Function(Vc)
+        if parameters["assemble_transfer_matrices"]:
+            P = prolongation_matrix(Vc, Vf)
+            with fine_dual.dat.vec_ro as src, next.dat.vec_wo as dest:
+                P.multTranspose(src, dest)
+            fine_dual = next
+            Vf = Vc
+            continue
         # XXX: Should be able to figure out locations by pushing forward
         # reference cell node locations to physical space.
         # x = \sum_i c_i \phi_i(x_hat)
@@ -197,7 +294,11 @@ def inject(fine, coarse):
         else:
             Vc = firedrake.FunctionSpace(meshes[next_level], element)
             next = firedrake.Function(Vc)
-        if not dg:
+        if not dg and parameters["assemble_transfer_matrices"]:
+            I = injection_matrix(Vf, Vc)
+            with fine.dat.vec_ro as src, next.dat.vec_wo as dest:
+                I.mult(src, dest)
+        elif not dg:
             node_locations = utils.physical_node_locations(Vc)
 
             fine_coords = Vf.ufl_domain().coordinates
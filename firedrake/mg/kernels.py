@@ -256,6 +256,73 @@ def prolong_kernel(expression):
         return cache.setdefault(key, op2.Kernel(my_kernel, name="pyop2_kernel_prolong"))
 
 
+def prolong_matrix_kernel(Vc):
+    """Kernel computing the rows of the prolongation matrix from
+    ``Vc`` for a fine node.
+
+    Restriction is the transpose of this matrix."""
+    hierarchy, level = utils.get_level(Vc.ufl_domain())
+    levelf = level + Fraction(1 / hierarchy.refinements_per_level)
+    cache = hierarchy._shared_data_cache["transfer_kernels"]
+    coordinates = Vc.ufl_domain().coordinates
+    key = (("prolong_matrix", )
+           + Vc.ufl_element().value_shape()
+           + entity_dofs_key(Vc.finat_element.entity_dofs())
+           + entity_dofs_key(coordinates.function_space().finat_element.entity_dofs()))
+    try:
+        return cache[key]
+    except KeyError:
+        mesh = coordinates.ufl_domain()
+        evaluate_kernel = compile_element(ufl.Coefficient(Vc))
+        to_reference_kernel = to_reference_coordinates(coordinates.ufl_element())
+        element = create_element(Vc.ufl_element())
+        coords_element = create_element(coordinates.ufl_element())
+        ncandidate = hierarchy.fine_to_coarse_cells[levelf].shape[1]
+        my_kernel = """
+        %(to_reference)s
+        %(evaluate)s
+        __attribute__((noinline)) /* Clang bug */
+        static void pyop2_kernel_prolong_matrix(double *A, const double *X, const double *Xc)
+        {
+            double Xref[%(tdim)d];
+            double e[%(coarse_cell_inc)d] = {0};
+            double R[%(Rdim)d];
+            int cell = -1;
+            for (int i = 0; i < %(ncandidate)d; i++) {
+                const double *Xci = Xc + i*%(Xc_cell_inc)d;
+                to_reference_coords_kernel(Xref, X, Xci);
+                if (%(inside_cell)s) {
+                    cell = i;
+                    break;
+                }
+            }
+            if (cell == -1) abort();
+            /* Evaluate each coarse basis function at the fine node */
+            for ( int j = 0; j < %(coarse_cell_inc)d; j++ ) {
+                e[j] = 1;
+                for ( int i = 0; i < %(Rdim)d; i++ ) {
+                    R[i] = 0;
+                }
+                pyop2_kernel_evaluate(R, e, Xref);
+                for ( int i = 0; i < %(Rdim)d; i++ ) {
+                    A[i*%(ncol)d + cell*%(coarse_cell_inc)d + j] = R[i];
+                }
+                e[j] = 0;
+            }
+        }
+        """ % {"to_reference": str(to_reference_kernel),
+               "evaluate": str(evaluate_kernel),
+               "ncandidate": ncandidate,
+               "ncol": ncandidate*element.space_dimension(),
+               "Rdim": numpy.prod(element.value_shape),
+               "inside_cell": inside_check(element.cell, eps=1e-8, X="Xref"),
+               "Xc_cell_inc": coords_element.space_dimension(),
+               "coarse_cell_inc": element.space_dimension(),
+               "tdim": mesh.topological_dimension()}
+
+        return cache.setdefault(key, op2.Kernel(my_kernel, name="pyop2_kernel_prolong_matrix"))
+
+
 def restrict_kernel(Vf, Vc):
     hierarchy, level = utils.get_level(Vc.ufl_domain())
     levelf = level + Fraction(1 / hierarchy.refinements_per_level)
@@ -372,6 +439,77 @@ def inject_kernel(Vf, Vc):
         return cache.setdefault(key, (op2.Kernel(kernel, name="pyop2_kernel_inject"), False))
 
 
+def inject_matrix_kernel(Vf, Vc):
+    """Kernel computing the rows of the injection matrix from ``Vf``
+    for a coarse node.
+
+    Only for spaces which are not discontinuous, see
+    :func:`inject_kernel`."""
+    hierarchy, level = utils.get_level(Vc.ufl_domain())
+    cache = hierarchy._shared_data_cache["transfer_kernels"]
+    coordinates = Vf.ufl_domain().coordinates
+    key = (("inject_matrix", )
+           + Vf.ufl_element().value_shape()
+           + entity_dofs_key(Vc.finat_element.entity_dofs())
+           + entity_dofs_key(Vf.finat_element.entity_dofs())
+           + entity_dofs_key(coordinates.function_space().finat_element.entity_dofs()))
+    try:
+        return cache[key]
+    except KeyError:
+        ncandidate = hierarchy.coarse_to_fine_cells[level].shape[1]
+        evaluate_kernel = compile_element(ufl.Coefficient(Vf))
+        to_reference_kernel = to_reference_coordinates(coordinates.ufl_element())
+        coords_element = create_element(coordinates.ufl_element())
+        Vf_element = create_element(Vf.ufl_element())
+        kernel = """
+        %(to_reference)s
+        %(evaluate)s
+
+        __attribute__((noinline)) /* Clang bug */
+        static void pyop2_kernel_inject_matrix(double *A, const double *X, const double *Xf)
+        {
+            double Xref[%(tdim)d];
+            double e[%(f_cell_inc)d] = {0};
+            double R[%(Rdim)d];
+            int cell = -1;
+            for (int i = 0; i < %(ncandidate)d; i++) {
+                const double *Xfi = Xf + i*%(Xf_cell_inc)d;
+                to_reference_coords_kernel(Xref, X, Xfi);
+                if (%(inside_cell)s) {
+                    cell = i;
+                    break;
+                }
+            }
+            if (cell == -1) {
+                abort();
+            }
+            /* Evaluate each fine basis function at the coarse node */
+            for ( int j = 0; j < %(f_cell_inc)d; j++ ) {
+                e[j] = 1;
+                for ( int i = 0; i < %(Rdim)d; i++ ) {
+                    R[i] = 0;
+                }
+                pyop2_kernel_evaluate(R, e, Xref);
+                for ( int i = 0; i < %(Rdim)d; i++ ) {
+                    A[i*%(ncol)d + cell*%(f_cell_inc)d + j] = R[i];
+                }
+                e[j] = 0;
+            }
+        }
+        """ % {
+            "to_reference": str(to_reference_kernel),
+            "evaluate": str(evaluate_kernel),
+            "inside_cell": inside_check(Vc.finat_element.cell, eps=1e-8, X="Xref"),
+            "tdim": Vc.ufl_domain().topological_dimension(),
+            "ncandidate": ncandidate,
+            "ncol": ncandidate*Vf_element.space_dimension(),
+            "Rdim": numpy.prod(Vf_element.value_shape),
+            "Xf_cell_inc": coords_element.space_dimension(),
+            "f_cell_inc": Vf_element.space_dimension()
+        }
+        return cache.setdefault(key, op2.Kernel(kernel, name="pyop2_kernel_inject_matrix"))
+
+
 class MacroKernelBuilder(firedrake_interface.KernelBuilderBase):
     """Kernel builder for integration on a macro-cell."""
 
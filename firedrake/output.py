@@ -1,14 +1,17 @@
 
 import collections
+import functools
 import itertools
 import numpy
 import os
+import threading
 import ufl
 import weakref
+from concurrent.futures import ThreadPoolExecutor
 from pyop2.mpi import COMM_WORLD, dup_comm
 from pyop2.datatypes import IntType
 
-__all__ = ("File", )
+__all__ = ("File", "XDMFFile")
 
 
 VTK_INTERVAL = 3
@@ -167,12 +170,55 @@ def get_byte_order(dtype):
             ">": "BigEndian"}[dtype.byteorder]
 
 
-def write_array(f, ofunction):
-    array = ofunction.array
-    numpy.uint32(array.nbytes).tofile(f)
+VTK_BLOCK_SIZE = 1 << 15
+"""Size (in bytes) of the blocks compressed appended data is split into."""
+
+
+def get_compressor(compression):
+    """Return the VTK name and compression function for a codec.
+
+    :arg compression: the codec, ``"zlib"`` or ``"lz4"``.
+    :returns: a tuple ``(name, compress)``.
+    """
+    if compression == "zlib":
+        import zlib
+        return "vtkZLibDataCompressor", zlib.compress
+    elif compression == "lz4":
+        try:
+            import lz4.block
+        except ImportError:
+            raise ImportError("lz4 compression of output requires the lz4 package")
+        return "vtkLZ4DataCompressor", functools.partial(lz4.block.compress, store_size=False)
+    else:
+        raise ValueError("Unknown compression '%s', expected 'zlib' or 'lz4'" % compression)
+
+
+def encode_array(array, compress=None, executor=None):
+    """Encode an array as VTK appended data.
+
+    :arg array: the array to encode.
+    :arg compress: an optional compression function, see
+        :func:`get_compressor`.
+    :arg executor: an optional executor to compress the blocks of
+        the array in parallel.
+    :returns: a list of buffers, a ``UInt64`` header followed by
+        the (possibly compressed) data.
+    """
     if get_byte_order(array.dtype) == "BigEndian":
         array = array.byteswap()
-    array.tofile(f)
+    data = memoryview(numpy.ascontiguousarray(array)).cast("B")
+    if compress is None:
+        return [numpy.array([len(data)], dtype="<u8").tobytes(), data]
+    blocks = [data[i:i + VTK_BLOCK_SIZE] for i in range(0, len(data), VTK_BLOCK_SIZE)]
+    if executor is None:
+        blocks = list(map(compress, blocks))
+    else:
+        blocks = list(executor.map(compress, blocks))
+    # Number of blocks, block size, size of the last partial block
+    # (zero if it is full), then compressed size of each block.
+    header = [len(blocks), VTK_BLOCK_SIZE, len(data) % VTK_BLOCK_SIZE]
+    header.extend(map(len, blocks))
+    return [numpy.array(header, dtype="<u8").tobytes()] + blocks
 
 
 def write_array_descriptor(f, ofunction, offset=None, parallel=False):
@@ -196,7 +242,6 @@ def write_array_descriptor(f, ofunction, offset=None, parallel=False):
                  'NumberOfComponents="%s" '
                  'format="appended" '
                  'offset="%d" />\n' % (name, typ, ncmp, offset)).encode('ascii'))
-    return 4 + array.nbytes     # 4 is for the array size (uint32)
 
 
 def active_field_attributes(ofunctions):
@@ -255,83 +300,20 @@ def get_array(function):
     return array
 
 
-class File(object):
-    _header = (b'<?xml version="1.0" ?>\n'
-               b'<VTKFile type="Collection" version="0.1" '
-               b'byte_order="LittleEndian">\n'
-               b'<Collection>\n')
-    _footer = (b'</Collection>\n'
-               b'</VTKFile>\n')
-
-    def __init__(self, filename, project_output=False, comm=None, mode="w"):
-        """Create an object for outputting data for visualisation.
-
-        This produces output in VTU format, suitable for visualisation
-        with Paraview or other VTK-capable visualisation packages.
+class _FunctionWriter(object):
+    r"""Base class for writing :class:`~.Function`\s for visualisation.
 
+    Handles the interpolation or projection of the output functions
+    to linears.  Subclasses are responsible for writing the data."""
 
-        :arg filename: The name of the output file (must end in
-            ``.pvd``).
+    def __init__(self, project_output=False, comm=None):
+        """
         :kwarg project_output: Should the output be projected to
             linears?  Default is to use interpolation.
         :kwarg comm: The MPI communicator to use.
-        :kwarg mode: "w" to overwrite any existing file, "a" to append to an existing file.
-
-        .. note::
-
-           Visualisation is only possible for linear fields (either
-           continuous or discontinuous).  All other fields are first
-           either projected or interpolated to linear before storing
-           for visualisation purposes.
         """
-        filename = os.path.abspath(filename)
-        basename, ext = os.path.splitext(filename)
-        if ext not in (".pvd", ):
-            raise ValueError("Only output to PVD is supported")
-
-        if mode not in ["w", "a"]:
-            raise ValueError("Mode must be 'a' or 'w'")
-        if mode == "a" and not os.path.isfile(filename):
-            mode = "w"
-
-        comm = dup_comm(comm or COMM_WORLD)
-
-        if comm.rank == 0 and mode == "w":
-            outdir = os.path.dirname(os.path.abspath(filename))
-            if not os.path.exists(outdir):
-                os.makedirs(outdir)
-        elif comm.rank == 0 and mode == "a":
-            if not os.path.exists(os.path.abspath(filename)):
-                raise ValueError("Need a file to restart from.")
-        comm.barrier()
-
-        self.comm = comm
-        self.filename = filename
-        self.basename = basename
+        self.comm = dup_comm(comm or COMM_WORLD)
         self.project = project_output
-        countstart = 0
-
-        if self.comm.rank == 0 and mode == "w":
-            with open(self.filename, "wb") as f:
-                f.write(self._header)
-                f.write(self._footer)
-        elif self.comm.rank == 0 and mode == "a":
-            import xml.etree.ElementTree as ET
-            tree = ET.parse(os.path.abspath(filename))
-            # Count how many the file already has
-            for parent in tree.iter():
-                for child in list(parent):
-                    if child.tag != "DataSet":
-                        continue
-                    countstart += 1
-
-        if mode == "a":
-            # Need to communicate the count across all cores involved; default op is SUM
-            countstart = self.comm.allreduce(countstart)
-
-        self.counter = itertools.count(countstart)
-        self.timestep = itertools.count(countstart)
-
         self._fnames = None
         self._topology = None
         self._output_functions = weakref.WeakKeyDictionary()
@@ -395,7 +377,14 @@ class File(object):
 
         return OFunction(array=get_array(output), name=name, function=output)
 
-    def _write_vtu(self, *functions):
+    def _prepare_functions(self, *functions):
+        r"""Check and prepare functions for output.
+
+        :arg functions: the functions to output.
+        :returns: a tuple ``(coordinates, functions)`` of
+            :class:`OFunction`\s, interpolated or projected to linears
+            if necessary.  Also sets the cached topology.
+        """
         from firedrake.function import Function
         for f in functions:
             if not isinstance(f, Function):
@@ -425,9 +414,114 @@ class File(object):
 
         if self._topology is None:
             self._topology = get_topology(coordinates.function)
+        return coordinates, functions
 
-        basename = "%s_%s" % (self.basename, next(self.counter))
 
+class File(_FunctionWriter):
+    _header = (b'<?xml version="1.0" ?>\n'
+               b'<VTKFile type="Collection" version="0.1" '
+               b'byte_order="LittleEndian">\n'
+               b'<Collection>\n')
+    _footer = (b'</Collection>\n'
+               b'</VTKFile>\n')
+
+    def __init__(self, filename, project_output=False, comm=None, mode="w",
+                 asynchronous=False, max_pending=2, compression=None):
+        """Create an object for outputting data for visualisation.
+
+        This produces output in VTU format, suitable for visualisation
+        with Paraview or other VTK-capable visualisation packages.
+
+
+        :arg filename: The name of the output file (must end in
+            ``.pvd``).
+        :kwarg project_output: Should the output be projected to
+            linears?  Default is to use interpolation.
+        :kwarg comm: The MPI communicator to use.
+        :kwarg mode: "w" to overwrite any existing file, "a" to append to an existing file.
+        :kwarg asynchronous: Should files be written in a background
+            thread?  If ``True``, :meth:`write` returns as soon as the
+            output data has been prepared and copied, call
+            :meth:`flush` or :meth:`close` to wait for the writes to
+            complete.
+        :kwarg max_pending: The maximum number of snapshots waiting to
+            be written when writing asynchronously.  :meth:`write`
+            blocks while this many writes are pending.
+        :kwarg compression: Optional compression of the data arrays in
+            the VTU files, either ``"zlib"`` or ``"lz4"`` (which
+            requires the lz4 package).  Arrays are compressed in
+            blocks, in parallel using a pool of threads.
+
+        .. note::
+
+           Visualisation is only possible for linear fields (either
+           continuous or discontinuous).  All other fields are first
+           either projected or interpolated to linear before storing
+           for visualisation purposes.
+        """
+        filename = os.path.abspath(filename)
+        basename, ext = os.path.splitext(filename)
+        if ext not in (".pvd", ):
+            raise ValueError("Only output to PVD is supported")
+
+        if mode not in ["w", "a"]:
+            raise ValueError("Mode must be 'a' or 'w'")
+        if mode == "a" and not os.path.isfile(filename):
+            mode = "w"
+
+        super(File, self).__init__(project_output=project_output, comm=comm)
+        comm = self.comm
+
+        if comm.rank == 0 and mode == "w":
+            outdir = os.path.dirname(os.path.abspath(filename))
+            if not os.path.exists(outdir):
+                os.makedirs(outdir)
+        elif comm.rank == 0 and mode == "a":
+            if not os.path.exists(os.path.abspath(filename)):
+                raise ValueError("Need a file to restart from.")
+        comm.barrier()
+
+        self.filename = filename
+        self.basename = basename
+        countstart = 0
+
+        if self.comm.rank == 0 and mode == "w":
+            with open(self.filename, "wb") as f:
+                f.write(self._header)
+                f.write(self._footer)
+        elif self.comm.rank == 0 and mode == "a":
+            import xml.etree.ElementTree as ET
+            tree = ET.parse(os.path.abspath(filename))
+            # Count how many the file already has
+            for parent in tree.iter():
+                for child in list(parent):
+                    if child.tag != "DataSet":
+                        continue
+                    countstart += 1
+
+        if mode == "a":
+            # Need to communicate the count across all cores involved; default op is SUM
+            countstart = self.comm.allreduce(countstart)
+
+        self.counter = itertools.count(countstart)
+        self.timestep = itertools.count(countstart)
+
+        if compression is None:
+            self._compressor_name = None
+            self._compress = None
+            self._compression_executor = None
+        else:
+            self._compressor_name, self._compress = get_compressor(compression)
+            self._compression_executor = ThreadPoolExecutor()
+
+        self._pending = collections.deque()
+        if asynchronous:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+            self._pending_slots = threading.BoundedSemaphore(max_pending)
+        else:
+            self._executor = None
+
+    def _write_vtu(self, basename, coordinates, *functions):
         vtu = self._write_single_vtu(basename, coordinates, *functions)
 
         if self.comm.size > 1:
@@ -442,31 +536,41 @@ class File(object):
         num_points = coordinates.array.shape[0]
         num_cells = types.array.shape[0]
         fname = get_vtu_name(basename, self.comm.rank, self.comm.size)
+
+        # Encode (and maybe compress) the appended data up front, the
+        # offsets into it depend on the encoded sizes.
+        arrays = (coordinates, connectivity, offsets, types) + functions
+        encoded = [encode_array(a.array, compress=self._compress,
+                                executor=self._compression_executor)
+                   for a in arrays]
+        data_offsets = iter(numpy.cumsum([0] + [sum(map(len, e)) for e in encoded]))
+        if self._compressor_name is None:
+            compressor = b''
+        else:
+            compressor = b' compressor="%s"' % self._compressor_name.encode('ascii')
         with open(fname, "wb") as f:
-            # Running offset for appended data
-            offset = 0
             f.write(b'<?xml version="1.0" ?>\n')
             f.write(b'<VTKFile type="UnstructuredGrid" version="0.1" '
                     b'byte_order="LittleEndian" '
-                    b'header_type="UInt32">\n')
+                    b'header_type="UInt64"%s>\n' % compressor)
             f.write(b'<UnstructuredGrid>\n')
 
             f.write(('<Piece NumberOfPoints="%d" '
                      'NumberOfCells="%d">\n' % (num_points, num_cells)).encode('ascii'))
             f.write(b'<Points>\n')
             # Vertex coordinates
-            offset += write_array_descriptor(f, coordinates, offset=offset)
+            write_array_descriptor(f, coordinates, offset=next(data_offsets))
             f.write(b'</Points>\n')
 
             f.write(b'<Cells>\n')
-            offset += write_array_descriptor(f, connectivity, offset=offset)
-            offset += write_array_descriptor(f, offsets, offset=offset)
-            offset += write_array_descriptor(f, types, offset=offset)
+            write_array_descriptor(f, connectivity, offset=next(data_offsets))
+            write_array_descriptor(f, offsets, offset=next(data_offsets))
+            write_array_descriptor(f, types, offset=next(data_offsets))
             f.write(b'</Cells>\n')
 
             f.write(b'<PointData%s>\n' % active_field_attributes(functions))
             for function in functions:
-                offset += write_array_descriptor(f, function, offset=offset)
+                write_array_descriptor(f, function, offset=next(data_offsets))
             f.write(b'</PointData>\n')
 
             f.write(b'</Piece>\n')
@@ -476,12 +580,9 @@ class File(object):
             # Appended data must start with "_", separating whitespace
             # from data
             f.write(b'_')
-            write_array(f, coordinates)
-            write_array(f, connectivity)
-            write_array(f, offsets)
-            write_array(f, types)
-            for function in functions:
-                write_array(f, function)
+            for buffers in encoded:
+                for buf in buffers:
+                    f.write(buf)
             f.write(b'\n</AppendedData>\n')
 
             f.write(b'</VTKFile>\n')
@@ -536,10 +637,30 @@ class File(object):
         functions.
         """
         time = kwargs.get("time", None)
-        vtu = self._write_vtu(*functions)
+        coordinates, functions = self._prepare_functions(*functions)
+        basename = "%s_%s" % (self.basename, next(self.counter))
         if time is None:
             time = next(self.timestep)
 
+        if self._executor is None:
+            self._write_step(basename, time, coordinates, *functions)
+            return
+
+        # Snapshot the output data, so that the solver may carry on
+        # modifying the functions, and write it in the background.
+        coordinates, *functions = (OFunction(array=f.array.copy(), name=f.name, function=None)
+                                   for f in (coordinates, ) + functions)
+        self._pending_slots.acquire()
+        future = self._executor.submit(self._write_step, basename, time, coordinates, *functions)
+        future.add_done_callback(lambda _: self._pending_slots.release())
+        self._pending.append(future)
+        # Report errors of completed writes
+        while self._pending and self._pending[0].done():
+            self._pending.popleft().result()
+
+    def _write_step(self, basename, time, coordinates, *functions):
+        vtu = self._write_vtu(basename, coordinates, *functions)
+
         # Write into collection as relative path, so we can move
         # things around.
         vtu = os.path.relpath(vtu, os.path.dirname(self.basename))
@@ -552,3 +673,272 @@ class File(object):
                          'file="%s" />\n' % (time, vtu)).encode('ascii'))
                 # And add footer again, so that the file is valid
                 f.write(self._footer)
+
+    def flush(self):
+        """Wait for all pending asynchronous writes to complete."""
+        while self._pending:
+            self._pending.popleft().result()
+
+    def close(self):
+        """Complete all pending writes and stop the background writer
+        (if any)."""
+        self.flush()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._compression_executor is not None:
+            self._compression_executor.shutdown()
+            self._compression_executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+xdmf_topologies = {
+    VTK_INTERVAL: "Polyline",
+    VTK_TRIANGLE: "Triangle",
+    VTK_QUADRILATERAL: "Quadrilateral",
+    VTK_TETRAHEDRON: "Tetrahedron",
+    VTK_HEXAHEDRON: "Hexahedron",
+    VTK_WEDGE: "Wedge",
+}
+
+
+def xdmf_data_item(shape, dtype, dataset):
+    """Return the XDMF DataItem for an array stored in HDF5.
+
+    :arg shape: the shape of the array.
+    :arg dtype: the data type of the array.
+    :arg dataset: the HDF5 dataset, as ``"filename:/path"``.
+    """
+    dtype = numpy.dtype(dtype)
+    typ = {"f": "Float",
+           "i": "Int",
+           "u": "UInt"}[dtype.kind]
+    dims = " ".join(map(str, shape))
+    return ('<DataItem Dimensions="%s" NumberType="%s" Precision="%d" '
+            'Format="HDF">%s</DataItem>\n' % (dims, typ, dtype.itemsize, dataset))
+
+
+def get_xdmf_array(ofunction):
+    """Return the data of an :class:`OFunction` as stored in XDMF
+    (tensors are flattened to 9 components)."""
+    array = ofunction.array
+    if len(array.shape) > 2:
+        array = array.reshape(array.shape[0], -1)
+    return array
+
+
+class XDMFFile(_FunctionWriter):
+    _header = (b'<?xml version="1.0" ?>\n'
+               b'<Xdmf Version="3.0">\n'
+               b'<Domain>\n'
+               b'<Grid Name="TimeSeries" GridType="Collection" '
+               b'CollectionType="Temporal">\n')
+    _footer = (b'</Grid>\n'
+               b'</Domain>\n'
+               b'</Xdmf>\n')
+
+    def __init__(self, filename, project_output=False, comm=None, single_file=True):
+        """Create an object for outputting time series data for visualisation.
+
+        This produces output in XDMF format, with the heavy data
+        stored in HDF5, suitable for visualisation with Paraview or
+        VisIt.  Unlike :class:`File`, the mesh connectivity is only
+        written once, and the mesh coordinates are only written again
+        if they have changed since the last write.  Every subsequent
+        timestep only stores the function data.
+
+        :arg filename: The name of the output file (must end in
+            ``.xdmf``).
+        :kwarg project_output: Should the output be projected to
+            linears?  Default is to use interpolation.
+        :kwarg comm: The MPI communicator to use.
+        :kwarg single_file: In parallel, should all processes write
+            into a single HDF5 file using collective I/O (requires
+            h5py built with MPI support)?  Otherwise each process
+            writes its own HDF5 file.
+
+        .. note::
+
+           As with :class:`File`, all fields are first either
+           projected or interpolated to linear before storing for
+           visualisation purposes.
+        """
+        import h5py
+
+        filename = os.path.abspath(filename)
+        basename, ext = os.path.splitext(filename)
+        if ext not in (".xdmf", ):
+            raise ValueError("Only output to XDMF is supported")
+
+        super(XDMFFile, self).__init__(project_output=project_output, comm=comm)
+
+        if self.comm.rank == 0:
+            outdir = os.path.dirname(filename)
+            if not os.path.exists(outdir):
+                os.makedirs(outdir)
+        self.comm.barrier()
+
+        self.filename = filename
+        self.basename = basename
+        self._collective = single_file and self.comm.size > 1
+        if self.comm.size == 1 or self._collective:
+            self.h5name = "%s.h5" % basename
+        else:
+            self.h5name = "%s_%d.h5" % (basename, self.comm.rank)
+        if self._collective:
+            try:
+                self._h5file = h5py.File(self.h5name, "w", driver="mpio", comm=self.comm)
+            except NameError:  # the error you get if h5py isn't compiled against parallel HDF5
+                raise RuntimeError("h5py *must* be installed with MPI support")
+        else:
+            self._h5file = h5py.File(self.h5name, "w")
+        self.counter = itertools.count()
+        self._coordinates_counter = itertools.count()
+        self._coordinates = None
+        self._coordinates_path = None
+
+        if self.comm.rank == 0:
+            with open(self.filename, "wb") as f:
+                f.write(self._header)
+                f.write(self._footer)
+
+    def _write_mesh(self, coordinates):
+        """Write the mesh to the HDF5 file, if necessary.
+
+        The connectivity is written on the first call, the coordinates
+        whenever they differ from those last written.
+
+        :arg coordinates: the coordinates :class:`OFunction`.
+        :returns: the path of the current coordinates dataset.
+        """
+        from mpi4py import MPI
+
+        connectivity, _, types = self._topology
+        if "/Mesh/topology" not in self._h5file:
+            num_cells = types.array.shape[0]
+            nodes_per_cell = coordinates.function.ufl_domain().ufl_cell().num_vertices()
+            topology = connectivity.array.reshape(num_cells, nodes_per_cell)
+            if self._collective:
+                # Number the points of each process after those of
+                # lower ranked processes.
+                sizes = self.comm.allgather(coordinates.array.shape[0])
+                topology = topology + sum(sizes[:self.comm.rank])
+            self._write_dataset("/Mesh/topology", topology)
+        changed = self._coordinates is None or \
+            not numpy.array_equal(self._coordinates, coordinates.array)
+        if self._collective:
+            changed = self.comm.allreduce(changed, op=MPI.LOR)
+        if changed:
+            self._coordinates_path = "/Mesh/coordinates_%d" % next(self._coordinates_counter)
+            self._write_dataset(self._coordinates_path, coordinates.array)
+            self._coordinates = coordinates.array.copy()
+        return self._coordinates_path
+
+    def _write_dataset(self, path, array):
+        """Write an array to a new dataset in the HDF5 file.
+
+        When writing collectively the arrays of all processes are
+        concatenated in rank order.
+
+        :arg path: the path of the dataset.
+        :arg array: the local array.
+        """
+        if not self._collective:
+            self._h5file.create_dataset(path, data=array)
+            return
+        sizes = self.comm.allgather(array.shape[0])
+        start = sum(sizes[:self.comm.rank])
+        dset = self._h5file.create_dataset(path, shape=(sum(sizes), ) + array.shape[1:],
+                                           dtype=array.dtype)
+        with dset.collective:
+            dset[start:start + array.shape[0]] = array
+
+    def _piece_xml(self, h5name, num_points, num_cells, coordinates_path, idx, cell, functions):
+        """Return the XDMF grid for one process's part of the mesh."""
+        connectivity, _, _ = self._topology
+        nodes_per_cell = cell.num_vertices()
+        h5name = os.path.relpath(h5name, os.path.dirname(self.filename))
+        xml = ['<Grid Name="mesh" GridType="Uniform">\n',
+               '<Topology TopologyType="%s" NumberOfElements="%d" NodesPerElement="%d">\n'
+               % (xdmf_topologies[cells[cell]], num_cells, nodes_per_cell),
+               xdmf_data_item((num_cells, nodes_per_cell), connectivity.array.dtype,
+                              "%s:/Mesh/topology" % h5name),
+               '</Topology>\n',
+               '<Geometry GeometryType="XYZ">\n',
+               xdmf_data_item((num_points, 3), numpy.float64,
+                              "%s:%s" % (h5name, coordinates_path)),
+               '</Geometry>\n']
+        for function in functions:
+            array = get_xdmf_array(function)
+            attribute = {1: "Scalar", 2: "Vector"}.get(len(function.array.shape), "Tensor")
+            xml.append('<Attribute Name="%s" AttributeType="%s" Center="Node">\n'
+                       % (function.name, attribute))
+            xml.append(xdmf_data_item((num_points, ) + array.shape[1:], array.dtype,
+                                      "%s:/Function/%s/%d" % (h5name, function.name, idx)))
+            xml.append('</Attribute>\n')
+        xml.append('</Grid>\n')
+        return "".join(xml)
+
+    def write(self, *functions, **kwargs):
+        """Write functions to this :class:`XDMFFile`.
+
+        :arg functions: list of functions to write.
+        :kwarg time: optional timestep value.
+
+        You may save more than one function to the same file.
+        However, all calls to :meth:`write` must use the same set of
+        functions.
+        """
+        time = kwargs.get("time", None)
+        coordinates, functions = self._prepare_functions(*functions)
+        idx = next(self.counter)
+        if time is None:
+            time = idx
+
+        coordinates_path = self._write_mesh(coordinates)
+        for function in functions:
+            self._write_dataset("/Function/%s/%d" % (function.name, idx),
+                                get_xdmf_array(function))
+        self._h5file.flush()
+
+        num_points = coordinates.array.shape[0]
+        num_cells = self._topology[2].array.shape[0]
+        cell = coordinates.function.ufl_domain().topology.ufl_cell()
+        if self._collective:
+            # One piece containing the data of every process
+            num_points = self.comm.allreduce(num_points)
+            num_cells = self.comm.allreduce(num_cells)
+            pieces = [(self.h5name, num_points, num_cells, coordinates_path)]
+        else:
+            pieces = self.comm.gather((self.h5name, num_points, num_cells, coordinates_path), root=0)
+        if self.comm.rank == 0:
+            with open(self.filename, "r+b") as f:
+                # Seek backwards from end to beginning of footer
+                f.seek(-len(self._footer), 2)
+                # Write new timestep, one piece per process
+                f.write(('<Grid Name="step_%d" GridType="Collection" '
+                         'CollectionType="Spatial">\n' % idx).encode('ascii'))
+                f.write(('<Time Value="%s" />\n' % time).encode('ascii'))
+                for piece in pieces:
+                    xml = self._piece_xml(*piece, idx=idx, cell=cell, functions=functions)
+                    f.write(xml.encode('ascii'))
+                f.write(b'</Grid>\n')
+                # And add footer again, so that the file is valid
+                f.write(self._footer)
+
+    def close(self):
+        """Close the HDF5 file (flushing any pending writes)."""
+        if hasattr(self, "_h5file"):
+            self._h5file.close()
+            del self._h5file
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
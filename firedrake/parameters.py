@@ -84,6 +84,16 @@ parameters["default_sub_matrix_type"] = "baij"
 
 parameters["type_check_safe_par_loops"] = False
 
+# Apply multigrid transfers (prolong, restrict and inject) with
+# sparse matrices assembled once per pair of levels, rather than
+# relocating nodes on every call.
+parameters["assemble_transfer_matrices"] = False
+
+# Reuse the solvers built by solve(a == L, u) and solve(F == 0, u)
+# for later calls with structurally identical arguments.  A few of
+# the most recently used solvers are kept on each solution Function.
+parameters["cache_solvers"] = False
+
 
 def disable_performance_optimisations():
     """Switches off performance optimisations in Firedrake.
@@ -1,4 +1,6 @@
 
+import numpy
+
 from pyop2.datatypes import IntType, as_cstr
 
 from coffee import base as ast
@@ -112,6 +114,7 @@ def compile_element(expression, coordinates, parameters=None):
         "layers_arg": ", int const *__restrict__ layers" if extruded else "",
         "layers": ", layers" if extruded else "",
         "IntType": as_cstr(IntType),
+        "value_size": int(numpy.prod(expression.ufl_shape, dtype=int)),
     }
     # if maps are the same, only need to pass one of them
     if coordinates.cell_node_map() == coefficient.cell_node_map():
@@ -125,6 +128,18 @@ def compile_element(expression, coordinates, parameters=None):
 static inline void wrap_evaluate(double* const result, double* const X, int const start, int const end%(layers_arg)s,
     double const *__restrict__ coords, double const *__restrict__ f, %(wrapper_map_args)s);
 
+static inline void evaluate_in_cell(struct Function *f, %(IntType)s cell, double *X, double *result)
+{
+    int layers[2] = {0, 0};
+    if (f->extruded != 0) {
+        int nlayers = f->n_layers;
+        layers[1] = cell %% nlayers + 2;
+        cell = cell / nlayers;
+    }
+
+    wrap_evaluate(result, X, cell, cell+1%(layers)s, f->coords, f->f, %(map_args)s);
+}
+
 int evaluate(struct Function *f, double *x, double *result)
 {
     struct ReferenceCoords reference_coords;
@@ -136,15 +151,28 @@ int evaluate(struct Function *f, double *x, double *result)
     if (!result) {
         return 0;
     }
-    int layers[2] = {0, 0};
-    if (f->extruded != 0) {
-        int nlayers = f->n_layers;
-        layers[1] = cell %% nlayers + 2;
-        cell = cell / nlayers;
+    evaluate_in_cell(f, cell, reference_coords.X, result);
+    return 0;
+}
+
+int evaluate_points(struct Function *f, double *x, %(IntType)s npoints, double *result, int *found)
+{
+    int nfound = 0;
+    for (%(IntType)s p = 0; p < npoints; p++) {
+        found[p] = evaluate(f, x + p*%(geometric_dimension)d, result + p*%(value_size)d) == 0;
+        nfound += found[p];
     }
+    return nfound;
+}
 
-    wrap_evaluate(result, reference_coords.X, cell, cell+1%(layers)s, f->coords, f->f, %(map_args)s);
-    return 0;
+void evaluate_reference_points(struct Function *f, %(IntType)s npoints, %(IntType)s *cells, double *X, double *result)
+{
+    for (%(IntType)s p = 0; p < npoints; p++) {
+        if (cells[p] == -1) {
+            continue;
+        }
+        evaluate_in_cell(f, cells[p], X + p*%(geometric_dimension)d, result + p*%(value_size)d);
+    }
 }
 """
 
@@ -0,0 +1,237 @@
+"""Ahead-of-time compilation of the kernels for forms and solvers."""
+import base64
+import gzip
+import json
+import multiprocessing
+import os
+import pickle
+import time
+
+import ufl
+from ufl.corealg.map_dag import map_expr_dag
+from ufl.corealg.multifunction import MultiFunction
+
+from pyop2.mpi import COMM_WORLD
+
+from firedrake import tsfc_interface
+from firedrake.parameters import parameters as default_parameters
+from firedrake.variational_solver import NonlinearVariationalSolver
+
+__all__ = ["precompile", "populate_cache"]
+
+
+def _solver_forms(solver):
+    """Return the forms a solver assembles, with their form compiler
+    parameters.
+
+    Only the residual, Jacobian and preconditioning forms are found:
+    the forms of fieldsplit sub-blocks assembled separately and the
+    coarsened forms of multigrid levels are built by the solver as
+    it runs."""
+    problem = solver._problem
+    fcp = problem.form_compiler_parameters
+    forms = [problem.F, problem.J]
+    if problem.Jp is not None:
+        forms.append(problem.Jp)
+    return [(form, fcp) for form in forms]
+
+
+def _collect_forms(objs, form_compiler_parameters):
+    forms = []
+    for obj in objs:
+        if isinstance(obj, NonlinearVariationalSolver):
+            forms.extend(_solver_forms(obj))
+        elif isinstance(obj, ufl.Form):
+            forms.append((obj, form_compiler_parameters))
+        elif isinstance(obj, (tuple, list)):
+            forms.extend(_collect_forms(obj, form_compiler_parameters))
+        else:
+            raise TypeError("Don't know how to precompile a %r" % type(obj).__name__)
+    return forms
+
+
+class _PureUFL(MultiFunction):
+    """Rebuild an expression from pure UFL objects (which, unlike
+    Firedrake meshes and functions, can be pickled), preserving the
+    coefficient and argument numbering."""
+
+    def __init__(self):
+        super().__init__()
+        self.domains = {}
+
+    def domain(self, domain):
+        if domain is None:
+            return None
+        try:
+            return self.domains[domain]
+        except KeyError:
+            return self.domains.setdefault(domain, ufl.Mesh(domain.ufl_coordinate_element(),
+                                                            ufl_id=domain.ufl_id()))
+
+    def function_space(self, V):
+        return ufl.FunctionSpace(self.domain(V.ufl_domain()), V.ufl_element())
+
+    expr = MultiFunction.reuse_if_untouched
+
+    def coefficient(self, o):
+        return ufl.Coefficient(self.function_space(o.ufl_function_space()), count=o.count())
+
+    def argument(self, o):
+        return ufl.Argument(self.function_space(o.ufl_function_space()), o.number(), part=o.part())
+
+    def geometric_quantity(self, o):
+        return type(o)(self.domain(o.ufl_domain()))
+
+
+def _pure_ufl(form):
+    """Return a copy of a form built from pure UFL objects."""
+    mapper = _PureUFL()
+    return ufl.Form([ufl.Integral(map_expr_dag(mapper, integral.integrand()),
+                                  integral.integral_type(),
+                                  mapper.domain(integral.ufl_domain()),
+                                  integral.subdomain_id(),
+                                  integral.metadata(),
+                                  None)
+                     for integral in form.integrals()])
+
+
+def _compile_task(task):
+    """Compile the kernels for a task and write them to the disk
+    cache, without any communication."""
+    key, form, name, parameters, number_map, coffee_parameters = task
+    # Worker processes start with the default COFFEE parameters.
+    default_parameters["coffee"].update(coffee_parameters)
+    start = time.time()
+    kernel = object.__new__(tsfc_interface.TSFCKernel)
+    kernel._initialized = False
+    kernel.__init__(form, name, parameters, number_map, None)
+    kernel._key = key
+    tsfc_interface.TSFCKernel._cache.write_file(key, pickle.dumps(kernel, 0))
+    return time.time() - start
+
+
+def _pickleable_tasks(tasks):
+    """Return the tasks with their forms rebuilt from pure UFL, so
+    that they can be sent to worker processes, or ``None`` if this is
+    not possible."""
+    try:
+        tasks = [(key, _pure_ufl(form)) + rest for key, form, *rest in tasks]
+        pickle.dumps(tasks)
+    except Exception:
+        # Forms with terminals which are not pure UFL, compile these
+        # in this process.
+        return None
+    return tasks
+
+
+def precompile(*objs, form_compiler_parameters=None, processes=None,
+               manifest=None, comm=None):
+    """Compile, ahead of time, the kernels for some forms or solvers.
+
+    The kernels which are not already in the disk cache are compiled
+    concurrently in a pool of processes on rank 0, and then loaded on
+    all ranks, so that the first assembly (or solve) does not have to
+    compile them.
+
+    Forking an MPI initialised process is unsafe with many MPI
+    implementations, so the worker processes are started with the
+    ``"spawn"`` method of :mod:`multiprocessing`.  As with any use of
+    this method, the main module of the program must be importable
+    without side effects (the code which runs the program guarded by
+    ``if __name__ == "__main__":``).  Where this is not possible, pass
+    ``processes=1`` to compile in the calling process.  Forms which
+    cannot be sent to the workers are also compiled in the calling
+    process.
+
+    :arg objs: the :class:`~ufl.classes.Form`\\s or
+        :class:`.NonlinearVariationalSolver`\\s (or lists of them) to
+        compile kernels for.  For a solver, the residual, Jacobian and
+        preconditioning forms are compiled; the forms of separately
+        assembled fieldsplit blocks and of coarse multigrid levels are
+        not.
+    :arg form_compiler_parameters: optional parameters to compile
+        forms with (solvers use the parameters of their problem).
+    :arg processes: the number of processes to compile with (defaults
+        to the number of CPUs).
+    :arg manifest: optional path of a manifest to write, containing the
+        compiled kernels, from which :func:`populate_cache` can fill
+        the cache of a later job.
+    :arg comm: the communicator to compile on (defaults to
+        ``COMM_WORLD``).  This function is collective over it.
+    :returns: the number of kernels compiled.
+
+    .. note::
+
+       The C code for a kernel is generated and compiled by PyOP2 the
+       first time it is executed in a parallel loop, since it depends
+       on the data the loop is over.
+    """
+    comm = comm or COMM_WORLD
+    cache = tsfc_interface.TSFCKernel._cache
+    forms = _collect_forms(objs, form_compiler_parameters)
+
+    tasks = []
+    keys = set()
+    for form, fcp in forms:
+        parameters = default_parameters["form_compiler"].copy()
+        parameters.update(fcp or {})
+        for _, f, name, number_map in tsfc_interface._split_kernel_forms(form, "form"):
+            key, _ = tsfc_interface.TSFCKernel._cache_key(f, name, parameters, number_map, None)
+            if key in keys:
+                continue
+            keys.add(key)
+            if key not in cache and not os.path.exists(cache.filepath(key)):
+                tasks.append((key, f, name, parameters, number_map,
+                              dict(default_parameters["coffee"])))
+
+    ncompiled = comm.bcast(len(tasks), root=0)
+    if comm.rank == 0 and tasks:
+        pickleable = None
+        if processes != 1 and len(tasks) > 1:
+            pickleable = _pickleable_tasks(tasks)
+        if pickleable is None:
+            times = list(map(_compile_task, tasks))
+        else:
+            ctx = multiprocessing.get_context("spawn")
+            with ctx.Pool(processes) as pool:
+                times = pool.map(_compile_task, pickleable)
+        cache.compile_time += sum(times)
+    comm.barrier()
+
+    # Load the kernels on all ranks
+    for form, fcp in forms:
+        tsfc_interface.compile_form(form, "form", parameters=fcp)
+
+    if manifest is not None and comm.rank == 0:
+        kernels = {}
+        for key in sorted(keys):
+            if not os.path.exists(cache.filepath(key)):
+                continue
+            with open(cache.filepath(key), "rb") as f:
+                kernels[key] = base64.b64encode(f.read()).decode()
+        with open(manifest, "w") as f:
+            json.dump({"kernels": kernels}, f)
+    comm.barrier()
+    return ncompiled
+
+
+def populate_cache(manifest, comm=None):
+    """Fill the disk cache from a manifest written by :func:`precompile`.
+
+    :arg manifest: the path of the manifest.
+    :arg comm: the communicator to populate on (defaults to
+        ``COMM_WORLD``).  This function is collective over it.
+    :returns: the number of kernels added to the cache.
+    """
+    comm = comm or COMM_WORLD
+    cache = tsfc_interface.TSFCKernel._cache
+    added = 0
+    if comm.rank == 0:
+        with open(manifest, "r") as f:
+            kernels = json.load(f)["kernels"]
+        for key, data in kernels.items():
+            if os.path.exists(cache.filepath(key)):
+                continue
+            cache.write_file(key, gzip.decompress(base64.b64decode(data)))
+            added += 1
+    return comm.bcast(added, root=0)
@@ -8,17 +8,20 @@ from firedrake.dmhooks import get_appctx, push_appctx, pop_appctx
 from collections import namedtuple
 import operator
 from functools import partial
+import ctypes
 import numpy
 from ufl import VectorElement, MixedElement
 from tsfc.kernel_interface.firedrake_loopy import make_builder
 
 from pyop2 import op2
+from pyop2 import compilation
 from pyop2 import base as pyop2
 from pyop2 import sequential as seq
 from pyop2.codegen.builder import Pack, MatPack, DatPack
 from pyop2.codegen.representation import Comparison, Literal
 from pyop2.codegen.rep2loopy import register_petsc_function
-from pyop2.datatypes import IntType
+from pyop2.datatypes import IntType, as_cstr
+from pyop2.utils import get_petsc_dir
 
 __all__ = ("PatchPC", "PlaneSmoother", "PatchSNES")
 
@@ -264,6 +267,138 @@ def residual_funptr(form, state):
     return cell_kernels, int_facet_kernels
 
 
+# PETSc functions registering patch callbacks which may be called from
+# C; anything else falls back to a Python callback.
+c_patch_setters = frozenset(["PCPatchSetComputeOperator",
+                             "PCPatchSetComputeOperatorInteriorFacets",
+                             "PCPatchSetComputeFunction",
+                             "PCPatchSetComputeFunctionInteriorFacets",
+                             "SNESPatchSetComputeOperator",
+                             "SNESPatchSetComputeFunction"])
+
+
+def make_c_callback(kernel, data_args, map_args, setter,
+                    state_data_slot=None, state_map_slot=None,
+                    residual=False, zero_out=True, point2facetnumber=None,
+                    comm=None):
+    """Compile a PCPatch callback which calls a kernel over the
+    entities of a patch.
+
+    The kernel arguments which do not depend on the patch are bound
+    (as pointers) when the callback is created, so no Python is
+    executed per patch.
+
+    :arg kernel: the :class:`CompiledKernel` to call.
+    :arg data_args: the data arguments to the kernel, ``None`` in the
+        slot for the state.
+    :arg map_args: the map arguments to the kernel (after the patch
+        dof map), ``None`` in the slot for the state.
+    :arg setter: name of the PETSc function registering the
+        callback, e.g. ``"PCPatchSetComputeOperator"``.
+    :arg state_data_slot: index of the state in ``data_args``.
+    :arg state_map_slot: index of the state map in ``map_args``.
+    :arg residual: does the callback compute a residual (rather than
+        an operator)?
+    :arg zero_out: should a residual callback zero its output before
+        accumulating into it?  PCPatch calls the interior facet
+        residual callback after the cell one on the same vector, so
+        only the latter should.
+    :arg point2facetnumber: optional array mapping mesh points to
+        facet numbers, if the patch entities are facets.
+    :arg comm: the communicator to compile on.
+    :returns: a tuple ``(set_callback, ctx)`` of the function which
+        registers the callback on a PC or SNES handle, and the
+        context (which must be kept alive while the callback is in
+        use).
+    """
+    ctx = [ctypes.cast(kernel.funptr, ctypes.c_void_p).value]
+    if point2facetnumber is not None:
+        ctx.append(point2facetnumber.ctypes.data)
+    else:
+        ctx.append(0)
+
+    def bind(args, slot, special):
+        for i, arg in enumerate(args):
+            if i == slot:
+                yield special
+            else:
+                yield "ctx[%d]" % len(ctx)
+                ctx.append(arg)
+
+    args = ["(void *)out" if residual else "(void *)tensor"]
+    args.extend(bind(data_args, state_data_slot, "(void *)state"))
+    args.append("(void *)dofs")
+    args.extend(bind(map_args, state_map_slot, "(void *)dofsWithAll"))
+    ctx = numpy.asarray(ctx, dtype=numpy.uintp)
+
+    code = {"setter": setter,
+            "IntType": as_cstr(IntType),
+            "obj_type": "SNES" if setter.startswith("SNES") else "PC",
+            "tensor_type": "Vec" if residual else "Mat",
+            "kernel_args": ", ".join(["void *"] * len(args)),
+            "args": ", ".join(args)}
+    code["entities"] = "facets" if point2facetnumber is not None else "entities"
+    code["get_facets"] = """
+    %(IntType)s *facets = NULL;
+    ierr = PetscMalloc1(nentity, &facets);CHKERRQ(ierr);
+    for (PetscInt i = 0; i < nentity; i++) {
+        facets[i] = ((const %(IntType)s *)ctx[1])[entities[i]];
+    }""" % code if point2facetnumber is not None else ""
+    code["free_facets"] = "ierr = PetscFree(facets);CHKERRQ(ierr);" if point2facetnumber is not None else ""
+    code["get_state"] = "ierr = VecGetArrayRead(x, &state);CHKERRQ(ierr);" if state_data_slot is not None else ""
+    code["restore_state"] = "ierr = VecRestoreArrayRead(x, &state);CHKERRQ(ierr);" if state_data_slot is not None else ""
+    code["get_out"] = """%s
+    ierr = VecGetArray(tensor, &out);CHKERRQ(ierr);""" % ("ierr = VecSet(tensor, 0.0);CHKERRQ(ierr);" if zero_out else "") if residual else ""
+    code["restore_out"] = "ierr = VecRestoreArray(tensor, &out);CHKERRQ(ierr);" if residual else ""
+
+    src = """
+#include <petsc.h>
+
+typedef void (*kernel_t)(%(IntType)s, %(IntType)s, const %(IntType)s *, %(kernel_args)s);
+
+static PetscErrorCode patch_callback(PC pc, PetscInt point, Vec x, %(tensor_type)s tensor,
+                                     IS entityIS, PetscInt ndof, const PetscInt *dofs,
+                                     const PetscInt *dofsWithAll, void *ctx_)
+{
+    void **ctx = (void **)ctx_;
+    kernel_t kernel = (kernel_t)ctx[0];
+    const PetscInt *entities = NULL;
+    const PetscScalar *state = NULL;
+    PetscScalar *out = NULL;
+    PetscInt nentity;
+    PetscErrorCode ierr;
+
+    PetscFunctionBegin;
+    ierr = ISGetLocalSize(entityIS, &nentity);CHKERRQ(ierr);
+    ierr = ISGetIndices(entityIS, &entities);CHKERRQ(ierr);
+    %(get_facets)s
+    %(get_state)s
+    %(get_out)s
+    kernel(0, nentity, %(entities)s, %(args)s);
+    %(restore_out)s
+    %(restore_state)s
+    %(free_facets)s
+    ierr = ISRestoreIndices(entityIS, &entities);CHKERRQ(ierr);
+    PetscFunctionReturn(0);
+}
+
+PetscErrorCode set_patch_callback(%(obj_type)s obj, void *ctx)
+{
+    return %(setter)s(obj, patch_callback, ctx);
+}
+""" % code
+    petsc_dirs = get_petsc_dir()
+    set_callback = compilation.load(src, "c", "set_patch_callback",
+                                    cppargs=["-I%s/include" % d for d in petsc_dirs],
+                                    ldargs=(["-L%s/lib" % d for d in petsc_dirs]
+                                            + ["-Wl,-rpath,%s/lib" % d for d in petsc_dirs]
+                                            + ["-lpetsc"]),
+                                    comm=comm)
+    set_callback.argtypes = [ctypes.c_voidp, ctypes.c_voidp]
+    set_callback.restype = ctypes.c_int
+    return set_callback, ctx
+
+
 def bcdofs(bc, ghost=True):
     # Return the global dofs fixed by a DirichletBC
     # in the numbering given by concatenation of all the
@@ -524,8 +659,7 @@ class PatchBase(PCSNESBase):
             point2facetnumber = J.ufl_domain().interior_facets.point2facetnumber
 
             def Jfacet_op(pc, point, vec, mat, facetIS, facet_dofmap, facet_dofmapWithAll):
-                facets = numpy.asarray(list(map(point2facetnumber.__getitem__, facetIS.indices)),
-                                       dtype=IntType)
+                facets = point2facetnumber[facetIS.indices]
                 nfacet = len(facets)
                 dofs = facet_dofmap.ctypes.data
                 if facet_Jop_state_data_slot is not None:
@@ -591,7 +725,7 @@ class PatchBase(PCSNESBase):
                 if Fint_facet_kernel.kinfo.oriented:
                     facet_Fop_coeffs.append(F.ufl_domain().cell_orientations())
                 for n in Fint_facet_kernel.kinfo.coefficient_map:
-                    facet_Fop_coeffs.append(J.coefficients()[n])
+                    facet_Fop_coeffs.append(F.coefficients()[n])
 
                 facet_Fop_data_args = []
                 facet_Fop_map_args = []
@@ -600,8 +734,8 @@ class PatchBase(PCSNESBase):
                 seen = set()
                 for c in facet_Fop_coeffs:
                     if c is Fstate:
-                        facet_Fop_state_data_slot = len(Fop_data_args)
-                        facet_Fop_state_map_slot = len(Fop_map_args)
+                        facet_Fop_state_data_slot = len(facet_Fop_data_args)
+                        facet_Fop_state_map_slot = len(facet_Fop_map_args)
                         facet_Fop_data_args.append(None)
                         facet_Fop_map_args.append(None)
                         continue
@@ -617,17 +751,17 @@ class PatchBase(PCSNESBase):
 
                 point2facetnumber = F.ufl_domain().interior_facets.point2facetnumber
 
-                def Ffacet_op(pc, point, vec, mat, facetIS, facet_dofmap, facet_dofmapWithAll):
-                    facets = numpy.asarray(list(map(point2facetnumber.__getitem__, facetIS.indices)),
-                                           dtype=IntType)
+                def Ffacet_op(pc, point, vec, out, facetIS, facet_dofmap, facet_dofmapWithAll):
+                    facets = point2facetnumber[facetIS.indices]
                     nfacet = len(facets)
                     dofs = facet_dofmap.ctypes.data
+                    outdata = out.array
                     if facet_Fop_state_data_slot is not None:
                         assert facet_dofmapWithAll is not None
                         facet_Fop_data_args[facet_Fop_state_data_slot] = vec.array_r.ctypes.data
                         facet_Fop_map_args[facet_Fop_state_map_slot] = facet_dofmapWithAll.ctypes.data
-                    Fint_facet_kernel.funptr(0, nfacet, facets.ctypes.data, mat.handle, *facet_Fop_data_args,
-                                             dofs, *facet_Fop_map_args)
+                    Fint_facet_kernel.funptr(0, nfacet, facets.ctypes.data, outdata.ctypes.data,
+                                             *facet_Fop_data_args, dofs, *facet_Fop_map_args)
 
         patch.setDM(self.plex)
         patch.setPatchCellNumbering(mesh._cell_numbering)
@@ -641,13 +775,45 @@ class PatchBase(PCSNESBase):
                                          offsets,
                                          ghost_bc_nodes,
                                          global_bc_nodes)
-        patch.setPatchComputeOperator(Jop)
+
+        compiled = PETSc.Options(patch.getOptionsPrefix()).getBool("compiled_callbacks", default=True)
+        # Keep compiled callbacks (and their contexts) alive
+        self._callbacks = []
+
+        def set_callback(name, python_op, kernel, data_args, map_args,
+                         state_data_slot, state_map_slot, **kwargs):
+            setter = "%sPatchSet%s" % (type(patch).__name__, name)
+            if compiled and setter in c_patch_setters:
+                set_cb, cb_ctx = make_c_callback(kernel, data_args, map_args, setter,
+                                                 state_data_slot=state_data_slot,
+                                                 state_map_slot=state_map_slot,
+                                                 comm=patch.comm, **kwargs)
+                ierr = set_cb(patch.handle, cb_ctx.ctypes.data)
+                if ierr:
+                    raise PETSc.Error(ierr)
+                self._callbacks.append((set_cb, cb_ctx))
+            else:
+                getattr(patch, "setPatch%s" % name)(python_op)
+
+        set_callback("ComputeOperator", Jop, Jcell_kernel,
+                     Jop_data_args, Jop_map_args,
+                     Jop_state_data_slot, Jop_state_map_slot)
         if Jhas_int_facet_kernel:
-            patch.setPatchComputeOperatorInteriorFacets(Jfacet_op)
+            set_callback("ComputeOperatorInteriorFacets", Jfacet_op, Jint_facet_kernel,
+                         facet_Jop_data_args, facet_Jop_map_args,
+                         facet_Jop_state_data_slot, facet_Jop_state_map_slot,
+                         point2facetnumber=J.ufl_domain().interior_facets.point2facetnumber)
         if set_residual:
-            patch.setPatchComputeFunction(Fop)
+            set_callback("ComputeFunction", Fop, Fcell_kernel,
+                         Fop_data_args, Fop_map_args,
+                         Fop_state_data_slot, Fop_state_map_slot,
+                         residual=True)
             if Fhas_int_facet_kernel:
-                patch.setPatchComputeFunctionInteriorFacets(Ffacet_op)
+                set_callback("ComputeFunctionInteriorFacets", Ffacet_op, Fint_facet_kernel,
+                             facet_Fop_data_args, facet_Fop_map_args,
+                             facet_Fop_state_data_slot, facet_Fop_state_map_slot,
+                             residual=True, zero_out=False,
+                             point2facetnumber=F.ufl_domain().interior_facets.point2facetnumber)
 
         patch.setPatchConstructType(PETSc.PC.PatchConstructType.PYTHON, operator=self.user_construction_op)
         patch.setAttr("ctx", ctx)
@@ -23,7 +23,7 @@ import os.path
 from firedrake_citations import Citations
 from firedrake.tsfc_interface import SplitKernel, KernelInfo, TSFCKernel
 from firedrake.slate.slac.kernel_builder import LocalKernelBuilder
-from firedrake.slate.slac.utils import topological_sort
+from firedrake.slate.slac.utils import topological_sort, solve_inverse_products
 from firedrake import op2
 from firedrake.logging import logger
 from firedrake.parameters import parameters
@@ -85,7 +85,12 @@ def compile_expression(slate_expr, tsfc_parameters=None):
 
     :arg slate_expr: a :class:'TensorBase' expression.
     :arg tsfc_parameters: an optional `dict` of form compiler parameters to
-        be passed to TSFC during the compilation of ufl forms.
+        be passed to TSFC during the compilation of ufl forms.  The
+        Slate specific parameter ``"slate_solve_inverse_products"``
+        (default ``False``) selects code generation which computes
+        products with inverses, ``A.inv * B``, by solving with a
+        factorization of ``A`` rather than forming the explicit
+        local inverse.
 
     Returns: A `tuple` containing a `SplitKernel(idx, kinfo)`
     """
@@ -114,6 +119,12 @@ def generate_kernel(slate_expr, tsfc_parameters=None):
     if len(slate_expr.ufl_domains()) > 1:
         raise NotImplementedError("Multiple domains not implemented.")
 
+    # Slate specific parameters are not passed on to TSFC
+    if tsfc_parameters is not None:
+        tsfc_parameters = dict(tsfc_parameters)
+        if tsfc_parameters.pop("slate_solve_inverse_products", False):
+            slate_expr = solve_inverse_products(slate_expr)
+
     Citations().register("Gibson2018")
     # Create a builder for the Slate expression
     builder = LocalKernelBuilder(expression=slate_expr,
@@ -230,3 +230,69 @@ def traverse_dags(exprs):
             if operand not in seen:
                 seen.add(operand)
                 container.append(operand)
+
+
+def solve_inverse_products(expr):
+    """Rewrites a Slate expression so that products with the inverse
+    of a factorized tensor, ``A.inv * B``, are computed by solving
+    with the factorization, ``A.solve(B)``, rather than by forming the
+    explicit inverse and multiplying.  Factorizations of the same
+    tensor are shared, so each is only computed once per cell.
+
+    :arg expr: A Slate expression.
+
+    Returns: An equivalent Slate expression.
+    """
+    from firedrake.slate import slate
+
+    def is_factorized_inverse(tensor):
+        return (isinstance(tensor, slate.Inverse)
+                and isinstance(tensor.operands[0], slate.Factorization))
+
+    cache = {}
+
+    def rewrite(tensor):
+        try:
+            return cache[tensor]
+        except KeyError:
+            pass
+        if isinstance(tensor, (slate.Tensor, slate.AssembledVector)):
+            result = tensor
+        elif isinstance(tensor, slate.Block):
+            operand, = tensor.operands
+            result = slate.Block(rewrite(operand), tensor._indices)
+        elif isinstance(tensor, slate.Factorization):
+            operand, = tensor.operands
+            result = slate.Factorization(rewrite(operand),
+                                         decomposition=tensor.decomposition)
+        elif isinstance(tensor, slate.Solve):
+            factorization, B = tensor.operands
+            A, = factorization.operands
+            result = slate.Solve(rewrite(A), rewrite(B),
+                                 decomposition=factorization.decomposition)
+        elif isinstance(tensor, slate.Mul) and is_factorized_inverse(tensor.operands[0]):
+            # A.inv * B -> A.solve(B)
+            inverse, B = tensor.operands
+            factorization, = inverse.operands
+            A, = factorization.operands
+            result = slate.Solve(rewrite(A), rewrite(B),
+                                 decomposition=factorization.decomposition)
+        elif isinstance(tensor, slate.Mul) and isinstance(tensor.operands[0], slate.Mul) \
+                and is_factorized_inverse(tensor.operands[0].operands[1]):
+            # (C * A.inv) * B -> C * A.solve(B)
+            product, B = tensor.operands
+            C, inverse = product.operands
+            factorization, = inverse.operands
+            A, = factorization.operands
+            result = slate.Mul(rewrite(C),
+                               slate.Solve(rewrite(A), rewrite(B),
+                                           decomposition=factorization.decomposition))
+        else:
+            operands = tuple(rewrite(op) for op in tensor.operands)
+            if operands == tensor.operands:
+                result = tensor
+            else:
+                result = type(tensor)(*operands)
+        return cache.setdefault(tensor, result)
+
+    return rewrite(expr)
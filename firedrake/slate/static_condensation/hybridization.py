@@ -25,6 +25,13 @@ class HybridizationPC(SCBase):
 
     The forward eliminations and backwards reconstructions
     are performed element-local using the Slate language.
+
+    With the option ``-hybridization_cache_local_inverses``, the
+    inverses of the element-local broken operators are computed once
+    per :meth:`update` and stored (in a block diagonal matrix), rather
+    than recomputed in every forward elimination and backward
+    reconstruction.  The memory this uses is logged and shown by
+    ``-ksp_view``.
     """
 
     @timed_function("HybridInit")
@@ -198,10 +205,30 @@ class HybridizationPC(SCBase):
         # Make a SLATE tensor from Kform
         K = Tensor(Kform)
 
+        self.cache_local_inverses = PETSc.Options().getBool(prefix + "cache_local_inverses",
+                                                            False)
+        if self.cache_local_inverses:
+            # The broken operator is block diagonal, so assembling
+            # its local inverses gives its global inverse.
+            self.Ainv = allocate_matrix(Atilde.inv,
+                                        form_compiler_parameters=self.ctx.fc_params,
+                                        mat_type="aij")
+            self.report_local_inverse_memory(self.Ainv)
+            self._assemble_Ainv = create_assembly_callable(Atilde.inv,
+                                                           tensor=self.Ainv,
+                                                           form_compiler_parameters=self.ctx.fc_params,
+                                                           mat_type="aij")
+            self._assemble_Ainv()
+            self.Ainv.force_evaluation()
+            self.broken_work = Function(V_d)
+            eliminated_residual = AssembledVector(self.broken_work)
+        else:
+            eliminated_residual = Atilde.inv * AssembledVector(self.broken_residual)
+
         # Assemble the Schur complement operator and right-hand side
         self.schur_rhs = Function(TraceSpace)
         self._assemble_Srhs = create_assembly_callable(
-            K * Atilde.inv * AssembledVector(self.broken_residual),
+            K * eliminated_residual,
             tensor=self.schur_rhs,
             form_compiler_parameters=self.ctx.fc_params)
 
@@ -235,11 +262,16 @@ class HybridizationPC(SCBase):
         trace_ksp.setFromOptions()
         self.trace_ksp = trace_ksp
 
-        split_mixed_op = dict(split_form(Atilde.form))
-        split_trace_op = dict(split_form(K.form))
-
         # Generate reconstruction calls
-        self._reconstruction_calls(split_mixed_op, split_trace_op)
+        if self.cache_local_inverses:
+            self._assemble_broken_rhs = create_assembly_callable(
+                AssembledVector(self.broken_residual) - K.T * AssembledVector(self.trace_solution),
+                tensor=self.broken_work,
+                form_compiler_parameters=self.ctx.fc_params)
+        else:
+            split_mixed_op = dict(split_form(Atilde.form))
+            split_trace_op = dict(split_form(K.form))
+            self._reconstruction_calls(split_mixed_op, split_trace_op)
 
     def _reconstruction_calls(self, split_mixed_op, split_trace_op):
         """This generates the reconstruction calls for the unknowns using the
@@ -293,6 +325,9 @@ class HybridizationPC(SCBase):
         """Update by assembling into the operator. No need to
         reconstruct symbolic objects.
         """
+        if self.cache_local_inverses:
+            self._assemble_Ainv()
+            self.Ainv.force_evaluation()
         self._assemble_S()
         self.S.force_evaluation()
 
@@ -332,6 +367,11 @@ class HybridizationPC(SCBase):
                      is_loopy_kernel=True)
 
         with timed_region("HybridRHS"):
+            if self.cache_local_inverses:
+                # Apply the stored local inverses
+                with self.broken_residual.dat.vec_ro as r, \
+                     self.broken_work.dat.vec_wo as w:
+                    self.Ainv.petscmat.mult(r, w)
             # Compute the rhs for the multiplier system
             self._assemble_Srhs()
 
@@ -358,11 +398,19 @@ class HybridizationPC(SCBase):
         :arg y: a PETSc vector for placing the resulting fields.
         """
 
-        # We assemble the unknown which is an expression
-        # of the first eliminated variable.
-        self._sub_unknown()
-        # Recover the eliminated unknown
-        self._elim_unknown()
+        if self.cache_local_inverses:
+            # Solve all the local systems at once with the stored
+            # local inverses.
+            self._assemble_broken_rhs()
+            with self.broken_work.dat.vec_ro as r, \
+                 self.broken_solution.dat.vec_wo as x:
+                self.Ainv.petscmat.mult(r, x)
+        else:
+            # We assemble the unknown which is an expression
+            # of the first eliminated variable.
+            self._sub_unknown()
+            # Recover the eliminated unknown
+            self._elim_unknown()
 
         with timed_region("HybridProject"):
             # Project the broken solution into non-broken spaces
@@ -394,6 +442,7 @@ class HybridizationPC(SCBase):
         self.trace_ksp.view(viewer)
         viewer.popASCIITab()
         viewer.printfASCII("Locally reconstructing the broken solutions from the multipliers.\n")
+        self.view_local_inverse_memory(viewer)
         viewer.pushASCIITab()
         viewer.printfASCII("Project the broken hdiv solution into the HDiv space.\n")
         viewer.popASCIITab()
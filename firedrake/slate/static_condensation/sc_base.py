@@ -1,6 +1,9 @@
 import abc
 
+from firedrake.logging import logger
+from firedrake.petsc import PETSc
 from firedrake.preconditioners import PCBase
+from pyop2.datatypes import IntType, ScalarType
 from pyop2.profiling import timed_region
 
 
@@ -58,6 +61,31 @@ class SCBase(PCBase):
         with timed_region("SCBackSub"):
             self.backward_substitution(pc, y)
 
+    def report_local_inverse_memory(self, mat):
+        """Record (and log) the memory used to store the local
+        inverses of the eliminated operator.
+
+        :arg mat: the :class:`.Matrix` the local inverses are
+            assembled into.
+        """
+
+        info = mat.petscmat.getInfo(PETSc.Mat.InfoType.GLOBAL_SUM)
+        nbytes = int(info["nz_allocated"]) * (ScalarType.itemsize + IntType.itemsize)
+        self.local_inverse_memory = nbytes
+        logger.info("%s: storing local inverses uses %.1f MB",
+                    type(self).__name__, nbytes / 2**20)
+
+    def view_local_inverse_memory(self, viewer):
+        """Print the memory used to store local inverses (if any).
+
+        :arg viewer: a PETSc viewer.
+        """
+
+        nbytes = getattr(self, "local_inverse_memory", None)
+        if nbytes is not None:
+            viewer.printfASCII("Reusing cached local inverses (%.1f MB).\n"
+                               % (nbytes / 2**20))
+
     def applyTranspose(self, pc, x, y):
         """Apply the transpose of the preconditioner."""
 
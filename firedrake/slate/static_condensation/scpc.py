@@ -1,7 +1,7 @@
 from firedrake.slate.static_condensation.sc_base import SCBase
 from firedrake.matrix_free.operators import ImplicitMatrixContext
 from firedrake.petsc import PETSc
-from firedrake.slate.slate import Tensor
+from firedrake.slate.slate import AssembledVector, Tensor
 from pyop2.profiling import timed_function
 
 
@@ -14,6 +14,13 @@ class SCPC(SCBase):
 
     """A Slate-based python preconditioner implementation of
     static condensation for problems with up to three fields.
+
+    With the option ``-pc_sc_cache_local_inverses``, and a single
+    discontinuous eliminated field, the inverses of the element-local
+    eliminated operator are computed once per :meth:`update` and
+    stored (in a block diagonal matrix), rather than recomputed in
+    every forward elimination and backward substitution.  The memory
+    this uses is logged and shown by ``-ksp_view``.
     """
 
     @timed_function("SCPCInit")
@@ -56,6 +63,17 @@ class SCPC(SCBase):
             # mixed space.
             elim_fields = [i for i in range(0, len(W) - 1)]
 
+        self.cache_local_inverses = PETSc.Options().getBool(pc.getOptionsPrefix()
+                                                            + "pc_sc_cache_local_inverses",
+                                                            False)
+        if self.cache_local_inverses:
+            if len(elim_fields) != 1:
+                raise NotImplementedError("Caching local inverses only implemented "
+                                          "for a single eliminated field")
+            if not is_cellwise(W[elim_fields[0]]):
+                raise ValueError("Caching local inverses requires a discontinuous "
+                                 "eliminated field")
+
         condensed_fields = list(set(range(len(W))) - set(elim_fields))
         if len(condensed_fields) != 1:
             raise NotImplementedError("Cannot condense to more than one field")
@@ -90,6 +108,29 @@ class SCPC(SCBase):
         S_expr = reduced_sys.lhs
         r_expr = reduced_sys.rhs
 
+        if self.cache_local_inverses:
+            e_field, = elim_fields
+            Aee = A.blocks[e_field, e_field]
+            # The eliminated operator is block diagonal, so
+            # assembling its local inverses gives its global inverse.
+            self.Aee_inv = allocate_matrix(Aee.inv,
+                                           form_compiler_parameters=self.cxt.fc_params,
+                                           mat_type="aij")
+            self.report_local_inverse_memory(self.Aee_inv)
+            self._assemble_Aee_inv = create_assembly_callable(
+                Aee.inv,
+                tensor=self.Aee_inv,
+                form_compiler_parameters=self.cxt.fc_params,
+                mat_type="aij")
+            self._assemble_Aee_inv()
+            self.Aee_inv.force_evaluation()
+            self.e_field = e_field
+            self.work = Function(W)
+            # r = b_f - A_fe * (A_ee.inv * b_e), with the bracketed
+            # term computed with the stored inverse.
+            r_expr = (AssembledVector(self.residual.split()[c_field])
+                      - A.blocks[c_field, e_field] * AssembledVector(self.work.split()[e_field]))
+
         # Construct the condensed right-hand side
         self._assemble_Srhs = create_assembly_callable(
             r_expr,
@@ -162,6 +203,23 @@ class SCPC(SCBase):
         from firedrake.assemble import create_assembly_callable
 
         fields = x.split()
+        if self.cache_local_inverses:
+            # Assemble r_e = b_e - A_ef * x_f, then apply the stored
+            # local inverses.
+            system, = backward_solve(A, rhs, x, reconstruct_fields=elim_fields)
+            i, = system.field_idx
+            work = self.work.split()[i]
+            assemble_rhs = create_assembly_callable(
+                system.rhs,
+                tensor=work,
+                form_compiler_parameters=self.cxt.fc_params)
+
+            def solve_call():
+                assemble_rhs()
+                with work.dat.vec_ro as r, fields[i].dat.vec_wo as y:
+                    self.Aee_inv.petscmat.mult(r, y)
+            return [solve_call]
+
         systems = backward_solve(A, rhs, x, reconstruct_fields=elim_fields)
 
         local_solvers = []
@@ -184,6 +242,9 @@ class SCPC(SCBase):
         need to reconstruct symbolic objects.
         """
 
+        if self.cache_local_inverses:
+            self._assemble_Aee_inv()
+            self.Aee_inv.force_evaluation()
         self._assemble_S()
         self.S.force_evaluation()
 
@@ -199,6 +260,13 @@ class SCPC(SCBase):
         with self.residual.dat.vec_wo as v:
             x.copy(v)
 
+        if self.cache_local_inverses:
+            # Apply the stored local inverses
+            be = self.residual.split()[self.e_field]
+            ye = self.work.split()[self.e_field]
+            with be.dat.vec_ro as r, ye.dat.vec_wo as y:
+                self.Aee_inv.petscmat.mult(r, y)
+
         # Now assemble residual for the reduced problem
         self._assemble_Srhs()
 
@@ -237,3 +305,18 @@ class SCPC(SCBase):
         viewer.printfASCII("Static condensation preconditioner\n")
         viewer.printfASCII("KSP to solve the reduced system:\n")
         self.condensed_ksp.view(viewer=viewer)
+        self.view_local_inverse_memory(viewer)
+
+
+def is_cellwise(V):
+    """Are all the degrees of freedom of a function space
+    associated with cell interiors (that is, is it discontinuous)?
+
+    :arg V: a (non-mixed) function space.
+    """
+
+    entity_dofs = V.finat_element.entity_dofs()
+    cell = max(entity_dofs)
+    return all(len(dofs) == 0
+               for dim, entities in entity_dofs.items() if dim != cell
+               for dofs in entities.values())
@@ -19,12 +19,16 @@
 
 __all__ = ["solve"]
 
+import numbers
+from collections import OrderedDict
+
 import ufl
 
 import firedrake.linear_solver as ls
 import firedrake.variational_solver as vs
 from firedrake import solving_utils
 from firedrake import dmhooks
+from firedrake.parameters import parameters
 import firedrake
 
 
@@ -116,6 +120,18 @@ def solve(*args, **kwargs):
 
     In the same fashion you can add the near nullspace using the
     ``near_nullspace`` keyword argument.
+
+    *Reusing solvers*
+
+    Each call to solve a variational problem builds a new solver, with
+    new matrices and preconditioner.  If ``parameters["cache_solvers"]``
+    is ``True``, the solver is instead cached on the solution
+    :class:`.Function` and reused by later calls with structurally
+    identical forms (with the same coefficients), the same boundary
+    condition objects and the same parameters.  This reuses the matrix
+    sparsity and the Krylov solver and, for linear problems whose
+    bilinear form has no coefficients, the assembled matrix and the
+    preconditioner (for example, an LU factorisation).
     """
 
     assert(len(args) > 0)
@@ -138,11 +154,33 @@ def _solve_varproblem(*args, **kwargs):
         options_prefix = _extract_args(*args, **kwargs)
 
     appctx = kwargs.get("appctx", {})
+
+    key = None
+    if parameters["cache_solvers"]:
+        key = _solver_cache_key(eq, u, bcs, J, Jp, form_compiler_parameters,
+                                solver_parameters, nullspace, nullspace_T,
+                                near_nullspace, options_prefix, appctx)
+    if key is not None:
+        cache = u.__dict__.setdefault("_solver_cache", OrderedDict())
+        try:
+            solver = cache[key]
+        except KeyError:
+            pass
+        else:
+            cache.move_to_end(key)
+            solver.solve()
+            return
+
     # Solve linear variational problem
     if isinstance(eq.lhs, ufl.Form) and isinstance(eq.rhs, ufl.Form):
-        # Create problem
+        # Create problem.  The Jacobian may only be held constant
+        # between solves with a cached solver if it has no
+        # coefficients whose values could change.
+        constant_jacobian = key is None or not any(form.coefficients() for form in (eq.lhs, Jp)
+                                                   if form is not None)
         problem = vs.LinearVariationalProblem(eq.lhs, eq.rhs, u, bcs, Jp,
-                                              form_compiler_parameters=form_compiler_parameters)
+                                              form_compiler_parameters=form_compiler_parameters,
+                                              constant_jacobian=constant_jacobian)
         # Create solver and call solve
         solver = vs.LinearVariationalSolver(problem, solver_parameters=solver_parameters,
                                             nullspace=nullspace,
@@ -150,7 +188,6 @@ def _solve_varproblem(*args, **kwargs):
                                             near_nullspace=near_nullspace,
                                             options_prefix=options_prefix,
                                             appctx=appctx)
-        solver.solve()
 
     # Solve nonlinear variational problem
     else:
@@ -166,7 +203,80 @@ def _solve_varproblem(*args, **kwargs):
                                                near_nullspace=near_nullspace,
                                                options_prefix=options_prefix,
                                                appctx=appctx)
-        solver.solve()
+
+    if key is not None:
+        cache[key] = solver
+        # Only keep the most recently used solvers, so that arguments
+        # which never match (say a Constant rebuilt each time step) do
+        # not accumulate solvers on u.
+        while len(cache) > _SOLVER_CACHE_SIZE:
+            cache.popitem(last=False)
+    solver.solve()
+
+
+_SOLVER_CACHE_SIZE = 4
+"""The number of solvers cached on each solution Function."""
+
+
+def _solver_cache_key(eq, u, bcs, J, Jp, form_compiler_parameters,
+                      solver_parameters, nullspace, nullspace_T,
+                      near_nullspace, options_prefix, appctx):
+    """Return a key identifying the solver built by
+    :func:`_solve_varproblem` for some arguments, for the cache of
+    solvers for the solution ``u``, or ``None`` if it cannot be
+    cached.
+
+    Forms are identified by their signatures, their meshes and the
+    coefficients they contain, so that forms rebuilt from the same
+    coefficients share a key.  Dirichlet boundary conditions are
+    identified by their function space, subdomain, method and value
+    (numbers by value, anything else by identity), so that conditions
+    rebuilt each time step share a key.  Everything else is identified
+    by value (parameters) or by identity; the cached solver holds on
+    to all these objects, so their ids cannot be reused."""
+    from firedrake.petsc import flatten_parameters
+    from firedrake.bcs import DirichletBC
+
+    def form_key(form):
+        if isinstance(form, ufl.Form):
+            return (form.signature(),
+                    tuple(d.ufl_id() for d in form.ufl_domains()),
+                    tuple(c.count() for c in form.coefficients()))
+        elif form is None or isinstance(form, int):
+            return form
+        raise ValueError("Cannot cache solvers for %r" % type(form).__name__)
+
+    def hashable(value):
+        if isinstance(value, (list, tuple)):
+            return tuple(map(hashable, value))
+        elif isinstance(value, (numbers.Number, str)):
+            return value
+        return id(value)
+
+    def bc_key(bc):
+        if not isinstance(bc, DirichletBC):
+            return id(bc)
+        V = bc.function_space()
+        return (V, V.index, V.component,
+                V.parent.index if V.parent is not None else None,
+                hashable(bc.sub_domain), bc.method,
+                hashable(bc._original_val))
+
+    def parameters_key(parameters):
+        return tuple(sorted((k, repr(v))
+                            for k, v in flatten_parameters(parameters or {}).items()))
+
+    try:
+        forms = tuple(map(form_key, (eq.lhs, eq.rhs, J, Jp)))
+    except ValueError:
+        return None
+    return (forms,
+            tuple(map(bc_key, bcs)),
+            parameters_key(form_compiler_parameters),
+            parameters_key(solver_parameters),
+            id(nullspace), id(nullspace_T), id(near_nullspace),
+            options_prefix,
+            tuple(sorted((k, id(v)) for k, v in appctx.items())))
 
 
 def _la_solve(A, x, b, **kwargs):
@@ -1,3 +1,4 @@
+import copy
 import numpy
 
 import itertools
@@ -63,6 +64,11 @@ class _SNESContext(object):
     :arg pre_function_callback: User-defined function called immediately
         before residual assembly
     :arg options_prefix: The options prefix of the SNES.
+    :arg jacobian_policy: An optional :class:`~.LaggingPolicy` deciding
+        when to reassemble the Jacobian.
+    :arg preconditioner_policy: An optional :class:`~.LaggingPolicy`
+        deciding when to reassemble the preconditioning matrix, if it
+        is separate from the Jacobian.
 
     The idea here is that the SNES holds a shell DM which contains
     this object as "user context".  When the SNES calls back to the
@@ -72,7 +78,8 @@ class _SNESContext(object):
     """
     def __init__(self, problem, mat_type, pmat_type, appctx=None,
                  pre_jacobian_callback=None, pre_function_callback=None,
-                 options_prefix=None):
+                 options_prefix=None, jacobian_policy=None,
+                 preconditioner_policy=None):
         from firedrake.assemble import create_assembly_callable
         from firedrake.bcs import DirichletBC
         if pmat_type is None:
@@ -131,6 +138,10 @@ class _SNESContext(object):
                                                            form_compiler_parameters=self.fcp)
 
         self._jacobian_assembled = False
+        self._preconditioner_assembled = False
+        # Policies are stateful, so J and Jp each get their own.
+        self._jacobian_policy = copy.copy(jacobian_policy)
+        self._preconditioner_policy = copy.copy(preconditioner_policy)
         self._splits = {}
         self._coarse = None
         self._fine = None
@@ -148,6 +159,19 @@ class _SNESContext(object):
         snes.setJacobian(self.form_jacobian, J=self._jac.petscmat,
                          P=self._pjac.petscmat)
 
+    def start_solve(self, snes):
+        r"""Inform the lagging policies of the start of a nonlinear solve."""
+        for policy in (self._jacobian_policy, self._preconditioner_policy):
+            if policy is not None:
+                policy.start_solve(snes)
+
+    @staticmethod
+    def _rebuild(policy, assembled, snes):
+        r"""Decide whether to (re)assemble an operator."""
+        if policy is None or not assembled:
+            return True
+        return policy.rebuild(snes)
+
     def set_nullspace(self, nullspace, ises=None, transpose=False, near=False):
         if nullspace is None:
             return
@@ -281,7 +305,12 @@ class _SNESContext(object):
             # Don't need to do any work with a constant jacobian
             # that's already assembled
             return
-        ctx._jacobian_assembled = True
+        rebuild_J = ctx._rebuild(ctx._jacobian_policy, ctx._jacobian_assembled, snes)
+        rebuild_P = ctx.Jp is not None and ctx._rebuild(ctx._preconditioner_policy,
+                                                        ctx._preconditioner_assembled, snes)
+        if not (rebuild_J or rebuild_P):
+            # Lagging: reuse the operators (and so the preconditioner)
+            return
 
         # X may not be the same vector as the vec behind self._x, so
         # copy guess in from X.
@@ -291,13 +320,20 @@ class _SNESContext(object):
         if ctx._pre_jacobian_callback is not None:
             ctx._pre_jacobian_callback(X)
 
-        ctx._assemble_jac()
-        ctx._jac.force_evaluation()
+        if rebuild_J:
+            ctx._jacobian_assembled = True
+            ctx._assemble_jac()
+            ctx._jac.force_evaluation()
+            if ctx._jacobian_policy is not None:
+                ctx._jacobian_policy.rebuilt(snes)
 
-        if ctx.Jp is not None:
+        if rebuild_P:
             assert P.handle == ctx._pjac.petscmat.handle
+            ctx._preconditioner_assembled = True
             ctx._assemble_pjac()
             ctx._pjac.force_evaluation()
+            if ctx._preconditioner_policy is not None:
+                ctx._preconditioner_policy.rebuilt(snes)
 
         ises = problem.J.arguments()[0].function_space()._ises
         ctx.set_nullspace(ctx._nullspace, ises, transpose=False, near=False)
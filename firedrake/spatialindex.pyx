@@ -102,3 +102,70 @@ def bounding_boxes(SpatialIndex sidx not None, np.ndarray[np.float64_t, ndim=1]
         pyids[i] = ids[i]
     free(ids)
     return pyids
+
+
+class _CIntervalIndex(ctypes.Structure):
+    """C struct IntervalIndex, see evaluate.h."""
+    _fields_ = [("n", ctypes.c_int64),
+                ("lo", ctypes.POINTER(ctypes.c_double)),
+                ("hi", ctypes.POINTER(ctypes.c_double)),
+                ("cells", ctypes.POINTER(ctypes.c_int64)),
+                ("max_width", ctypes.c_double)]
+
+
+class IntervalIndex(object):
+    """Index of the intervals of a one-dimensional mesh.
+
+    The intervals are sorted by their lower ends, so that the
+    candidates for a point are found by binary search.  Since the
+    intervals may have different lengths, the search continues below
+    the point for up to the length of the longest interval."""
+
+    def __init__(self, regions_lo, regions_hi):
+        """Initialize an interval index.
+
+        :arg regions_lo: the lower ends of the intervals.
+        :arg regions_hi: the upper ends of the intervals.
+        """
+        regions_lo = np.asarray(regions_lo, dtype=np.float64).reshape(-1)
+        regions_hi = np.asarray(regions_hi, dtype=np.float64).reshape(-1)
+        assert regions_lo.shape == regions_hi.shape
+        order = np.argsort(regions_lo, kind="mergesort")
+        self.lo = np.ascontiguousarray(regions_lo[order])
+        self.hi = np.ascontiguousarray(regions_hi[order])
+        self.cells = order.astype(np.int64)
+        if len(order):
+            self.max_width = float(np.max(self.hi - self.lo))
+        else:
+            self.max_width = 0.0
+        self._cstruct = _CIntervalIndex(len(order),
+                                        self.lo.ctypes.data_as(ctypes.POINTER(ctypes.c_double)),
+                                        self.hi.ctypes.data_as(ctypes.POINTER(ctypes.c_double)),
+                                        self.cells.ctypes.data_as(ctypes.POINTER(ctypes.c_int64)),
+                                        self.max_width)
+
+    def candidates(self, x):
+        """Return the intervals containing a point.
+
+        :arg x: the point.
+        :returns: a numpy array of candidate intervals."""
+        x = float(np.asarray(x).reshape(-1)[0])
+        end = np.searchsorted(self.lo, x, side="right")
+        start = np.searchsorted(self.lo, x - self.max_width, side="left")
+        mask = self.hi[start:end] >= x
+        return self.cells[start:end][mask]
+
+    @property
+    def ctypes(self):
+        """Returns a ctypes pointer to the native interval index."""
+        return ctypes.cast(ctypes.pointer(self._cstruct), ctypes.c_void_p)
+
+
+def from_intervals(regions_lo, regions_hi):
+    """Builds an interval index from the extents of a set of
+    intervals, the one-dimensional analogue of :func:`from_regions`.
+
+    regions_lo[i] and regions_hi[i] contain the lower and upper ends
+    of the i-th interval, respectively.
+    """
+    return IntervalIndex(regions_lo, regions_hi)
@@ -29,9 +29,43 @@ cdef extern from "libsupermesh-c.h" nogil:
     void libsupermesh_tree_intersection_finder_get_output(long* nelements, long* nindices, long* indices, long* ind_ptr);
 
 
+def preallocate_mixed_mass_matrix(numpy.ndarray[PetscInt, ndim=1, mode="c"] indptr,
+                                  numpy.ndarray[PetscInt, ndim=1, mode="c"] indices,
+                                  numpy.ndarray[PetscInt, ndim=2, mode="c"] map_A,
+                                  numpy.ndarray[PetscInt, ndim=2, mode="c"] map_B,
+                                  PETSc.Mat preallocator not None):
+    """Insert the sparsity of the mixed mass matrix into a preallocator matrix.
+
+    :arg indptr: CSR row pointer of candidate intersections, indexed
+        by cell in mesh A.
+    :arg indices: CSR column indices: the candidate cells in mesh B.
+    :arg map_A: cell node map (with halos) of V_A.
+    :arg map_B: cell node map (with halos) of V_B.
+    :arg preallocator: a MATPREALLOCATOR matrix with local to global
+        maps set.
+    """
+    cdef:
+        PetscInt cell_A, cell_B, k, num_dof_A, num_dof_B
+        PetscInt insert_mode = PETSc.InsertMode.INSERT_VALUES
+        numpy.ndarray[PetscScalar, ndim=2, mode="c"] zeros
+
+    num_dof_A = map_A.shape[1]
+    num_dof_B = map_B.shape[1]
+    zeros = numpy.zeros((num_dof_B, num_dof_A), dtype=ScalarType)
+    for cell_A in range(indptr.shape[0] - 1):
+        for k in range(indptr[cell_A], indptr[cell_A + 1]):
+            cell_B = indices[k]
+            CHKERR(MatSetValuesLocal(preallocator.mat,
+                                     num_dof_B, <const PetscInt *>&map_B[cell_B, 0],
+                                     num_dof_A, <const PetscInt *>&map_A[cell_A, 0],
+                                     <const PetscScalar *>zeros.data, insert_mode))
+    CHKERR(MatAssemblyBegin(preallocator.mat, MAT_FINAL_ASSEMBLY))
+    CHKERR(MatAssemblyEnd(preallocator.mat, MAT_FINAL_ASSEMBLY))
+
+
 # Compute M_AB:
 # For cell_A in mesh_A:
-#     For cell_B in likely(cell_A):
+#     For cell_B in candidates[cell_A]:
 #         mesh_S = supermesh(cell_A, cell_B)
 #         if mesh_S is empty: continue
 #         For cell_S in mesh_S:
@@ -41,7 +75,12 @@ cdef extern from "libsupermesh-c.h" nogil:
 #             evaluate basis functions of cell_B at dofs(B) of cell_S -> R_BS matrix
 #             compute out = R_BS^T @ M_SS @ R_AS with dense matrix triple product
 #             stuff out into relevant part of M_AB (given by outer(dofs_B, dofs_A))
-def assemble_mixed_mass_matrix(V_A, V_B, candidates,
+#
+# The candidates are given in CSR format (indptr, indices) so that
+# the whole loop runs without calling back into Python.
+def assemble_mixed_mass_matrix(V_A, V_B,
+                               numpy.ndarray[PetscInt, ndim=1, mode="c"] indptr,
+                               numpy.ndarray[PetscInt, ndim=1, mode="c"] indices,
                                numpy.ndarray[PetscReal, ndim=2, mode="c"] node_locations_A,
                                numpy.ndarray[PetscReal, ndim=2, mode="c"] node_locations_B,
                                numpy.ndarray[PetscReal, ndim=2, mode="c"] M_SS,
@@ -52,16 +91,16 @@ def assemble_mixed_mass_matrix(V_A, V_B, candidates,
         numpy.ndarray[PetscInt, ndim=2, mode="c"] vertex_map_A, vertex_map_B
         numpy.ndarray[PetscReal, ndim=2, mode="c"] vertices_A, vertices_B
         numpy.ndarray[PetscScalar, ndim=2, mode="c"] outmat
-        PetscInt cell_A, cell_B, i, gdim, num_dof_A, num_dof_B
-        PetscInt num_cell_B, num_cell_A, num_vertices
+        PetscInt cell_A, cell_B, i, j, k, gdim, num_dof_A, num_dof_B
+        PetscInt num_cell_A, num_vertices
         PetscInt insert_mode = PETSc.InsertMode.ADD_VALUES
-        const PetscInt *V_A_map, *V_B_map
+        const PetscInt *V_A_map
+        const PetscInt *V_B_map
         numpy.ndarray[PetscReal, ndim=2, mode="c"] simplex_A, simplex_B
         numpy.ndarray[PetscReal, ndim=3, mode="c"] simplices_C
         compiled_call library_call = (<compiled_call *><uintptr_t>lib)[0]
 
-    num_cell_A = V_A.mesh().cell_set.size
-    num_cell_B = V_B.mesh().cell_set.size
+    num_cell_A = indptr.shape[0] - 1
 
     outmat = numpy.empty((V_B.cell_node_map().arity,
                           V_A.cell_node_map().arity), dtype=ScalarType)
@@ -84,18 +123,23 @@ def assemble_mixed_mass_matrix(V_A, V_B, candidates,
     num_dof_A = V_A.cell_node_map().arity
     num_dof_B = V_B.cell_node_map().arity
     for cell_A in range(num_cell_A):
-        for cell_B in candidates(cell_A):
+        for i in range(num_vertices):
+            for j in range(gdim):
+                simplex_A[i, j] = vertices_A[vertex_map_A[cell_A, i], j]
+        V_A_map = <const PetscInt *>(&V_A_cell_node_map[cell_A, 0])
+        for k in range(indptr[cell_A], indptr[cell_A + 1]):
+            cell_B = indices[k]
             for i in range(num_vertices):
                 for j in range(gdim):
-                    simplex_A[i, j] = vertices_A[vertex_map_A[cell_A, i], j]
                     simplex_B[i, j] = vertices_B[vertex_map_B[cell_B, i], j]
-            library_call(<const PetscReal *>simplex_A.data, <const PetscReal *>simplex_B.data,
-                         <const PetscReal *>simplices_C.data,
-                         <const PetscReal *>node_locations_A.data,
-                         <const PetscReal *>node_locations_B.data,
-                         <const PetscScalar *>M_SS.data,
-                         <PetscScalar *>outmat.data)
-            V_A_map = <const PetscInt *>(&V_A_cell_node_map[cell_A, 0])
+            if library_call(<const PetscReal *>simplex_A.data, <const PetscReal *>simplex_B.data,
+                            <const PetscReal *>simplices_C.data,
+                            <const PetscReal *>node_locations_A.data,
+                            <const PetscReal *>node_locations_B.data,
+                            <const PetscScalar *>M_SS.data,
+                            <PetscScalar *>outmat.data) == 0:
+                # Empty supermesh, nothing to add.
+                continue
             V_B_map = <const PetscInt *>(&V_B_cell_node_map[cell_B, 0])
             CHKERR(MatSetValuesLocal(mat.mat,
                                      num_dof_B, V_B_map,
@@ -106,7 +150,13 @@ def assemble_mixed_mass_matrix(V_A, V_B, candidates,
     CHKERR(MatAssemblyEnd(mat.mat, MAT_FINAL_ASSEMBLY))
 
 
-def intersection_finder(mesh_A, mesh_B):
+def intersection_finder_csr(mesh_A, mesh_B):
+    """Find the cells of mesh_B which (may) intersect each cell of mesh_A.
+
+    :returns: a tuple ``(indptr, indices)`` in CSR format: the
+        candidates for cell ``c`` of mesh_A are
+        ``indices[indptr[c]:indptr[c+1]]``.
+    """
     # Plan:
     # Call libsupermesh_sort_intersection_finder_set_input
     # Call libsupermesh_sort_intersection_finder_query_output
@@ -164,8 +214,13 @@ def intersection_finder(mesh_A, mesh_B):
 
     libsupermesh_tree_intersection_finder_get_output(&ncells_A, &nindices, <long*>indices.data, <long*>indptr.data)
 
+    return indptr.astype(IntType), indices.astype(IntType)
+
+
+def intersection_finder(mesh_A, mesh_B):
+    indptr, indices = intersection_finder_csr(mesh_A, mesh_B)
     out = {}
-    for cell_A in range(ncells_A):
+    for cell_A in range(len(indptr) - 1):
         (start, end) = indptr[cell_A], indptr[cell_A + 1]
         out[cell_A] = indices[start:end]
 
@@ -2,7 +2,8 @@
 import firedrake
 import ctypes
 import os
-from firedrake.supermeshimpl import assemble_mixed_mass_matrix as ammm, intersection_finder
+from firedrake.supermeshimpl import assemble_mixed_mass_matrix as ammm, intersection_finder, intersection_finder_csr
+from firedrake.supermeshimpl import preallocate_mixed_mass_matrix
 from firedrake.mg.utils import get_level
 from firedrake.petsc import PETSc
 from firedrake.mg.kernels import to_reference_coordinates, compile_element
@@ -14,7 +15,7 @@ import firedrake.mg.utils as utils
 import ufl
 from ufl import inner, dx
 import numpy
-from pyop2.datatypes import ScalarType
+from pyop2.datatypes import IntType
 from pyop2.sparsity import get_preallocation
 from pyop2.compilation import load
 from pyop2.mpi import COMM_SELF
@@ -73,16 +74,20 @@ each supermesh cell.
     (mh_A, level_A) = get_level(mesh_A)
     (mh_B, level_B) = get_level(mesh_B)
 
+    # Candidate intersecting cells of B for each (owned) cell of A, in
+    # CSR format.
+    num_cell_A = mesh_A.cell_set.size
     if mesh_A is mesh_B:
-        def likely(cell_A):
-            return [cell_A]
+        indptr = numpy.arange(num_cell_A + 1, dtype=IntType)
+        indices = numpy.arange(num_cell_A, dtype=IntType)
     else:
         if (mh_A is None or mh_B is None) or (mh_A is not mh_B):
 
             # No mesh hierarchy structure, call libsupermesh for
             # intersection finding
-            intersections = intersection_finder(mesh_A, mesh_B)
-            likely = intersections.__getitem__
+            indptr, indices = intersection_finder_csr(mesh_A, mesh_B)
+            indptr = indptr[:num_cell_A + 1]
+            indices = indices[:indptr[-1]]
         else:
             # We do have a mesh hierarchy, use it
 
@@ -92,15 +97,13 @@ each supermesh cell.
             # What are the cells of B that (probably) intersect with a given cell in A?
             if level_A > level_B:
                 cell_map = mh_A.fine_to_coarse_cells[level_A]
-
-                def likely(cell_A):
-                    return cell_map[cell_A]
-
             elif level_A < level_B:
                 cell_map = mh_A.coarse_to_fine_cells[level_A]
-
-                def likely(cell_A):
-                    return cell_map[cell_A]
+            cell_map = cell_map[:num_cell_A]
+            valid = cell_map >= 0
+            indptr = numpy.zeros(num_cell_A + 1, dtype=IntType)
+            numpy.cumsum(valid.sum(axis=1), out=indptr[1:])
+            indices = cell_map[valid].astype(IntType)
 
     assert V_A.value_size == V_B.value_size
     orig_value_size = V_A.value_size
@@ -125,12 +128,10 @@ each supermesh cell.
     preallocator.setSizes(size=(nrows, ncols), bsize=1)
     preallocator.setUp()
 
-    zeros = numpy.zeros((V_B.cell_node_map().arity, V_A.cell_node_map().arity), dtype=ScalarType)
-    for cell_A, dofs_A in enumerate(V_A.cell_node_map().values):
-        for cell_B in likely(cell_A):
-            dofs_B = V_B.cell_node_map().values_with_halo[cell_B, :]
-            preallocator.setValuesLocal(dofs_B, dofs_A, zeros)
-    preallocator.assemble()
+    preallocate_mixed_mass_matrix(indptr, indices,
+                                  V_A.cell_node_map().values_with_halo,
+                                  V_B.cell_node_map().values_with_halo,
+                                  preallocator)
 
     dnnz, onnz = get_preallocation(preallocator, nrows[0])
 
@@ -369,7 +370,7 @@ each supermesh cell.
                argtypes=[ctypes.c_voidp, ctypes.c_voidp, ctypes.c_voidp, ctypes.c_voidp, ctypes.c_voidp, ctypes.c_voidp, ctypes.c_voidp],
                restype=ctypes.c_int)
 
-    ammm(V_A, V_B, likely, node_locations_A, node_locations_B, M_SS, ctypes.addressof(lib), mat)
+    ammm(V_A, V_B, indptr, indices, node_locations_A, node_locations_B, M_SS, ctypes.addressof(lib), mat)
 
     if orig_value_size == 1:
         return mat
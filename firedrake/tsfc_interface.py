@@ -9,6 +9,9 @@ import os
 import zlib
 import tempfile
 import collections
+import time
+
+import numpy
 
 import ufl
 from ufl import Form
@@ -20,7 +23,7 @@ from pyop2.caching import Cached
 from pyop2.op2 import Kernel
 from pyop2.mpi import COMM_WORLD
 
-from coffee.base import Invert
+from coffee.base import Decl, FlatBlock, Invert, Symbol
 
 from firedrake.formmanipulation import split_form
 
@@ -39,59 +42,260 @@ KernelInfo = collections.namedtuple("KernelInfo",
                                      "needs_cell_sizes"])
 
 
-class TSFCKernel(Cached):
+def _size_from_environ(name):
+    """Read a size limit from the environment (``None`` if unset)."""
+    value = environ.get(name)
+    if value is None or value == "":
+        return None
+    return parse_size(value)
 
-    _cache = {}
 
-    _cachedir = environ.get('FIREDRAKE_TSFC_KERNEL_CACHE_DIR',
-                            path.join(tempfile.gettempdir(),
-                                      'firedrake-tsfc-kernel-cache-uid%d' % getuid()))
+def parse_size(value):
+    """Parse a size, optionally with a suffix of K, M or G (powers of
+    1024), e.g. ``"100M"``.
 
-    @classmethod
-    def _cache_lookup(cls, key):
-        key, comm = key
-        return cls._cache.get(key) or cls._read_from_disk(key, comm)
+    :returns: the size as an integer.
+    """
+    value = str(value).strip().upper()
+    multiplier = 1
+    for suffix, m in (("K", 1024), ("M", 1024**2), ("G", 1024**3)):
+        if value.endswith(suffix):
+            value = value[:-1]
+            multiplier = m
+            break
+    return int(float(value) * multiplier)
+
+
+class KernelCache(object):
+    """A size-bounded cache of compiled kernels, in memory and on disk.
+
+    Both levels are evicted in least recently used order.  On disk,
+    the modification time of a cache file records when it was last
+    used.
+
+    :arg cachedir: the directory to store kernels in.
+    :arg max_entries: the maximum number of kernels to keep in
+        memory (``None`` for no limit).
+    :arg max_disk_size: the maximum size in bytes of the disk cache
+        (``None`` for no limit).
+    """
 
-    @classmethod
-    def _read_from_disk(cls, key, comm):
+    def __init__(self, cachedir, max_entries=None, max_disk_size=None):
+        self.cachedir = cachedir
+        self.max_entries = max_entries
+        self.max_disk_size = max_disk_size
+        self._entries = collections.OrderedDict()
+        # Running estimate of the disk cache size (None if unknown)
+        self._disk_size = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the cache statistics."""
+        self.hits = 0
+        """Number of kernels found in memory."""
+        self.disk_hits = 0
+        """Number of kernels read from disk."""
+        self.misses = 0
+        """Number of kernels which had to be compiled."""
+        self.evictions = 0
+        """Number of kernels evicted from memory."""
+        self.compile_time = 0.0
+        """Total time (in seconds) spent compiling kernels."""
+
+    def stats(self):
+        """Return a dict of cache statistics."""
+        return {"hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "compile_time": self.compile_time,
+                "entries": len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def clear(self):
+        """Empty the in-memory cache."""
+        self._entries.clear()
+
+    def lookup(self, key):
+        """Look up a kernel in memory.
+
+        :raises KeyError: if the kernel is not found.
+        """
+        val = self._entries[key]
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return val
+
+    def insert(self, key, val):
+        """Insert a kernel in memory, evicting the least recently used
+        kernels if over the size limit."""
+        self._entries[key] = val
+        self._entries.move_to_end(key)
+        self.evict()
+        return val
+
+    def evict(self):
+        """Evict the least recently used kernels from memory until
+        within the size limit."""
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def filepath(self, key):
+        """Return the path of the file storing a kernel on disk."""
+        shard, disk_key = key[:2], key[2:]
+        return os.path.join(self.cachedir, shard, disk_key)
+
+    def read(self, key, comm):
+        """Read a kernel from disk, on rank 0 of ``comm``, and broadcast it.
+
+        :raises KeyError: if the kernel is not found.
+        """
         if comm.rank == 0:
-            cache = cls._cachedir
-            shard, disk_key = key[:2], key[2:]
-            filepath = os.path.join(cache, shard, disk_key)
+            filepath = self.filepath(key)
             val = None
             if os.path.exists(filepath):
                 try:
                     with gzip.open(filepath, 'rb') as f:
                         val = f.read()
-                except zlib.error:
-                    pass
+                    # Record the use for eviction
+                    os.utime(filepath)
+                except (zlib.error, OSError):
+                    val = None
 
             comm.bcast(val, root=0)
         else:
             val = comm.bcast(None, root=0)
 
         if val is None:
+            self.misses += 1
             raise KeyError("Object with key %s not found" % key)
-        return cls._cache.setdefault(key, pickle.loads(val))
+        self.disk_hits += 1
+        return self.insert(key, pickle.loads(val))
 
-    @classmethod
-    def _cache_store(cls, key, val):
-        key, comm = key
-        cls._cache[key] = val
+    def write(self, key, val, comm):
+        """Write a kernel to disk on rank 0 of ``comm``, pruning the
+        disk cache if over the size limit."""
         _ensure_cachedir(comm=comm)
         if comm.rank == 0:
-            val._key = key
-            shard, disk_key = key[:2], key[2:]
-            filepath = os.path.join(cls._cachedir, shard, disk_key)
-            tempfile = os.path.join(cls._cachedir, shard, "%s_p%d.tmp" % (disk_key, os.getpid()))
             # No need for a barrier after this, since non root
             # processes will never race on this file.
-            os.makedirs(os.path.join(cls._cachedir, shard), exist_ok=True)
-            with gzip.open(tempfile, 'wb') as f:
-                pickle.dump(val, f, 0)
-            os.rename(tempfile, filepath)
+            self.write_file(key, pickle.dumps(val, 0))
         comm.barrier()
 
+    def write_file(self, key, data):
+        """Write a pickled kernel to disk on this process only,
+        pruning the disk cache if over the size limit.
+
+        To avoid scanning the cache directory on every write, the size
+        of the disk cache is tracked as kernels are written, and when
+        it exceeds the limit the cache is pruned to 90% of it.
+
+        :arg key: the cache key.
+        :arg data: the pickled kernel.
+        """
+        filepath = self.filepath(key)
+        tmpfile = "%s_p%d.tmp" % (filepath, os.getpid())
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with gzip.open(tmpfile, 'wb') as f:
+            f.write(data)
+        os.rename(tmpfile, filepath)
+        if self.max_disk_size is not None:
+            if self._disk_size is None:
+                self._disk_size = self.disk_size()
+            else:
+                self._disk_size += os.path.getsize(filepath)
+            if self._disk_size > self.max_disk_size:
+                self.prune(int(0.9 * self.max_disk_size))
+
+    def disk_entries(self):
+        """Return a list of ``(path, size, mtime)`` tuples for the
+        kernels on disk, least recently used first."""
+        entries = []
+        if not os.path.isdir(self.cachedir):
+            return entries
+        for shard in os.listdir(self.cachedir):
+            dirname = os.path.join(self.cachedir, shard)
+            if not os.path.isdir(dirname):
+                continue
+            for name in os.listdir(dirname):
+                if name.endswith(".tmp"):
+                    continue
+                filepath = os.path.join(dirname, name)
+                try:
+                    st = os.stat(filepath)
+                except OSError:
+                    continue
+                entries.append((filepath, st.st_size, st.st_mtime))
+        return sorted(entries, key=lambda e: e[2])
+
+    def disk_size(self):
+        """Return the total size in bytes of the kernels on disk."""
+        return sum(size for _, size, _ in self.disk_entries())
+
+    def prune(self, max_size):
+        """Remove the least recently used kernels from disk until the
+        disk cache is no larger than ``max_size`` bytes.
+
+        This should only be called on one process.
+
+        :returns: a tuple of the number of kernels removed and the
+            number of bytes freed.
+        """
+        entries = self.disk_entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        freed = 0
+        for filepath, size, _ in entries:
+            if total <= max_size:
+                break
+            try:
+                os.remove(filepath)
+            except OSError:
+                continue
+            total -= size
+            freed += size
+            removed += 1
+        self._disk_size = total
+        return removed, freed
+
+
+class TSFCKernel(Cached):
+
+    _cache = KernelCache(environ.get('FIREDRAKE_TSFC_KERNEL_CACHE_DIR',
+                                     path.join(tempfile.gettempdir(),
+                                               'firedrake-tsfc-kernel-cache-uid%d' % getuid())),
+                         max_entries=_size_from_environ('FIREDRAKE_TSFC_KERNEL_CACHE_ENTRIES'),
+                         max_disk_size=_size_from_environ('FIREDRAKE_TSFC_KERNEL_CACHE_SIZE'))
+
+    _cachedir = _cache.cachedir
+
+    @classmethod
+    def _cache_lookup(cls, key):
+        key, comm = key
+        try:
+            return cls._cache.lookup(key)
+        except KeyError:
+            return cls._read_from_disk(key, comm)
+
+    @classmethod
+    def _read_from_disk(cls, key, comm):
+        return cls._cache.read(key, comm)
+
+    @classmethod
+    def _cache_store(cls, key, val):
+        key, comm = key
+        cls._cache.insert(key, val)
+        if comm.rank == 0:
+            val._key = key
+        cls._cache.write(key, val, comm)
+
     @classmethod
     def _cache_key(cls, form, name, parameters, number_map, interface, coffee=False):
         # FIXME Making the COFFEE parameters part of the cache key causes
@@ -117,14 +321,18 @@ class TSFCKernel(Cached):
             return
 
         assemble_inverse = parameters.get("assemble_inverse", False)
-        coffee = coffee or assemble_inverse
+        assemble_diagonal = parameters.get("assemble_diagonal", 0)
+        coffee = coffee or assemble_inverse or bool(assemble_diagonal)
+        start = time.time()
         tree = tsfc_compile_form(form, prefix=name, parameters=parameters, interface=interface, coffee=coffee)
+        self._cache.compile_time += time.time() - start
         kernels = []
         for kernel in tree:
             # Set optimization options
             opts = default_parameters["coffee"]
             ast = kernel.ast
             ast = ast if not assemble_inverse else _inverse(ast)
+            ast = ast if not assemble_diagonal else _diagonal(ast, assemble_diagonal)
             # Unwind coefficient numbering
             numbers = tuple(number_map[c] for c in kernel.coefficient_numbers)
             kernels.append(KernelInfo(kernel=Kernel(ast, ast.name, opts=opts),
@@ -195,6 +403,26 @@ def compile_form(form, name, parameters=None, inverse=False, split=True, interfa
         pass
 
     kernels = []
+    for idx, f, kname, number_map in _split_kernel_forms(form, name, split):
+        if parameters.get("assemble_diagonal") and idx[0] != idx[1]:
+            # Off-diagonal blocks do not contribute to the diagonal
+            continue
+        kinfos = TSFCKernel(f, kname, parameters,
+                            number_map, interface, coffee).kernels
+        for kinfo in kinfos:
+            kernels.append(SplitKernel(idx, kinfo))
+    kernels = tuple(kernels)
+    return cache.setdefault(key, kernels)
+
+
+def _split_kernel_forms(form, name, split=True):
+    """Yield the forms :func:`compile_form` compiles kernels for.
+
+    :returns: an iterator of tuples ``(index, form, name,
+        number_map)`` of the block index, the (split) form, the kernel
+        name and the map from local coefficient numbers to global
+        ones.
+    """
     # A map from all form coefficients to their number.
     coefficient_numbers = dict((c, n)
                                for (n, c) in enumerate(form.coefficients()))
@@ -208,12 +436,7 @@ def compile_form(form, name, parameters=None, inverse=False, split=True, interfa
         # compiler) to the global coefficient numbers
         number_map = dict((n, coefficient_numbers[c])
                           for (n, c) in enumerate(f.coefficients()))
-        kinfos = TSFCKernel(f, name + "".join(map(str, idx)), parameters,
-                            number_map, interface, coffee).kernels
-        for kinfo in kinfos:
-            kernels.append(SplitKernel(idx, kinfo))
-    kernels = tuple(kernels)
-    return cache.setdefault(key, kernels)
+        yield idx, f, name + "".join(map(str, idx)), number_map
 
 
 def _real_mangle(form):
@@ -239,9 +462,57 @@ def clear_cache(comm=None):
     if comm.rank == 0:
         import shutil
         shutil.rmtree(TSFCKernel._cachedir, ignore_errors=True)
+        TSFCKernel._cache._disk_size = None
         _ensure_cachedir(comm=comm)
 
 
+def prune_cache(max_size, comm=None):
+    """Remove the least recently used kernels from the Firedrake TSFC
+    kernel cache on disk.
+
+    :arg max_size: the size (in bytes, or a string such as ``"100M"``)
+        to prune the cache to.
+    :arg comm: the communicator to prune on (pruning happens on
+        rank 0).
+    :returns: a tuple of the number of kernels removed and the number
+        of bytes freed (on rank 0).
+    """
+    comm = comm or COMM_WORLD
+    result = (0, 0)
+    if comm.rank == 0:
+        result = TSFCKernel._cache.prune(parse_size(max_size))
+    comm.barrier()
+    return result
+
+
+def set_cache_limits(max_entries=None, max_disk_size=None):
+    """Set the size limits of the Firedrake TSFC kernel cache.
+
+    :arg max_entries: the maximum number of kernels to keep in memory
+        (``None`` for no limit).
+    :arg max_disk_size: the maximum size of the disk cache, in bytes
+        or a string such as ``"100M"`` (``None`` for no limit).
+    """
+    cache = TSFCKernel._cache
+    cache.max_entries = max_entries
+    if max_disk_size is not None:
+        max_disk_size = parse_size(max_disk_size)
+    cache.max_disk_size = max_disk_size
+    cache.evict()
+
+
+def cache_statistics():
+    """Return a dict of statistics for the Firedrake TSFC kernel cache.
+
+    The entries are ``hits`` (kernels found in memory),
+    ``disk_hits`` (kernels read from disk), ``misses`` (kernels
+    compiled), ``evictions`` (kernels evicted from memory),
+    ``compile_time`` (seconds spent compiling) and ``entries``
+    (kernels in memory).
+    """
+    return TSFCKernel._cache.stats()
+
+
 def _ensure_cachedir(comm=None):
     """Ensure that the TSFC kernel cache directory exists."""
     comm = comm or COMM_WORLD
@@ -263,3 +534,37 @@ def _inverse(kernel):
     kernel.children[0].children.append(Invert(name, size))
 
     return kernel
+
+
+def _diagonal(kernel, block_size):
+    """Modify ``kernel`` so to assemble the diagonal blocks, of size
+    ``block_size``, of the local tensor (its diagonal if ``block_size``
+    is 1), rather than the local tensor itself."""
+
+    local_tensor = kernel.args[0]
+    shape = local_tensor.size
+    rank = len(shape)
+
+    if rank % 2 or shape[:rank//2] != shape[rank//2:]:
+        raise ValueError("Can only assemble the diagonal of a square 2-form")
+
+    name = local_tensor.sym.symbol
+    size = int(numpy.prod(shape[:rank//2]))
+    if size % block_size:
+        raise ValueError("Block size %d does not divide the local tensor size %d" % (block_size, size))
+
+    # The kernel now adds the diagonal blocks of a local tensor on the
+    # stack into its (flattened) first argument.
+    kernel.args[0] = Decl(local_tensor.typ, Symbol(name + "_diagonal", rank=(size*block_size, )))
+    body = kernel.children[0].children
+    dims = "".join("[%d]" % n for n in shape)
+    body.insert(0, FlatBlock("%s %s%s = {0};\n" % (local_tensor.typ, name, dims)))
+    body.append(FlatBlock("""
+for (int n = 0; n < %(nodes)d; n++)
+  for (int i = 0; i < %(bs)d; i++)
+    for (int j = 0; j < %(bs)d; j++)
+      %(name)s_diagonal[(n*%(bs)d + i)*%(bs)d + j] += ((%(typ)s *)%(name)s)[(n*%(bs)d + i)*%(size)d + n*%(bs)d + j];
+""" % {"nodes": size // block_size, "bs": block_size, "size": size,
+       "name": name, "typ": local_tensor.typ}))
+
+    return kernel
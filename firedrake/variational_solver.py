@@ -120,6 +120,14 @@ class NonlinearVariationalSolver(OptionsManager):
                that has a complicated dependence on the unknown solution.
         :kwarg pre_function_callback: As above, but called immediately
                before residual assembly
+        :kwarg jacobian_policy: An optional :class:`.LaggingPolicy`
+               deciding at which Newton steps to reassemble the
+               Jacobian; otherwise it is reassembled at every step
+               (unless the problem has a constant Jacobian).
+        :kwarg preconditioner_policy: As above, but for the matrix
+               used to precondition the Jacobian, if it is separate
+               (``Jp`` is provided, or ``pmat_type`` differs from
+               ``mat_type``).
 
         Example usage of the ``solver_parameters`` option: to set the
         nonlinear solver type to just use a linear solver, use
@@ -162,6 +170,8 @@ class NonlinearVariationalSolver(OptionsManager):
         options_prefix = kwargs.get("options_prefix")
         pre_j_callback = kwargs.get("pre_jacobian_callback")
         pre_f_callback = kwargs.get("pre_function_callback")
+        jacobian_policy = kwargs.get("jacobian_policy")
+        preconditioner_policy = kwargs.get("preconditioner_policy")
 
         super(NonlinearVariationalSolver, self).__init__(parameters, options_prefix)
 
@@ -179,7 +189,9 @@ class NonlinearVariationalSolver(OptionsManager):
                                          appctx=appctx,
                                          pre_jacobian_callback=pre_j_callback,
                                          pre_function_callback=pre_f_callback,
-                                         options_prefix=self.options_prefix)
+                                         options_prefix=self.options_prefix,
+                                         jacobian_policy=jacobian_policy,
+                                         preconditioner_policy=preconditioner_policy)
 
         # No preconditioner by default for matrix-free
         if (problem.Jp is not None and pmatfree) or matfree:
@@ -252,6 +264,7 @@ class NonlinearVariationalSolver(OptionsManager):
             lower, upper = bounds
             with lower.dat.vec_ro as lb, upper.dat.vec_ro as ub:
                 self.snes.setVariableBounds(lb, ub)
+        self._ctx.start_solve(self.snes)
         work = self._work
         with self._problem.u.dat.vec as u:
             u.copy(work)
@@ -339,3 +352,4 @@ class LinearVariationalSolver(NonlinearVariationalSolver):
         Forces the matrix to be reassembled next time it is required.
         """
         self._ctx._jacobian_assembled = False
+        self._ctx._preconditioner_assembled = False
@@ -0,0 +1,349 @@
+"""Benchmarks of Firedrake hot paths at realistic problem sizes.
+
+Run with, for example::
+
+    mpiexec -n 8 python scaling.py --mode strong --dofs 1e6 --output strong.json
+    mpiexec -n 8 python scaling.py --mode weak --dofs 1e5 --output weak.json
+
+In strong scaling mode, ``--dofs`` is the global problem size; in weak
+scaling mode it is the problem size per process.  The timing of each
+phase of each benchmark is recorded with a PyOP2 timed region, and is
+reported (maximum and minimum over processes) along with the timings
+of the Firedrake and PyOP2 events within it.
+"""
+from argparse import ArgumentParser
+from collections import OrderedDict
+import json
+import os
+import sys
+import tempfile
+
+from firedrake import *
+from firedrake.petsc import PETSc
+from mpi4py import MPI
+from pyop2.mpi import COMM_WORLD
+from pyop2.profiling import timed_region
+
+
+# Events reported, if they occur, within each benchmark.
+EVENTS = ["ParLoopExecute", "CreateMesh", "CreateFunctionSpace",
+          "ApplyBC", "AssembleExpression",
+          "HybridInit", "HybridUpdate", "HybridBreak", "HybridRHS", "HybridProject",
+          "SCPCInit", "SCPCUpdate", "SCForwardElim", "SCSolve", "SCBackSub"]
+
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(fn):
+    """Register a benchmark.
+
+    A benchmark is a function taking a :class:`Benchmark`, the
+    target number of degrees of freedom, the spatial dimension and
+    the polynomial degree, which times its phases with
+    :meth:`Benchmark.phase`."""
+    BENCHMARKS[fn.__name__] = fn
+    return fn
+
+
+class Benchmark(object):
+    def __init__(self, name, comm):
+        self.name = name
+        self.comm = comm
+        self.dofs = None
+        self.phases = OrderedDict()
+
+    def phase(self, name):
+        """Time a phase of the benchmark."""
+        self.phases[name] = "Benchmark %s: %s" % (self.name, name)
+        return timed_region(self.phases[name])
+
+    def results(self, stage):
+        def reduce(info):
+            time = info["time"]
+            return {"max": self.comm.allreduce(time, op=MPI.MAX),
+                    "min": self.comm.allreduce(time, op=MPI.MIN),
+                    "count": info["count"]}
+
+        phases = OrderedDict((phase, reduce(PETSc.Log.Event(event).getPerfInfo(stage)))
+                             for phase, event in self.phases.items())
+        events = OrderedDict()
+        for event in EVENTS:
+            info = reduce(PETSc.Log.Event(event).getPerfInfo(stage))
+            if info["max"] > 0:
+                events[event] = info
+        return {"benchmark": self.name,
+                "dofs": self.dofs,
+                "phases": phases,
+                "events": events}
+
+
+def unit_mesh(dim, dofs, degree=1, **kwargs):
+    """Return a unit square or cube mesh with about ``dofs`` degree
+    ``degree`` Lagrange degrees of freedom."""
+    n = max(1, int(round((dofs**(1/dim) - 1)/degree)))
+    if dim == 2:
+        return UnitSquareMesh(n, n, **kwargs)
+    else:
+        return UnitCubeMesh(n, n, n, **kwargs)
+
+
+def expression(mesh):
+    x = SpatialCoordinate(mesh)
+    return sin(pi*x[0])*x[1] + cos(x[-1])
+
+
+@benchmark
+def assemble_matrix(bench, dofs, dim, degree):
+    mesh = unit_mesh(dim, dofs, degree)
+    V = FunctionSpace(mesh, "CG", degree)
+    bench.dofs = V.dim()
+    u = TrialFunction(V)
+    v = TestFunction(V)
+    a = inner(grad(u), grad(v))*dx
+    bcs = DirichletBC(V, 0, "on_boundary")
+    with bench.phase("first"):
+        A = assemble(a, bcs=bcs, mat_type="aij")
+        A.force_evaluation()
+    with bench.phase("reassemble"):
+        A = assemble(a, bcs=bcs, tensor=A, mat_type="aij")
+        A.force_evaluation()
+
+
+@benchmark
+def assemble_residual(bench, dofs, dim, degree):
+    mesh = unit_mesh(dim, dofs, degree)
+    V = FunctionSpace(mesh, "CG", degree)
+    bench.dofs = V.dim()
+    u = interpolate(expression(mesh), V)
+    v = TestFunction(V)
+    F = inner(grad(u), grad(v))*dx + u**3*v*dx
+    with bench.phase("first"):
+        f = assemble(F)
+        f.dat.data_ro
+    with bench.phase("reassemble"):
+        assemble(F, tensor=f)
+        f.dat.data_ro
+
+
+@benchmark
+def interpolator(bench, dofs, dim, degree):
+    mesh = unit_mesh(dim, dofs, degree)
+    V = FunctionSpace(mesh, "CG", degree)
+    bench.dofs = V.dim()
+    f = Function(V)
+    with bench.phase("setup"):
+        interp = Interpolator(expression(mesh), f)
+    with bench.phase("interpolate"):
+        interp.interpolate()
+        f.dat.data_ro
+
+
+@benchmark
+def projector(bench, dofs, dim, degree):
+    mesh = unit_mesh(dim, dofs, degree)
+    V = FunctionSpace(mesh, "CG", degree)
+    bench.dofs = V.dim()
+    f = Function(V)
+    parameters = {"ksp_type": "cg", "pc_type": "jacobi", "ksp_rtol": 1e-8}
+    with bench.phase("setup"):
+        proj = Projector(expression(mesh), f, solver_parameters=parameters)
+    with bench.phase("project"):
+        proj.project()
+        f.dat.data_ro
+
+
+@benchmark
+def function_at(bench, dofs, dim, degree):
+    mesh = unit_mesh(dim, dofs, degree)
+    V = FunctionSpace(mesh, "CG", degree)
+    bench.dofs = V.dim()
+    f = interpolate(expression(mesh), V)
+    # Evaluate at about one point per thousand degrees of freedom.
+    npoints = max(1, bench.dofs // 1000)
+    points = [[(i + 0.5)/npoints]*dim for i in range(npoints)]
+    with bench.phase("first"):
+        f.at(points)
+    with bench.phase("repeat"):
+        f.at(points)
+
+
+@benchmark
+def file_write(bench, dofs, dim, degree):
+    mesh = unit_mesh(dim, dofs, degree)
+    V = FunctionSpace(mesh, "CG", degree)
+    bench.dofs = V.dim()
+    f = interpolate(expression(mesh), V)
+    dirname = bench.comm.bcast(tempfile.mkdtemp() if bench.comm.rank == 0 else None, root=0)
+    outfile = File(os.path.join(dirname, "output.pvd"), comm=bench.comm)
+    with bench.phase("first"):
+        outfile.write(f)
+    with bench.phase("repeat"):
+        outfile.write(f)
+
+
+@benchmark
+def checkpoint(bench, dofs, dim, degree):
+    mesh = unit_mesh(dim, dofs, degree)
+    V = FunctionSpace(mesh, "CG", degree)
+    bench.dofs = V.dim()
+    f = interpolate(expression(mesh), V)
+    f.rename("f")
+    g = Function(V, name="f")
+    dirname = bench.comm.bcast(tempfile.mkdtemp() if bench.comm.rank == 0 else None, root=0)
+    filename = os.path.join(dirname, "checkpoint.h5")
+    with bench.phase("write"):
+        with HDF5File(filename, "w", comm=bench.comm) as h5:
+            h5.write(f, "/f")
+    with bench.phase("read"):
+        with HDF5File(filename, "r", comm=bench.comm) as h5:
+            h5.read(g, "/f")
+
+
+@benchmark
+def mg_transfer(bench, dofs, dim, degree):
+    # The finest level has about dofs degrees of freedom.
+    coarse = unit_mesh(dim, dofs/2**(2*dim), degree)
+    hierarchy = MeshHierarchy(coarse, 2)
+    Vc = FunctionSpace(hierarchy[1], "CG", degree)
+    Vf = FunctionSpace(hierarchy[2], "CG", degree)
+    bench.dofs = Vf.dim()
+    uc = interpolate(expression(hierarchy[1]), Vc)
+    uf = Function(Vf)
+    rc = Function(Vc)
+    with bench.phase("prolong"):
+        prolong(uc, uf)
+    with bench.phase("restrict"):
+        restrict(uf, rc)
+    with bench.phase("inject"):
+        inject(uf, uc)
+    uc.dat.data_ro
+
+
+@benchmark
+def halo_reduction(bench, dofs, dim, degree):
+    # MIN and MAX loops, reducing the same data in the halo as dim
+    # scalar Dats or as one vector Dat.
+    mesh = unit_mesh(dim, dofs/dim, degree)
+    V = FunctionSpace(mesh, "CG", degree)
+    W = VectorFunctionSpace(mesh, "CG", degree)
+    bench.dofs = W.dim()
+    x = interpolate(SpatialCoordinate(mesh), W)
+    xs = [interpolate(x[d], V) for d in range(dim)]
+    ndof = V.finat_element.space_dimension()
+    for mode, fn, access in [("min", "fmin", MIN), ("max", "fmax", MAX)]:
+        domain = "{{[i]: 0 <= i < {0}}}".format(ndof)
+        instructions = """
+        for i
+            f[i, 0] = {0}(f[i, 0], g[i, 0])
+        end
+        """.format(fn)
+        fs = [Function(V) for d in range(dim)]
+        with bench.phase("scalar_%s" % mode):
+            for f, g in zip(fs, xs):
+                par_loop((domain, instructions), dx, {"f": (f, access), "g": (g, READ)},
+                         is_loopy_kernel=True)
+                f.dat.data_ro
+
+        domain = "{{[i, d]: 0 <= i < {0} and 0 <= d < {1}}}".format(ndof, dim)
+        instructions = """
+        for i, d
+            f[i, d] = {0}(f[i, d], g[i, d])
+        end
+        """.format(fn)
+        f = Function(W)
+        with bench.phase("vector_%s" % mode):
+            par_loop((domain, instructions), dx, {"f": (f, access), "g": (x, READ)},
+                     is_loopy_kernel=True)
+            f.dat.data_ro
+
+
+@benchmark
+def hybridization(bench, dofs, dim, degree):
+    # Roughly dim + 1 mixed degrees of freedom per cell.
+    mesh = unit_mesh(dim, dofs/(dim + 1), 1)
+    U = FunctionSpace(mesh, "RT", degree)
+    V = FunctionSpace(mesh, "DG", degree - 1)
+    W = U * V
+    bench.dofs = W.dim()
+    sigma, u = TrialFunctions(W)
+    tau, v = TestFunctions(W)
+    a = (inner(sigma, tau) + div(tau)*u + div(sigma)*v)*dx
+    L = -inner(expression(mesh), v)*dx
+    w = Function(W)
+    parameters = {"mat_type": "matfree",
+                  "ksp_type": "preonly",
+                  "pc_type": "python",
+                  "pc_python_type": "firedrake.HybridizationPC",
+                  "hybridization": {"ksp_type": "cg",
+                                    "pc_type": "gamg",
+                                    "ksp_rtol": 1e-8}}
+    problem = LinearVariationalProblem(a, L, w)
+    solver = LinearVariationalSolver(problem, solver_parameters=parameters)
+    with bench.phase("first"):
+        solver.solve()
+    with bench.phase("repeat"):
+        solver.solve()
+
+
+def run(names, dofs, dim=2, degree=1, repeats=1, comm=COMM_WORLD):
+    """Run benchmarks.
+
+    :arg names: the names of the benchmarks to run.
+    :arg dofs: the (approximate) number of degrees of freedom.
+    :arg dim: the spatial dimension.
+    :arg degree: the polynomial degree.
+    :arg repeats: how many times to run each benchmark.
+    :arg comm: the communicator to run on.
+    :returns: a list of results, one for each run.
+    """
+    PETSc.Log.begin()
+    results = []
+    for name in names:
+        for i in range(repeats):
+            bench = Benchmark(name, comm)
+            stage = PETSc.Log.Stage("Benchmark %s %d" % (name, len(results)))
+            stage.push()
+            try:
+                BENCHMARKS[name](bench, int(dofs), dim, degree)
+            finally:
+                stage.pop()
+            results.append(bench.results(stage))
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark Firedrake at realistic problem sizes.")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS),
+                        default=list(BENCHMARKS),
+                        help="Benchmarks to run (default all).")
+    parser.add_argument("--mode", choices=["strong", "weak"], default="strong",
+                        help="Scaling mode: whether --dofs is global or per process.")
+    parser.add_argument("--dofs", type=float, default=1e5,
+                        help="Number of degrees of freedom.")
+    parser.add_argument("--dim", type=int, choices=[2, 3], default=2,
+                        help="Spatial dimension.")
+    parser.add_argument("--degree", type=int, default=1,
+                        help="Polynomial degree.")
+    parser.add_argument("--repeats", type=int, default=1,
+                        help="Number of times to run each benchmark.")
+    parser.add_argument("--output", default=None,
+                        help="File to write JSON results to (default stdout).")
+    args, _ = parser.parse_known_args()
+
+    comm = COMM_WORLD
+    dofs = args.dofs * (comm.size if args.mode == "weak" else 1)
+    results = run(args.benchmarks, dofs, dim=args.dim, degree=args.degree,
+                  repeats=args.repeats, comm=comm)
+    if comm.rank == 0:
+        output = {"nprocs": comm.size,
+                  "mode": args.mode,
+                  "dofs": args.dofs,
+                  "dim": args.dim,
+                  "degree": args.degree,
+                  "results": results}
+        if args.output is None:
+            json.dump(output, sys.stdout, indent=2)
+        else:
+            with open(args.output, "w") as f:
+                json.dump(output, f, indent=2)
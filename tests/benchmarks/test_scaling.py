@@ -0,0 +1,18 @@
+from scaling import BENCHMARKS, run
+import pytest
+
+
+@pytest.mark.parametrize("name", list(BENCHMARKS))
+def test_benchmark_runs(name):
+    result, = run([name], 1000)
+    assert result["benchmark"] == name
+    assert result["dofs"] > 0
+    assert result["phases"]
+    for phase in result["phases"].values():
+        assert phase["max"] >= phase["min"] >= 0
+
+
+@pytest.mark.parallel(nprocs=2)
+def test_benchmark_runs_parallel():
+    results = run(["assemble_matrix", "mg_transfer"], 2000)
+    assert len(results) == 2
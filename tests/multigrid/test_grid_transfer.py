@@ -185,3 +185,36 @@ def test_grid_transfer_parallel(hierarchy, transfer_type):
         run_restriction(hierarchy, vector, space, degrees)
     elif transfer_type == "prolongation":
         run_prolongation(hierarchy, vector, space, degrees)
+
+
+@pytest.fixture
+def transfer_matrices():
+    parameters["assemble_transfer_matrices"] = True
+    yield
+    parameters["assemble_transfer_matrices"] = False
+
+
+def test_grid_transfer_matrices(hierarchy, vector, space, degrees, transfer_type, transfer_matrices):
+    if not hierarchy.nested and transfer_type == "injection":
+        pytest.skip("Not implemented")
+    if transfer_type == "injection":
+        run_injection(hierarchy, vector, space, degrees)
+    elif transfer_type == "restriction":
+        run_restriction(hierarchy, vector, space, degrees)
+    elif transfer_type == "prolongation":
+        run_prolongation(hierarchy, vector, space, degrees)
+
+
+@pytest.mark.parallel(nprocs=2)
+def test_grid_transfer_matrices_parallel(hierarchy, transfer_type, transfer_matrices):
+    space = "CG"
+    degrees = (1, 2, 3)
+    vector = False
+    if not hierarchy.nested and hierarchy.refinements_per_level > 1:
+        pytest.skip("Not implemented")
+    if transfer_type == "injection":
+        run_injection(hierarchy, vector, space, degrees)
+    elif transfer_type == "restriction":
+        run_restriction(hierarchy, vector, space, degrees)
+    elif transfer_type == "prolongation":
+        run_prolongation(hierarchy, vector, space, degrees)
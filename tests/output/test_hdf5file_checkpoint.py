@@ -129,3 +129,100 @@ def test_multiple_timestamps(f, dumpfile):
         timestamps = h5.get_timestamps()
 
         assert np.allclose(timestamps, [0.1, 0.2])
+
+
+def run_natural_ordering(mesh, dumpfile):
+    V = FunctionSpace(mesh, "CG", 2)
+    W = V*VectorFunctionSpace(mesh, "DG", 1)
+    x = SpatialCoordinate(mesh)
+    f = Function(V, name="f").interpolate(x[0]*x[1])
+    w = Function(W, name="w")
+    w.sub(0).interpolate(x[0] + x[1])
+    w.sub(1).interpolate(as_vector([x[0], x[1]*x[1]]))
+    h = Function(FunctionSpace(mesh, "CG", 3)).interpolate(x[0]*x[0]*x[1] + 2*x[1])
+
+    dumpfile = mesh.comm.bcast(dumpfile, root=0)
+    with HDF5File(dumpfile, "w", comm=mesh.comm) as h5:
+        h5.write(f, "/f", natural_ordering=True)
+        h5.write(h, "/h", natural_ordering=True)
+        h5.write(w, "/w", timestamp=0.5, natural_ordering=True)
+
+    # Read back on a single process.
+    if mesh.comm.rank == 0:
+        smesh = UnitSquareMesh(3, 3, comm=MPI.COMM_SELF)
+        sV = FunctionSpace(smesh, "CG", 2)
+        sW = sV*VectorFunctionSpace(smesh, "DG", 1)
+        sx = SpatialCoordinate(smesh)
+        g = Function(sV)
+        u = Function(sW)
+        sh = Function(FunctionSpace(smesh, "CG", 3))
+        with HDF5File(dumpfile, "r", comm=MPI.COMM_SELF) as h5:
+            h5.read(g, "/f")
+            h5.read(sh, "/h")
+            h5.read(u, "/w", timestamp=0.5)
+        assert np.allclose(g.dat.data_ro,
+                           Function(sV).interpolate(sx[0]*sx[1]).dat.data_ro)
+        assert np.allclose(sh.dat.data_ro,
+                           Function(sh.function_space()).interpolate(sx[0]*sx[0]*sx[1] + 2*sx[1]).dat.data_ro)
+        assert np.allclose(u.dat.data_ro[0],
+                           Function(sV).interpolate(sx[0] + sx[1]).dat.data_ro)
+        vec = Function(sW.sub(1)).interpolate(as_vector([sx[0], sx[1]*sx[1]]))
+        assert np.allclose(u.dat.data_ro[1], vec.dat.data_ro)
+
+
+def test_natural_ordering(dumpfile):
+    run_natural_ordering(UnitSquareMesh(3, 3), dumpfile)
+
+
+@pytest.mark.parallel(nprocs=3)
+def test_natural_ordering_parallel(dumpfile):
+    run_natural_ordering(UnitSquareMesh(3, 3), dumpfile)
+
+
+def run_series(mesh, dumpfile, ring_size, compression):
+    V = FunctionSpace(mesh, "CG", 1)
+    W = VectorFunctionSpace(mesh, "DG", 1)
+    x = SpatialCoordinate(mesh)
+    f = Function(V, name="f")
+    g = Function(W, name="g")
+    f2 = Function(V, name="f")
+    g2 = Function(W, name="g")
+
+    dumpfile = mesh.comm.bcast(dumpfile, root=0)
+    times = [0.1*i for i in range(5)]
+    with HDF5File(dumpfile, "w", comm=mesh.comm) as h5:
+        for t in times:
+            f.interpolate(t + x[0]*x[1])
+            g.interpolate(as_vector([t*x[0], x[1]]))
+            h5.write_series([f, g], "/series", t, ring_size=ring_size,
+                            compression=compression)
+
+    expect = times[-ring_size:] if ring_size else times
+    with HDF5File(dumpfile, "r", comm=mesh.comm) as h5:
+        assert np.allclose(h5.get_series_timestamps("/series"), expect)
+        for t in expect:
+            h5.read_series([f2, g2], "/series", t)
+            f.interpolate(t + x[0]*x[1])
+            g.interpolate(as_vector([t*x[0], x[1]]))
+            assert np.allclose(f.dat.data_ro, f2.dat.data_ro)
+            assert np.allclose(g.dat.data_ro, g2.dat.data_ro)
+        if ring_size:
+            with pytest.raises(KeyError):
+                h5.read_series(f2, "/series", times[0])
+
+
+@pytest.mark.parametrize("ring_size", [None, 3])
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_series(dumpfile, ring_size, compression):
+    run_series(UnitSquareMesh(2, 2), dumpfile, ring_size, compression)
+
+
+@pytest.mark.parallel(nprocs=2)
+def test_series_parallel(dumpfile):
+    run_series(UnitSquareMesh(2, 2), dumpfile, 3, None)
+
+
+def test_series_unique_names(f, dumpfile):
+    with HDF5File(dumpfile, "w") as h5:
+        with pytest.raises(ValueError):
+            h5.write_series([f, f], "/series", 0.0)
@@ -1,6 +1,9 @@
 from os import listdir
 from os.path import isfile, join
 from collections import Counter
+import re
+import zlib
+import numpy
 import pytest
 from functools import partial
 from firedrake import *
@@ -129,3 +132,69 @@ def test_append(mesh, tmpdir):
         return Counter(s) == Counter(t)
 
     assert compare(files_in_tmp, expected_files)
+
+
+def test_asynchronous(mesh, dumpdir):
+    V = FunctionSpace(mesh, "CG", 1)
+    f = Function(V, name="foo")
+
+    sync = File(join(dumpdir, "sync.pvd"))
+    with File(join(dumpdir, "async.pvd"), asynchronous=True, max_pending=1) as async_:
+        for t in range(3):
+            f.assign(t)
+            sync.write(f, time=t)
+            async_.write(f, time=t)
+        # Changing the function after writing must not affect the output
+        f.assign(42)
+
+    for t in range(3):
+        with open(join(dumpdir, "sync_%d.vtu" % t), "rb") as s, \
+             open(join(dumpdir, "async_%d.vtu" % t), "rb") as a:
+            assert s.read() == a.read()
+    with open(join(dumpdir, "sync.pvd")) as s, open(join(dumpdir, "async.pvd")) as a:
+        assert s.read().replace("sync", "async") == a.read()
+
+
+def test_compression(dumpdir):
+    mesh = UnitSquareMesh(30, 30)
+    V = FunctionSpace(mesh, "CG", 1)
+    f = Function(V, name="foo")
+
+    File(join(dumpdir, "raw.pvd")).write(f)
+    File(join(dumpdir, "zlib.pvd"), compression="zlib").write(f)
+
+    with open(join(dumpdir, "zlib_0.vtu"), "rb") as z:
+        data = z.read()
+    assert b'compressor="vtkZLibDataCompressor"' in data
+    with open(join(dumpdir, "raw_0.vtu"), "rb") as r:
+        assert len(data) < len(r.read())
+
+
+def test_compressed_data(dumpdir):
+    mesh = UnitSquareMesh(30, 30)
+    V = FunctionSpace(mesh, "CG", 1)
+    x = SpatialCoordinate(mesh)
+    f = Function(V, name="foo").interpolate(x[0]*x[1] + 1)
+
+    File(join(dumpdir, "zlib.pvd"), compression="zlib").write(f)
+
+    with open(join(dumpdir, "zlib_0.vtu"), "rb") as z:
+        data = z.read()
+    offset = int(re.search(rb'<DataArray Name="foo" [^>]* offset="(\d+)"', data).group(1))
+    start = data.index(b'<AppendedData encoding="raw">\n_') + len(b'<AppendedData encoding="raw">\n_') + offset
+    # Header: number of blocks, block size, size of the last partial
+    # block, then the compressed size of each block.
+    nblocks, block_size, last_size = numpy.frombuffer(data, dtype="<u8", count=3, offset=start)
+    sizes = numpy.frombuffer(data, dtype="<u8", count=nblocks, offset=start + 24)
+    start += 8*(3 + nblocks)
+    payload = b''
+    for size in sizes:
+        payload += zlib.decompress(data[start:start + size])
+        start += size
+    assert len(payload) == (nblocks - 1)*block_size + (last_size or block_size)
+    assert numpy.array_equal(numpy.frombuffer(payload, dtype="<f8"), f.dat.data_ro_with_halos)
+
+
+def test_bad_compression(dumpdir):
+    with pytest.raises(ValueError):
+        File(join(dumpdir, "bad.pvd"), compression="gzip")
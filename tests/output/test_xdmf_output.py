@@ -0,0 +1,91 @@
+from os.path import join
+import xml.etree.ElementTree as ET
+import pytest
+import h5py
+from firedrake import *
+
+
+@pytest.fixture(params=["interval", "square[tri]", "square[quad]", "tet"])
+def mesh(request):
+    return {"interval": lambda: UnitIntervalMesh(10),
+            "square[tri]": lambda: UnitSquareMesh(10, 10),
+            "square[quad]": lambda: UnitSquareMesh(10, 1, quadrilateral=True),
+            "tet": lambda: UnitCubeMesh(3, 3, 3)}[request.param]()
+
+
+@pytest.fixture
+def xdmf(dumpdir):
+    return XDMFFile(join(dumpdir, "foo.xdmf"))
+
+
+def test_bad_file_name(tmpdir):
+    with pytest.raises(ValueError):
+        XDMFFile(str(tmpdir.join("foo.pvd")))
+
+
+def test_mesh_written_once(mesh, xdmf):
+    V = FunctionSpace(mesh, "CG", 1)
+    f = Function(V, name="f")
+    for t in range(3):
+        f.assign(t)
+        xdmf.write(f, time=0.5*t)
+    xdmf.close()
+
+    with h5py.File(xdmf.h5name, "r") as h5:
+        assert set(h5["Mesh"].keys()) == {"topology", "coordinates_0"}
+        assert set(h5["Function/f"].keys()) == {"0", "1", "2"}
+
+    tree = ET.parse(xdmf.filename)
+    times = [t.get("Value") for t in tree.iter("Time")]
+    assert times == ["0.0", "0.5", "1.0"]
+
+
+def test_moved_mesh_rewrites_coordinates(xdmf):
+    mesh = UnitSquareMesh(4, 4)
+    V = VectorFunctionSpace(mesh, "DG", 1)
+    f = Function(V, name="f")
+    xdmf.write(f)
+    xdmf.write(f)
+    mesh.coordinates.dat.data[:] *= 2
+    xdmf.write(f)
+    xdmf.close()
+
+    with h5py.File(xdmf.h5name, "r") as h5:
+        assert set(h5["Mesh"].keys()) == {"topology", "coordinates_0", "coordinates_1"}
+        assert h5["Function/f/2"].shape[1] == 3
+
+
+@pytest.mark.parallel
+def test_parallel_pieces(dumpdir):
+    mesh = UnitSquareMesh(10, 10)
+    V = TensorFunctionSpace(mesh, "CG", 1)
+    xdmf = XDMFFile(join(dumpdir, "foo.xdmf"), single_file=False)
+    xdmf.write(Function(V, name="f"))
+    xdmf.close()
+
+    if mesh.comm.rank == 0:
+        tree = ET.parse(xdmf.filename)
+        pieces = [g for g in tree.iter("Grid") if g.get("GridType") == "Uniform"]
+        assert len(pieces) == mesh.comm.size
+
+
+@pytest.mark.parallel
+def test_parallel_single_file(xdmf):
+    mesh = UnitSquareMesh(10, 10)
+    V = FunctionSpace(mesh, "CG", 1)
+    f = Function(V, name="f")
+    xdmf.write(f)
+    xdmf.write(f)
+    xdmf.close()
+
+    num_points = mesh.comm.allreduce(len(f.dat.data_ro_with_halos))
+    num_cells = mesh.comm.allreduce(mesh.cell_set.size)
+    if mesh.comm.rank == 0:
+        tree = ET.parse(xdmf.filename)
+        pieces = [g for g in tree.iter("Grid") if g.get("GridType") == "Uniform"]
+        assert len(pieces) == 2
+        with h5py.File(xdmf.h5name, "r") as h5:
+            assert h5["Mesh/coordinates_0"].shape == (num_points, 3)
+            assert h5["Mesh/topology"].shape == (num_cells, 3)
+            assert h5["Mesh/topology"][:].max() < num_points
+            assert set(h5["Function/f"].keys()) == {"0", "1"}
@@ -122,3 +122,47 @@ def test_assemble_mat_with_tensor(mesh):
     M = assemble(Constant(2)*a, M)
     # Make sure we get the result of the last assembly
     assert np.allclose(M.M.values, 2*assemble(a).M.values, rtol=1e-14)
+
+
+def test_assembly_plan_one_form(mesh):
+    V = FunctionSpace(mesh, "CG", 1)
+    v = TestFunction(V)
+    c = Constant(1)
+    g = Function(V).assign(1)
+    bc = DirichletBC(V, g, 1)
+    plan = AssemblyPlan(c*v*dx, bcs=bc)
+    for val in [1, 2, 3]:
+        c.assign(val)
+        g.assign(-val)
+        f = plan.assemble()
+        assert f is plan.tensor
+        assert np.allclose(f.dat.data_ro, assemble(c*v*dx, bcs=bc).dat.data_ro, rtol=1e-14)
+        assert np.allclose(f.dat.data_ro[bc.nodes], -val)
+
+
+@pytest.mark.parametrize("mat_type", ["aij", "nest", "matfree"])
+def test_assembly_plan_two_form(mesh, mat_type):
+    V = FunctionSpace(mesh, "CG", 1)
+    W = V*V
+    u = TrialFunction(W)
+    v = TestFunction(W)
+    c = Constant(1)
+    a = c*inner(u, v)*dx
+    bc = DirichletBC(W.sub(0), 0, 1)
+    plan = AssemblyPlan(a, bcs=bc, mat_type=mat_type)
+    x = Function(W).assign(1)
+    for val in [1, 2]:
+        c.assign(val)
+        M = plan.assemble()
+        expect = assemble(a, bcs=bc, mat_type="aij")
+        with x.dat.vec_ro as xv:
+            y = M.petscmat.createVecLeft()
+            z = expect.petscmat.createVecLeft()
+            M.petscmat.mult(xv, y)
+            expect.petscmat.mult(xv, z)
+        assert np.allclose(y.array_r, z.array_r, rtol=1e-14)
+
+
+def test_assembly_plan_zero_form(mesh):
+    with pytest.raises(ValueError):
+        AssemblyPlan(Constant(1)*dx(domain=mesh))
@@ -1,4 +1,6 @@
 from firedrake import *
+from pyop2.mpi import MPI
+import numpy
 import pytest
 
 
@@ -109,3 +111,94 @@ def test_comm_manager_allreduce():
     g = Function(V3)
     with pytest.raises(ValueError):
         manager.allreduce(f, g)
+
+
+@pytest.mark.parallel(nprocs=6)
+def test_ensemble_send_recv():
+    manager = Ensemble(COMM_WORLD, 2)
+    ensemble_rank = manager.ensemble_comm.rank
+    ensemble_size = manager.ensemble_comm.size
+
+    mesh = UnitSquareMesh(10, 10, comm=manager.comm)
+    V = FunctionSpace(mesh, "CG", 1)
+    Q = VectorFunctionSpace(mesh, "DG", 0)
+    W = V*Q
+
+    u = Function(W)
+    u.assign(ensemble_rank + 1)
+    received = Function(W)
+
+    # Blocking ring
+    dest = (ensemble_rank + 1) % ensemble_size
+    source = (ensemble_rank - 1) % ensemble_size
+    if ensemble_rank % 2 == 0:
+        manager.send(u, dest=dest)
+        manager.recv(received, source=source)
+    else:
+        manager.recv(received, source=source)
+        manager.send(u, dest=dest)
+    for dat in received.dat:
+        assert numpy.allclose(dat.data_ro, source + 1)
+
+    # Nonblocking ring
+    received.assign(0)
+    requests = manager.isend(u, dest=dest, tag=1)
+    requests.extend(manager.irecv(received, source=source, tag=1))
+    MPI.Request.Waitall(requests)
+    for dat in received.dat:
+        assert numpy.allclose(dat.data_ro, source + 1)
+
+
+@pytest.mark.parallel(nprocs=3)
+def test_ensemble_recv_any_source():
+    manager = Ensemble(COMM_WORLD, 1)
+    ensemble_rank = manager.ensemble_comm.rank
+
+    mesh = UnitSquareMesh(4, 4, comm=manager.comm)
+    V = FunctionSpace(mesh, "CG", 1)
+    Q = VectorFunctionSpace(mesh, "DG", 0)
+    W = V*Q
+
+    u = Function(W).assign(ensemble_rank + 1)
+    for nonblocking in [False, True]:
+        if ensemble_rank == 0:
+            # Each function must hold the data of a single sender
+            values = set()
+            for _ in range(2):
+                received = Function(W)
+                if nonblocking:
+                    MPI.Request.Waitall(manager.irecv(received))
+                else:
+                    manager.recv(received)
+                value = received.dat[0].data_ro[0]
+                for dat in received.dat:
+                    assert numpy.allclose(dat.data_ro, value)
+                values.add(value)
+            assert values == {2, 3}
+        else:
+            manager.send(u, dest=0)
+        manager.ensemble_comm.barrier()
+
+
+@pytest.mark.parallel(nprocs=6)
+def test_ensemble_nonblocking_collectives():
+    manager = Ensemble(COMM_WORLD, 2)
+    ensemble_rank = manager.ensemble_comm.rank
+    ensemble_size = manager.ensemble_comm.size
+
+    mesh = UnitSquareMesh(10, 10, comm=manager.comm)
+    V = FunctionSpace(mesh, "CG", 1)
+
+    u = Function(V).assign(ensemble_rank + 1)
+    usum = Function(V)
+    requests = manager.iallreduce(u, usum)
+    MPI.Request.Waitall(requests)
+    assert numpy.allclose(usum.dat.data_ro, ensemble_size*(ensemble_size + 1)/2)
+
+    requests = manager.ibcast(u, root=ensemble_size - 1)
+    MPI.Request.Waitall(requests)
+    assert numpy.allclose(u.dat.data_ro, ensemble_size)
+
+    u.assign(ensemble_rank + 1)
+    manager.bcast(u, root=0)
+    assert numpy.allclose(u.dat.data_ro, 1)
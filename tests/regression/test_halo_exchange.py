@@ -0,0 +1,87 @@
+import pytest
+import numpy as np
+from firedrake import *
+from firedrake import halo
+from pyop2 import op2
+
+
+@pytest.fixture
+def functions():
+    mesh = UnitSquareMesh(8, 8)
+    V = FunctionSpace(mesh, "CG", 2)
+    W = VectorFunctionSpace(mesh, "CG", 2)
+    x = SpatialCoordinate(mesh)
+    f = interpolate(x[0]*x[1], V)
+    g = interpolate(as_vector([x[0], x[1]**2]), W)
+    return f, g
+
+
+@pytest.mark.parallel(nprocs=3)
+def test_coalesced_global_to_local(functions):
+    f, g = functions
+    assert f.dat.dataset.halo is g.dat.dataset.halo
+    expect = [f.dat.data_ro_with_halos.copy(), g.dat.data_ro_with_halos.copy()]
+    for fn in functions:
+        fn.dat._data[fn.dat.dataset.size:] = np.nan
+        fn.dat.halo_valid = False
+
+    halo.global_to_local([f.dat, g.dat])
+
+    assert f.dat.halo_valid and g.dat.halo_valid
+    assert np.allclose(f.dat.data_ro_with_halos, expect[0])
+    assert np.allclose(g.dat.data_ro_with_halos, expect[1])
+
+
+@pytest.mark.parallel(nprocs=3)
+@pytest.mark.parametrize("insert_mode", [op2.INC, op2.MIN, op2.MAX])
+def test_coalesced_local_to_global(functions, insert_mode):
+    f, g = functions
+    rank = f.comm.rank
+    for fn in functions:
+        fn.dat._data[:] = np.arange(fn.dat._data.size).reshape(fn.dat._data.shape) + rank
+    f_, g_ = Function(f.function_space()), Function(g.function_space())
+    f_.dat._data[:] = f.dat._data
+    g_.dat._data[:] = g.dat._data
+
+    for fn in (f_, g_):
+        fn.dat.dataset.halo.local_to_global_begin(fn.dat, insert_mode)
+        fn.dat.dataset.halo.local_to_global_end(fn.dat, insert_mode)
+
+    exchange = halo.CoalescedHaloExchange(f.dat.dataset.halo, [f.dat, g.dat])
+    exchange.local_to_global_begin(insert_mode)
+    exchange.local_to_global_end(insert_mode)
+
+    assert np.allclose(f.dat.data_ro, f_.dat.data_ro)
+    assert np.allclose(g.dat.data_ro, g_.dat.data_ro)
+
+
+@pytest.mark.parallel(nprocs=3)
+def test_assemble_coalesced_halo_exchange(functions):
+    f, g = functions
+    mesh = f.ufl_domain()
+    expect = assemble(f*inner(g, g)*dx)
+    for fn in functions:
+        fn.dat._data[fn.dat.dataset.size:] = np.nan
+        fn.dat.halo_valid = False
+    assert np.allclose(assemble(f*inner(g, g)*dx), expect)
+    v = TestFunction(FunctionSpace(mesh, "CG", 1))
+    assert np.isfinite(assemble(f*inner(g, g)*v*dx).dat.data_ro).all()
+
+
+@pytest.mark.parallel(nprocs=3)
+@pytest.mark.parametrize("insert_mode", [op2.MIN, op2.MAX])
+def test_vector_reduction_matches_scalar(functions, insert_mode):
+    f, g = functions
+    V = f.function_space()
+    g.dat._data[:] = np.random.RandomState(g.comm.rank).rand(*g.dat._data.shape)
+    components = [Function(V) for _ in range(g.dat.cdim)]
+    for k, c in enumerate(components):
+        c.dat._data[:] = g.dat._data.reshape(-1, g.dat.cdim)[:, k]
+
+    halo = g.dat.dataset.halo
+    for dat in [g.dat] + [c.dat for c in components]:
+        halo.local_to_global_begin(dat, insert_mode)
+        halo.local_to_global_end(dat, insert_mode)
+
+    for k, c in enumerate(components):
+        assert np.allclose(g.dat.data_ro[:, k], c.dat.data_ro)
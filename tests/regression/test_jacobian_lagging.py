@@ -0,0 +1,100 @@
+import pytest
+from firedrake import *
+
+
+@pytest.fixture
+def problem():
+    mesh = UnitSquareMesh(4, 4)
+    V = FunctionSpace(mesh, "CG", 1)
+    u = Function(V)
+    v = TestFunction(V)
+    f = Constant(1)
+    F = (u**3 + u - f)*v*dx + inner(grad(u), grad(v))*dx
+    return NonlinearVariationalProblem(F, u), f
+
+
+parameters = {"snes_type": "newtonls",
+              "snes_linesearch_type": "basic",
+              "snes_rtol": 1e-10,
+              "snes_max_it": 100,
+              "ksp_type": "preonly",
+              "pc_type": "lu"}
+
+
+def make_solver(problem, **kwargs):
+    count = [0]
+
+    def callback(X):
+        count[0] += 1
+    solver = NonlinearVariationalSolver(problem, solver_parameters=parameters,
+                                        pre_jacobian_callback=callback, **kwargs)
+    return solver, count
+
+
+def test_lag_newton_steps(problem):
+    problem, f = problem
+    solver, count = make_solver(problem)
+    solver.solve()
+    steps = solver.snes.getIterationNumber()
+
+    problem.u.assign(0)
+    solver, count = make_solver(problem, jacobian_policy=LagEvery(newton_steps=3))
+    solver.solve()
+    lagged_steps = solver.snes.getIterationNumber()
+    assert lagged_steps >= steps
+    assert count[0] == (lagged_steps + 2) // 3
+    assert norm(assemble(problem.F)) < 1e-8
+
+
+def test_lag_solves(problem):
+    problem, f = problem
+    solver, count = make_solver(problem, jacobian_policy=LagEvery(newton_steps=None, solves=2))
+    for i in range(4):
+        f.assign(1 + 0.1*i)
+        solver.solve()
+        assert norm(assemble(problem.F)) < 1e-8
+    # Built at the first Newton step of the first and third solves
+    assert count[0] == 2
+
+
+def test_lag_until_slow_convergence(problem):
+    problem, f = problem
+    solver, count = make_solver(problem, jacobian_policy=LagUntilSlowConvergence(max_rate=0.1))
+    evaluations = 0
+    for i in range(3):
+        f.assign(1 + i)
+        solver.solve()
+        evaluations += solver.snes.getIterationNumber()
+        assert norm(assemble(problem.F)) < 1e-8
+    assert 1 <= count[0] < evaluations
+
+
+def test_lag_preconditioner_until_coefficients_change(problem):
+    problem, f = problem
+    u = problem.u
+    v = TestFunction(u.function_space())
+    w = TrialFunction(u.function_space())
+    c = Constant(1)
+    Jp = (c*w*v + inner(grad(w), grad(v)))*dx
+    problem = NonlinearVariationalProblem(problem.F, u, Jp=Jp)
+    params = dict(parameters, ksp_type="gmres", ksp_rtol=1e-10)
+    solver = NonlinearVariationalSolver(problem, solver_parameters=params,
+                                        preconditioner_policy=LagUntilCoefficientsChange([c]))
+    ctx = solver._ctx
+    count = [0]
+    assemble_pjac = ctx._assemble_pjac
+
+    def counting():
+        count[0] += 1
+        assemble_pjac()
+    ctx._assemble_pjac = counting
+
+    solver.solve()
+    assert count[0] == 1
+    f.assign(2)
+    solver.solve()
+    assert count[0] == 1
+    c.assign(3)
+    solver.solve()
+    assert count[0] == 2
+    assert norm(assemble(problem.F)) < 1e-8
@@ -40,3 +40,33 @@ def test_locate_cell_not_found(meshdata):
     m, f = meshdata
 
     assert m.locate_cell((0.2, -0.4)) is None
+
+
+def test_locate_cells(meshdata):
+    m, f = meshdata
+    points = [(0.2, 0.1), (0.4, 0.4), (0.9, 0.8), (0.2, -0.4)]
+    cells, X = m.locate_cells(points)
+    assert cells[-1] == -1
+    assert np.allclose(f.dat.data[cells[:-1]], [1, 5, 9])
+    assert all(m.locate_cell(p) == c for p, c in zip(points[:-1], cells[:-1]))
+    assert X.shape == (4, 2)
+    assert (X[:-1] >= 0).all() and (X[:-1] <= 1).all()
+
+
+@pytest.mark.parametrize("mesh", [UnitIntervalMesh, PeriodicUnitIntervalMesh])
+def test_locate_cells_interval(mesh):
+    # Intervals of varying lengths
+    m = mesh(10)
+    m.coordinates.dat.data[:] = m.coordinates.dat.data_ro**2
+    m.clear_spatial_index()
+    V = FunctionSpace(m, "DG", 0)
+    f = interpolate(SpatialCoordinate(m)[0], V)
+    points = np.linspace(0.01, 0.99, 50)
+    cells, X = m.locate_cells(points)
+    assert (cells != -1).all()
+    assert all(m.locate_cell(p) == c for p, c in zip(points, cells))
+    # The cell midpoints are ordered as the points
+    assert (np.diff(f.dat.data_ro[cells]) >= 0).all()
+    assert (X >= 0).all() and (X <= 1).all()
+    cells, _ = m.locate_cells([-0.5, 1.5])
+    assert (cells == -1).all()
@@ -127,6 +127,60 @@ def test_matrixfree_action(a, V, bcs):
     assert np.allclose(expect.dat.data_ro, actual.dat.data_ro)
 
 
+@pytest.mark.parametrize("bcs", [False, True],
+                         ids=["no bcs", "bcs"])
+def test_matrixfree_diagonal(a, V, bcs):
+    if bcs:
+        bcs = DirichletBC(V, zero(V.shape), (1, 2))
+    else:
+        bcs = None
+    A = assemble(a, bcs=bcs)
+    A.force_evaluation()
+    Amf = assemble(a, mat_type="matfree", bcs=bcs)
+    Amf.force_evaluation()
+
+    expect = A.petscmat.getDiagonal()
+    actual = Amf.petscmat.getDiagonal()
+
+    assert np.allclose(expect.array_r, actual.array_r)
+
+
+@pytest.mark.parametrize("bcs", [False, True],
+                         ids=["no bcs", "bcs"])
+def test_matrixfree_block_diagonal(a, V, bcs):
+    if bcs:
+        bcs = DirichletBC(V.sub(0) if V.shape else V, 0, (1, 2))
+    else:
+        bcs = None
+    A = assemble(a, bcs=bcs)
+    A.force_evaluation()
+    Amf = assemble(a, mat_type="matfree", bcs=bcs)
+    Amf.force_evaluation()
+
+    bs = V.value_size
+    values = A.M.values
+    expect = np.array([values[n*bs:(n+1)*bs, n*bs:(n+1)*bs]
+                       for n in range(V.dof_dset.size)])
+    actual = Amf.petscmat.getPythonContext().block_diagonal()
+
+    assert np.allclose(expect, actual.dat.data_ro.reshape(-1, bs, bs))
+
+
+def test_matrixfree_jacobi(V, a, L, bcs):
+    expect = Function(V)
+    actual = Function(V)
+    parameters = {"ksp_type": "cg",
+                  "pc_type": "jacobi",
+                  "ksp_rtol": 1e-10}
+
+    solve(a == L, expect, bcs=bcs,
+          solver_parameters=dict(parameters, mat_type="aij"))
+    solve(a == L, actual, bcs=bcs,
+          solver_parameters=dict(parameters, mat_type="matfree"))
+
+    assert np.allclose(expect.dat.data_ro, actual.dat.data_ro)
+
+
 @pytest.mark.parametrize("preassembled", [False, True],
                          ids=["variational", "preassembled"])
 @pytest.mark.parametrize("parameters",
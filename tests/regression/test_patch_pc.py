@@ -92,3 +92,98 @@ def test_jacobi_sor_equivalence(mesh, problem_type, multiplicative):
     patch_history = patch.snes.ksp.getConvergenceHistory()
 
     assert numpy.allclose(jacobi_history, patch_history)
+
+
+def test_compiled_callbacks_equivalence():
+    distribution = {"overlap_type": (DistributedMeshOverlapType.VERTEX, 1)}
+    mesh = UnitSquareMesh(8, 8, distribution_parameters=distribution)
+    V = FunctionSpace(mesh, "DG", 1)
+
+    u = TrialFunction(V)
+    v = TestFunction(V)
+    n = FacetNormal(mesh)
+    h = CellVolume(mesh)/FacetArea(mesh)
+
+    a = (inner(u, v)*dx + inner(grad(u), grad(v))*dx
+         - inner(avg(grad(u)), jump(v, n))*dS
+         - inner(jump(u, n), avg(grad(v)))*dS
+         + Constant(10)/avg(h)*inner(jump(u), jump(v))*dS)
+    L = inner(Constant(1), v)*dx
+
+    uh = Function(V)
+    problem = LinearVariationalProblem(a, L, uh)
+
+    histories = []
+    for compiled in [True, False]:
+        solver = LinearVariationalSolver(problem,
+                                         options_prefix="",
+                                         solver_parameters={"mat_type": "matfree",
+                                                            "ksp_type": "cg",
+                                                            "pc_type": "python",
+                                                            "pc_python_type": "firedrake.PatchPC",
+                                                            "patch_pc_patch_construct_type": "star",
+                                                            "patch_pc_patch_save_operators": True,
+                                                            "patch_pc_patch_sub_mat_type": "seqdense",
+                                                            "patch_compiled_callbacks": compiled,
+                                                            "patch_sub_ksp_type": "preonly",
+                                                            "patch_sub_pc_type": "lu"})
+        solver.snes.ksp.setConvergenceHistory()
+        uh.assign(0)
+        solver.solve()
+        histories.append(solver.snes.ksp.getConvergenceHistory())
+
+    compiled, python = histories
+    assert numpy.allclose(compiled, python)
+
+
+def test_compiled_residual_callbacks_interior_facets():
+    mesh = UnitSquareMesh(6, 6)
+    V = FunctionSpace(mesh, "DG", 1)
+
+    u = Function(V)
+    v = TestFunction(V)
+    n = FacetNormal(mesh)
+    h = CellVolume(mesh)/FacetArea(mesh)
+
+    F = (inner(grad(u), grad(v))*dx + inner(u**3, v)*dx - inner(Constant(1), v)*dx
+         - inner(avg(grad(u)), jump(v, n))*dS
+         - inner(jump(u, n), avg(grad(v)))*dS
+         + Constant(10)/avg(h)*inner(jump(u), jump(v))*dS)
+    problem = NonlinearVariationalProblem(F, u)
+
+    NonlinearVariationalSolver(problem, solver_parameters={"snes_type": "newtonls",
+                                                           "snes_rtol": 1e-12,
+                                                           "ksp_type": "preonly",
+                                                           "pc_type": "lu"}).solve()
+    expect = u.copy(deepcopy=True)
+
+    # In serial, a single patch covers the whole mesh, so one patch
+    # solve gives the solution, provided the patch residual is right.
+    solutions = []
+    for compiled in [True, False]:
+        u.assign(0)
+        solver = NonlinearVariationalSolver(problem,
+                                            options_prefix="",
+                                            solver_parameters={"mat_type": "matfree",
+                                                               "snes_type": "python",
+                                                               "snes_python_type": "firedrake.PatchSNES",
+                                                               "snes_max_it": 1,
+                                                               "snes_convergence_test": "skip",
+                                                               "snes_linesearch_type": "basic",
+                                                               "patch_snes_patch_construct_type": "pardecomp",
+                                                               "patch_snes_patch_partition_of_unity": True,
+                                                               "patch_snes_patch_pardecomp_overlap": 1,
+                                                               "patch_snes_patch_sub_mat_type": "seqaij",
+                                                               "patch_snes_patch_local_type": "additive",
+                                                               "patch_compiled_callbacks": compiled,
+                                                               "patch_sub_snes_type": "newtonls",
+                                                               "patch_sub_snes_rtol": 1e-12,
+                                                               "patch_sub_snes_linesearch_type": "basic",
+                                                               "patch_sub_ksp_type": "preonly",
+                                                               "patch_sub_pc_type": "lu"})
+        solver.solve()
+        solutions.append(u.dat.data_ro.copy())
+
+    compiled, python = solutions
+    assert numpy.allclose(compiled, python)
+    assert numpy.allclose(compiled, expect.dat.data_ro)
@@ -141,3 +141,101 @@ def test_nascent_parallel_support():
     assert np.allclose(0.0576, f.at([0.12, 0.18]))
     assert np.allclose(1.0266, f.at([0.98, 0.87]))
     assert np.allclose([0.2176, 0.2822], f.at([0.12, 0.68], [0.63, 0.34]))
+
+
+def test_many_points():
+    mesh = UnitSquareMesh(16, 16)
+    V = VectorFunctionSpace(mesh, "CG", 2)
+    x = SpatialCoordinate(mesh)
+    f = Function(V).interpolate(as_vector((x[0]*x[1], x[0] + x[1])))
+
+    points = np.random.RandomState(0).uniform(size=(2000, 2))
+    expected = np.column_stack((points[:, 0]*points[:, 1], points.sum(axis=1)))
+    assert np.allclose(expected, f.at(points))
+
+
+@pytest.mark.parallel(nprocs=3)
+def test_many_points_parallel():
+    mesh = UnitSquareMesh(8, 8)
+    V = FunctionSpace(mesh, "CG", 2)
+    x = SpatialCoordinate(mesh)
+    f = Function(V).interpolate((x[0] + 0.2)*x[1])
+
+    points = np.random.RandomState(0).uniform(size=(500, 2))
+    points[0] = [1.5, 0.5]
+    actual = f.at(points, dont_raise=True)
+    assert actual[0] is None
+    assert np.allclose((points[1:, 0] + 0.2)*points[1:, 1], actual[1:])
+
+
+def test_point_evaluator():
+    mesh = UnitSquareMesh(8, 8)
+    V = FunctionSpace(mesh, "CG", 2)
+    W = VectorFunctionSpace(mesh, "DG", 1)
+    x = SpatialCoordinate(mesh)
+    f = Function(V).interpolate(x[0]*x[1])
+    g = Function(W).interpolate(as_vector((x[0], 2*x[1])))
+
+    points = np.array([[0.12, 0.18], [0.98, 0.87], [1.5, 0.5]])
+    evaluator = PointEvaluator(mesh, points, dont_raise=True)
+    fvals = evaluator.evaluate(f)
+    assert np.allclose([0.0216, 0.8526], fvals[:2])
+    assert np.isnan(fvals[2])
+    gvals = evaluator.evaluate(g)
+    assert np.allclose([[0.12, 0.36], [0.98, 1.74]], gvals[:2])
+
+    with pytest.raises(PointNotInDomainError):
+        PointEvaluator(mesh, points).evaluate(f)
+
+
+def test_point_evaluator_moved_mesh():
+    mesh = UnitSquareMesh(4, 4)
+    V = FunctionSpace(mesh, "CG", 1)
+    f = Function(V).interpolate(SpatialCoordinate(mesh)[0])
+
+    evaluator = PointEvaluator(mesh, [[0.5, 0.5]])
+    assert np.allclose(0.5, evaluator.evaluate(f))
+
+    mesh.coordinates.dat.data[:, 0] *= 2
+    mesh.clear_spatial_index()
+    assert np.allclose(0.25, evaluator.evaluate(f))
+
+
+@pytest.mark.parallel(nprocs=3)
+def test_nonredundant_points():
+    mesh = UnitSquareMesh(8, 8)
+    V = FunctionSpace(mesh, "CG", 2)
+    x = SpatialCoordinate(mesh)
+    f = Function(V).interpolate((x[0] + 0.2)*x[1])
+
+    # Different number of points on each process
+    points = np.random.RandomState(mesh.comm.rank).uniform(size=(10*(mesh.comm.rank + 1), 2))
+    actual = f.at(points, redundant=False)
+    assert np.allclose((points[:, 0] + 0.2)*points[:, 1], actual)
+
+    actual = f.at([[1.5, 0.5], [0.5, 0.5]], dont_raise=True, redundant=False)
+    assert actual[0] is None
+    assert np.allclose(0.35, actual[1])
+
+    # A point missing on one process raises on all of them
+    points = [[1.5, 0.5]] if mesh.comm.rank == 1 else [[0.5, 0.5]]
+    with pytest.raises(PointNotInDomainError):
+        f.at(points, redundant=False)
+    mesh.comm.barrier()
+
+
+@pytest.mark.parallel(nprocs=3)
+def test_nonredundant_points_tolerance():
+    mesh = UnitSquareMesh(8, 8)
+    V = FunctionSpace(mesh, "CG", 1)
+    x = SpatialCoordinate(mesh)
+    f = Function(V).interpolate(x[0] + 2*x[1])
+
+    # Just outside the domain, but within the tolerance of a cell
+    point = [1 + 1e-3, 0.5]
+    expect = f.at(point, tolerance=0.1)
+    assert np.allclose(expect, 2.001)
+    points = np.array([point]) if mesh.comm.rank == 0 else np.empty((0, 2))
+    actual = f.at(points, tolerance=0.1, redundant=False)
+    if mesh.comm.rank == 0:
+        assert np.allclose(actual, [expect])
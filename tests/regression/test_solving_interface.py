@@ -1,4 +1,5 @@
 import pytest
+import numpy
 from firedrake import *
 from firedrake.petsc import PETSc
 from numpy.linalg import norm as np_norm
@@ -189,3 +190,96 @@ def test_constant_jacobian_lvs():
     lvs.solve()
 
     assert not (norm(assemble(out*5 - f)) < 2e-7)
+
+
+@pytest.fixture
+def cache_solvers():
+    parameters["cache_solvers"] = True
+    yield
+    parameters["cache_solvers"] = False
+
+
+def test_cached_linear_solver_reused(cache_solvers):
+    mesh = UnitSquareMesh(2, 2)
+    V = FunctionSpace(mesh, "CG", 1)
+    u = TrialFunction(V)
+    v = TestFunction(V)
+    f = Function(V)
+    out = Function(V)
+    bc = DirichletBC(V, 0, 1)
+    params = {"ksp_type": "preonly", "pc_type": "lu"}
+
+    solvers = set()
+    first = Function(V)
+    for i in range(3):
+        f.assign(i + 1)
+        # Rebuild the forms every step, as in a time loop
+        solve(u*v*dx == f*v*dx, out, bcs=bc, solver_parameters=params)
+        if i == 0:
+            first.assign(out)
+        assert norm(assemble(out - (i + 1)*first)) < 1e-10
+        solvers.update(out._solver_cache.values())
+    assert len(solvers) == 1
+    solver, = solvers
+    assert solver._problem._constant_jacobian
+
+    # Different parameters build a new solver
+    solve(u*v*dx == f*v*dx, out, bcs=bc, solver_parameters={"ksp_type": "cg"})
+    assert len(out._solver_cache) == 2
+
+
+def test_cached_solver_rebuilt_bcs(cache_solvers):
+    mesh = UnitSquareMesh(2, 2)
+    V = FunctionSpace(mesh, "CG", 1)
+    u = TrialFunction(V)
+    v = TestFunction(V)
+    g = Function(V)
+    out = Function(V)
+
+    for value in [1, 2, 3]:
+        g.assign(value)
+        # Rebuild the boundary condition every step
+        bc = DirichletBC(V, g, 1)
+        solve(u*v*dx == v*dx, out, bcs=bc)
+        assert len(out._solver_cache) == 1
+    assert numpy.allclose(out.dat.data_ro[bc.nodes], 3)
+
+    # Values that never match are not accumulated
+    for value in range(10):
+        solve(u*v*dx == v*dx, out, bcs=DirichletBC(V, Constant(value), 1))
+    assert len(out._solver_cache) <= 4
+
+
+def test_cached_linear_solver_varying_jacobian(cache_solvers):
+    mesh = UnitSquareMesh(2, 2)
+    V = FunctionSpace(mesh, "CG", 1)
+    u = TrialFunction(V)
+    v = TestFunction(V)
+    q = Function(V)
+    f = Function(V).assign(1)
+    out = Function(V)
+
+    for value in [1, 5]:
+        q.assign(value)
+        solve(q*u*v*dx == f*v*dx, out)
+        assert norm(assemble(out*value - f)) < 2e-7
+    assert len(out._solver_cache) == 1
+
+
+def test_cached_nonlinear_solver_reused(cache_solvers):
+    mesh = UnitSquareMesh(2, 2)
+    V = FunctionSpace(mesh, "CG", 1)
+    u = Function(V)
+    v = TestFunction(V)
+    f = Function(V)
+    for value in [1, 8]:
+        f.assign(value)
+        solve((u**3 - f)*v*dx == 0, u)
+        assert norm(assemble(u**3 - f)) < 1e-6
+    assert len(u._solver_cache) == 1
+
+
+def test_solvers_not_cached_by_default(a_L_out):
+    a, L, out = a_L_out
+    solve(a == L, out)
+    assert not hasattr(out, "_solver_cache")
@@ -116,3 +116,34 @@ def test_local_solve(decomp):
     x = assemble(A.solve(b, decomposition=decomp))
 
     assert np.allclose(x.dat.data, f.dat.data, rtol=1.e-13)
+
+
+def test_solve_inverse_products():
+    from firedrake.slate.slac.utils import solve_inverse_products, traverse_dags
+    from firedrake.slate.slate import Inverse, Solve
+
+    mesh = UnitSquareMesh(3, 3)
+    V = FunctionSpace(mesh, "DG", 2)
+    W = FunctionSpace(mesh, "CG", 1)
+    x, y = SpatialCoordinate(mesh)
+    f = Function(V).interpolate(x*y + 1)
+
+    u = TrialFunction(V)
+    v = TestFunction(V)
+    w = TestFunction(W)
+    A = Tensor(inner(u, v)*dx + inner(grad(u), grad(v))*dx)
+    K = Tensor(inner(u, w)*dx)
+    b = AssembledVector(f)
+
+    for expr in [A.inv * b, K * A.inv * b, K * A.inv * K.T]:
+        rewritten = solve_inverse_products(expr)
+        nodes = list(traverse_dags([rewritten]))
+        assert any(isinstance(node, Solve) for node in nodes)
+        assert not any(isinstance(node, Inverse) for node in nodes)
+
+        expect = assemble(expr)
+        result = assemble(expr, form_compiler_parameters={"slate_solve_inverse_products": True})
+        if expr.rank == 1:
+            assert np.allclose(result.dat.data_ro, expect.dat.data_ro, rtol=1e-12)
+        else:
+            assert np.allclose(result.M.values, expect.M.values, rtol=1e-12)
@@ -29,7 +29,8 @@ from firedrake import *
 @pytest.mark.parametrize(("degree", "hdiv_family", "quadrilateral"),
                          [(1, "RT", False), (1, "RTCF", True),
                           (2, "RT", False), (2, "RTCF", True)])
-def test_slate_hybridization(degree, hdiv_family, quadrilateral):
+@pytest.mark.parametrize("cache_local_inverses", [False, True])
+def test_slate_hybridization(degree, hdiv_family, quadrilateral, cache_local_inverses):
     # Create a mesh
     mesh = UnitSquareMesh(6, 6, quadrilateral=quadrilateral)
     RT = FunctionSpace(mesh, hdiv_family, degree)
@@ -56,7 +57,8 @@ def test_slate_hybridization(degree, hdiv_family, quadrilateral):
               'pc_type': 'python',
               'pc_python_type': 'firedrake.HybridizationPC',
               'hybridization': {'ksp_type': 'preonly',
-                                'pc_type': 'lu'}}
+                                'pc_type': 'lu',
+                                'cache_local_inverses': cache_local_inverses}}
     solve(a == L, w, solver_parameters=params)
     sigma_h, u_h = w.split()
 
@@ -79,3 +81,35 @@ def test_slate_hybridization(degree, hdiv_family, quadrilateral):
 
     assert sigma_err < 1e-11
     assert u_err < 1e-11
+
+
+def test_scpc_cache_local_inverses():
+    mesh = UnitSquareMesh(6, 6)
+    RT = FunctionSpace(mesh, "RT", 1)
+    DG = FunctionSpace(mesh, "DG", 0)
+    W = RT * DG
+    sigma, u = TrialFunctions(W)
+    tau, v = TestFunctions(W)
+    n = FacetNormal(mesh)
+    x, y = SpatialCoordinate(mesh)
+    f = (1+8*pi*pi)*sin(x*pi*2)*sin(y*pi*2)
+
+    a = (dot(sigma, tau) - div(tau) * u + u * v + v * div(sigma)) * dx
+    L = f * v * dx - 42 * dot(tau, n)*ds
+
+    solutions = []
+    for cache in [False, True]:
+        w = Function(W)
+        params = {'mat_type': 'matfree',
+                  'ksp_type': 'preonly',
+                  'pc_type': 'python',
+                  'pc_python_type': 'firedrake.SCPC',
+                  'pc_sc_eliminate_fields': '1',
+                  'pc_sc_cache_local_inverses': cache,
+                  'condensed_field': {'ksp_type': 'preonly',
+                                      'pc_type': 'lu'}}
+        solve(a == L, w, solver_parameters=params)
+        solutions.append(w)
+
+    for uncached, cached in zip(*(w.split() for w in solutions)):
+        assert errornorm(uncached, cached) < 1e-11
@@ -22,3 +22,13 @@ def test_intersection_finder(mesh):
     for cell_A in range(mesh_A.num_cells()):
         print("intersections[%d] = %s" % (cell_A, intersections[cell_A]))
         assert cell_A in intersections[cell_A]
+
+
+def test_intersection_finder_csr(mesh):
+    from firedrake.supermeshimpl import intersection_finder_csr
+    intersections = intersection_finder(mesh, mesh)
+    indptr, indices = intersection_finder_csr(mesh, mesh)
+
+    assert len(indptr) == mesh.num_cells() + 1
+    for cell_A in range(mesh.num_cells()):
+        assert sorted(indices[indptr[cell_A]:indptr[cell_A + 1]]) == sorted(intersections[cell_A])
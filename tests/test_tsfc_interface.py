@@ -132,3 +132,110 @@ with open("{file}", "w") as f:
         kernel_name = sorted(k_[1][0].name for k_ in k)
         assert len(k) == 2 and 'cell_integral' in kernel_name[0] and \
             'exterior_facet_integral' in kernel_name[1]
+
+
+class TestKernelCache:
+
+    """Size-bounded kernel cache tests."""
+
+    def test_memory_lru_eviction(self, tmpdir):
+        cache = tsfc_interface.KernelCache(str(tmpdir), max_entries=2)
+        cache.insert("aa1", 1)
+        cache.insert("aa2", 2)
+        assert cache.lookup("aa1") == 1
+        cache.insert("aa3", 3)
+        assert "aa1" in cache
+        assert "aa2" not in cache
+        assert "aa3" in cache
+        assert cache.stats()["evictions"] == 1
+
+    def test_disk_read_and_miss(self, tmpdir):
+        cache = tsfc_interface.KernelCache(str(tmpdir))
+        cache.write("aa1", {"a": 1}, COMM_WORLD)
+        cache.clear()
+        assert cache.read("aa1", COMM_WORLD) == {"a": 1}
+        with pytest.raises(KeyError):
+            cache.read("aa2", COMM_WORLD)
+        stats = cache.stats()
+        assert stats["disk_hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_disk_prune(self, tmpdir):
+        cache = tsfc_interface.KernelCache(str(tmpdir))
+        for i in range(4):
+            cache.write("aa%d" % i, list(range(100*i)), COMM_WORLD)
+            os.utime(os.path.join(str(tmpdir), "aa", "%d" % i), (i, i))
+        entries = cache.disk_entries()
+        assert len(entries) == 4
+        size = sum(s for _, s, _ in entries)
+        newest = entries[-1][1]
+        removed, freed = cache.prune(newest)
+        assert removed == 3
+        assert freed == size - newest
+        assert [os.path.basename(p) for p, _, _ in cache.disk_entries()] == ["3"]
+
+    def test_disk_size_limit(self, tmpdir):
+        cache = tsfc_interface.KernelCache(str(tmpdir), max_disk_size=0)
+        cache.write("aa1", 1, COMM_WORLD)
+        assert cache.disk_entries() == []
+
+    def test_disk_size_tracked(self, tmpdir, monkeypatch):
+        cache = tsfc_interface.KernelCache(str(tmpdir), max_disk_size=10**9)
+        scans = []
+        disk_entries = cache.disk_entries
+        monkeypatch.setattr(cache, "disk_entries", lambda: scans.append(1) or disk_entries())
+        for i in range(10):
+            cache.write("aa%d" % i, list(range(100)), COMM_WORLD)
+        # Only the first write scans the cache directory
+        assert len(scans) == 1
+        assert cache._disk_size == sum(s for _, s, _ in disk_entries())
+
+        # Prune with hysteresis once over the limit
+        cache.max_disk_size = cache._disk_size
+        cache.write("aa10", list(range(100)), COMM_WORLD)
+        size = sum(s for _, s, _ in disk_entries())
+        assert size <= 0.9 * cache.max_disk_size
+        assert cache._disk_size == size
+
+    def test_parse_size(self):
+        assert tsfc_interface.parse_size("100") == 100
+        assert tsfc_interface.parse_size("2K") == 2048
+        assert tsfc_interface.parse_size("1.5M") == 3*2**19
+
+    def test_statistics(self, mass):
+        before = tsfc_interface.cache_statistics()
+        tsfc_interface.TSFCKernel(mass, 'mass', parameters["form_compiler"], {}, None)
+        tsfc_interface.TSFCKernel(mass, 'mass', parameters["form_compiler"], {}, None)
+        after = tsfc_interface.cache_statistics()
+        assert after["hits"] + after["disk_hits"] > before["hits"] + before["disk_hits"]
+
+
+class TestPrecompile:
+
+    """Ahead-of-time compilation tests."""
+
+    def test_precompile_solver(self, fs, tmpdir):
+        u = Function(fs)
+        v = TestFunction(fs)
+        F = inner(grad(u), grad(v))*dx + u**3*v*dx - Constant(13.5)*v*dx
+        problem = NonlinearVariationalProblem(F, u)
+        solver = NonlinearVariationalSolver(problem)
+        manifest = str(tmpdir.join("manifest.json"))
+
+        tsfc_interface.clear_cache()
+        tsfc_interface.TSFCKernel._cache.clear()
+        assert precompile(solver, processes=2, manifest=manifest) > 0
+        # Already compiled
+        assert precompile(solver) == 0
+
+        before = tsfc_interface.cache_statistics()["misses"]
+        solver.solve()
+        assert tsfc_interface.cache_statistics()["misses"] == before
+
+        # Empty the memory cache too, so that only the kernels from
+        # the manifest are found.
+        tsfc_interface.clear_cache()
+        tsfc_interface.TSFCKernel._cache.clear()
+        assert populate_cache(manifest) > 0
+        assert len(tsfc_interface.TSFCKernel._cache) == 0
+        assert precompile(solver) == 0